@@ -1,12 +1,17 @@
 #!/usr/bin/env python
 
+import itertools
 import math
 import os
 import yaml
 import re
 import requests
+import threading
 import time
 
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
 from ansible.module_utils.basic import *
 
 DOCUMENTATION = '''
@@ -31,6 +36,14 @@ Options:
     - option-name: path
       description: to figure out the path of topo_{}.yml
       required: False
+
+    - option-name: chunk_size
+      description: maximum number of routes sent to an exabgp process in one HTTP request
+      required: False
+
+    - option-name: max_workers
+      description: number of exabgp processes the routes are sent to concurrently
+      required: False
 '''
 
 EXAMPLES = '''
@@ -57,6 +70,10 @@ LEAF_ASN_START = 64600
 TOR_ASN_START = 65500
 IPV4_BASE_PORT = 5000
 IPV6_BASE_PORT = 6000
+BASE_ADDRESS_V4 = (192 << 24) + (168 << 16)
+ROUTE_CHUNK_SIZE = 10000
+MAX_WORKERS = 8
+HTTP_TIMEOUT = 90
 
 
 def wait_for_http(host_ip, http_port, timeout=10):
@@ -93,18 +110,101 @@ def read_topo(topo_name, path):
         return {}
 
 
-def change_routes(action, ptf_ip, port, routes):
-    messages = []
+def format_route_commands(action, routes):
+    """Generate the ExaBGP command of each (prefix, nexthop, aspath) route"""
     for prefix, nexthop, aspath in routes:
         if aspath:
-            messages.append("{} route {} next-hop {} as-path [ {} ]".format(action, prefix, nexthop, aspath))
+            yield "{} route {} next-hop {} as-path [ {} ]".format(action, prefix, nexthop, aspath)
         else:
-            messages.append("{} route {} next-hop {}".format(action, prefix, nexthop))
-    wait_for_http(ptf_ip, port, timeout=60)
+            yield "{} route {} next-hop {}".format(action, prefix, nexthop)
+
+
+def change_routes(action, ptf_ip, port, routes, session=None, chunk_size=ROUTE_CHUNK_SIZE, wait_http=True):
+    """Stream the routes to the ExaBGP HTTP API listening on the port, in POST requests of chunk_size routes.
+
+    Returns the number of routes sent.
+    """
+    if wait_http:
+        wait_for_http(ptf_ip, port, timeout=60)
     url = "http://%s:%d" % (ptf_ip, port)
-    data = { "commands": ";".join(messages) }
-    r = requests.post(url, data=data, timeout=90)
-    assert r.status_code == 200
+    post = session.post if session else requests.post
+    commands = format_route_commands(action, routes)
+    count = 0
+    while True:
+        chunk = list(itertools.islice(commands, chunk_size))
+        if not chunk:
+            break
+        data = { "commands": ";".join(chunk) }
+        r = post(url, data=data, timeout=HTTP_TIMEOUT)
+        assert r.status_code == 200
+        count += len(chunk)
+    return count
+
+
+class RouteAnnouncer(object):
+    """Announce or withdraw the routes of the ExaBGP neighbors in the PTF container.
+
+    The routes are queued per ExaBGP HTTP API port by add() and streamed by run(). The ports are served
+    concurrently by a pool of threads, each thread keeping its own HTTP session so that the connections are reused
+    between the chunks. The routes of a port are sent in the order they were added.
+    """
+
+    def __init__(self, ptf_ip, action="announce", chunk_size=ROUTE_CHUNK_SIZE, max_workers=MAX_WORKERS):
+        self.ptf_ip = ptf_ip
+        self.action = action
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.jobs = OrderedDict()
+        self.stats = {}
+        self._local = threading.local()
+
+    def add(self, port, routes):
+        """Queue the routes, an iterable of (prefix, nexthop, aspath), to be sent to the port"""
+        self.jobs.setdefault(port, []).append(routes)
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self._local.session = session
+        return session
+
+    def _send(self, port):
+        start = time.time()
+        count = 0
+        wait_for_http(self.ptf_ip, port, timeout=60)
+        for routes in self.jobs[port]:
+            count += change_routes(self.action, self.ptf_ip, port, routes, session=self._session(),
+                                   chunk_size=self.chunk_size, wait_http=False)
+        return port, count, time.time() - start
+
+    def run(self):
+        """Send the queued routes and return the statistics of each port and the total.
+
+        The statistics contain the number of routes, the elapsed seconds and the rate in routes per second.
+        """
+        ports = list(self.jobs.keys())
+        start = time.time()
+        if len(ports) > 1 and self.max_workers > 1:
+            pool = ThreadPool(min(self.max_workers, len(ports)))
+            try:
+                results = pool.map(self._send, ports)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [self._send(port) for port in ports]
+        elapsed = time.time() - start
+
+        total = 0
+        for port, count, port_elapsed in results:
+            total += count
+            self.stats[port] = {"routes": count, "elapsed": round(port_elapsed, 3),
+                                "rate": int(count / port_elapsed) if port_elapsed else count}
+        self.jobs.clear()
+        return {"routes": total, "elapsed": round(elapsed, 3), "rate": int(total / elapsed) if elapsed else total,
+                "ports": self.stats}
 
 
 # AS path from Leaf router for T0 topology
@@ -138,118 +238,128 @@ def get_uplink_router_as_path(uplink_router_type, spine_asn):
     return default_route_as_path
 
 
-def generate_routes(family, podset_number, tor_number, tor_subnet_number,
-                    spine_asn, leaf_asn_start, tor_asn_start, nexthop,
-                    nexthop_v6, tor_subnet_size, max_tor_subnet_number, topo,
-                    router_type="leaf", tor_index=None, set_num=None,
-                    no_default_route=False, core_ra_asn=CORE_RA_ASN):
-    routes = []
+def _skip_podset_tor(podset, tor, podset_number, topo, router_type, tor_index, set_num):
+    """Check whether the routes of a (podset, tor) pair are not advertised by this router"""
+    if router_type == "core":
+        # Advertise podset 3+ to T2 DUT
+        if podset < 3:
+            return True
+
+        # First 3 pods are advertised from T1 - so remove 3 from the total pods being advertised by T3
+        first_third_podset_number = int(math.ceil((podset_number - 3) / 3.0))
+        second_third_podset_number = int(math.ceil(((podset_number - 3) * 2) / 3.0))
+
+        if set_num is not None:
+            # For T2, we have 3 sets - 1 set advertises first 1/3 podsets, second set advertises second 1/3 podsets, and all VM's advertises the last 1/3 podsets
+            if podset <= first_third_podset_number and set_num != 0:
+                return True
+            elif podset > first_third_podset_number and podset < second_third_podset_number and set_num != 1:
+                return True
+    if router_type == "spine":
+        # Skip podset 0 for T2
+        if podset == 0:
+            return True
+    elif router_type == "leaf":
+        if topo == 't2':
+            # Send routes for podset 0-2 (first 3 pods) to the T2 DUT
+            if podset > 2:
+                return True
+
+            if set_num is not None:
+                # For T2, we have 3 sets - 1 set advertises podset 1, second set advertises podset 2, and all VM's advertises podset3
+                if podset == 0 and set_num != 0:
+                    return True
+                elif podset == 1 and set_num != 1:
+                    return True
+        elif topo == 't0-mclag':
+            if podset > 1:
+                return True
+            if set_num is not None:
+                if podset == 0 and set_num != 0:
+                    return True
+                elif podset == 1 and set_num != 1:
+                    return True
+        else:
+            # Skip tor 0 podset 0 for T1
+            if podset == 0 and tor == 0:
+                return True
+    elif router_type == "tor":
+        # Skip non podset 0 for T0
+        if podset != 0:
+            return True
+        elif tor != tor_index:
+            return True
+    return False
+
+
+def iter_routes(family, podset_number, tor_number, tor_subnet_number,
+                spine_asn, leaf_asn_start, tor_asn_start, nexthop,
+                nexthop_v6, tor_subnet_size, max_tor_subnet_number, topo,
+                router_type="leaf", tor_index=None, set_num=None,
+                no_default_route=False, core_ra_asn=CORE_RA_ASN):
+    """Generate the (prefix, nexthop, aspath) routes advertised by a router, without building them in memory.
+
+    The prefixes are computed arithmetically from the 192.168.0.0 base address. The podsets and tors which are not
+    advertised by this router are skipped before looping over their subnets.
+    """
     if not no_default_route and router_type != "tor":
         default_route_as_path = get_uplink_router_as_path(router_type, spine_asn)
 
         if topo != "t2" or (topo == "t2" and router_type == "core"):
             if family in ["v4", "both"]:
-                routes.append(("0.0.0.0/0", nexthop, default_route_as_path))
+                yield ("0.0.0.0/0", nexthop, default_route_as_path)
             if family in ["v6", "both"]:
-                routes.append(("::/0", nexthop_v6, default_route_as_path))
+                yield ("::/0", nexthop_v6, default_route_as_path)
+
+    with_v4 = family in ["v4", "both"]
+    with_v6 = family in ["v6", "both"]
+    prefixlen_v4 = (32 - int(math.log(tor_subnet_size, 2)))
+    prefix_v4_format = "{}.{}.{}.{}/%d" % prefixlen_v4
+    tor_size = max_tor_subnet_number * tor_subnet_size
+    podset_size = tor_number * tor_size
 
     # NOTE: Using large enough values (e.g., podset_number = 200,
     # us to overflow the 192.168.0.0/16 private address space here.
     # This should be fine for internal use, but may pose an issue if used otherwise
     for podset in range(0, podset_number):
+        leaf_asn = leaf_asn_start + podset
         for tor in range(0, tor_number):
-            for subnet in range(0, tor_subnet_number):
-                if router_type == "core":
-                    # Advertise podset 3+ to T2 DUT
-                    if podset < 3:
-                        continue
-
-                    # First 3 pods are advertised from T1 - so remove 3 from the total pods being advertised by T3
-                    first_third_podset_number = int(math.ceil((podset_number - 3) / 3.0))
-                    second_third_podset_number = int(math.ceil(((podset_number - 3) * 2) / 3.0))
-
-                    if set_num is not None:
-                        # For T2, we have 3 sets - 1 set advertises first 1/3 podsets, second set advertises second 1/3 podsets, and all VM's advertises the last 1/3 podsets
-                        if podset <= first_third_podset_number and set_num != 0:
-                            continue
-                        elif podset > first_third_podset_number and podset < second_third_podset_number and set_num != 1:
-                            continue
-                if router_type == "spine":
-                    # Skip podset 0 for T2
+            if _skip_podset_tor(podset, tor, podset_number, topo, router_type, tor_index, set_num):
+                continue
+
+            tor_asn = tor_asn_start + tor
+            aspath = None
+            if router_type == "core":
+                aspath = "{} {}".format(leaf_asn, core_ra_asn)
+            elif router_type == "spine":
+                aspath = "{} {}".format(leaf_asn, tor_asn)
+            elif router_type == "leaf":
+                if topo == "t2":
+                    aspath = "{}".format(tor_asn)
+                elif topo == "t0-mclag":
+                    aspath = "{}".format(tor_asn)
+                else:
                     if podset == 0:
-                        continue
-                elif router_type == "leaf":
-                    if topo == 't2':
-                        # Send routes for podset 0-2 (first 3 pods) to the T2 DUT
-                        if podset > 2:
-                            continue
-
-                        if set_num is not None:
-                            # For T2, we have 3 sets - 1 set advertises podset 1, second set advertises podset 2, and all VM's advertises podset3
-                            if podset == 0 and set_num != 0:
-                                continue
-                            elif podset == 1 and set_num != 1:
-                                continue
-                    elif topo == 't0-mclag':
-                        if podset > 1:
-                            continue
-                        if set_num is not None:
-                            if podset == 0 and set_num != 0:
-                                continue
-                            elif podset == 1 and set_num != 1:
-                                continue
-                    else:
-                        # Skip tor 0 podset 0 for T1
-                        if podset == 0 and tor == 0:
-                            continue
-                elif router_type == "tor":
-                    # Skip non podset 0 for T0
-                    if podset != 0:
-                        continue
-                    elif tor != tor_index:
-                        continue
-
-                suffix = ((podset * tor_number * max_tor_subnet_number * tor_subnet_size) + \
-                          (tor * max_tor_subnet_number * tor_subnet_size) + \
-                          (subnet * tor_subnet_size))
-                octet2 = (168 + int(suffix / (256 ** 2)))
-                octet1 = (192 + int(octet2 / 256))
-                octet2 = (octet2 % 256)
-                octet3 = (int(suffix / 256) % 256)
-                octet4 = (suffix % 256)
-                prefixlen_v4 = (32 - int(math.log(tor_subnet_size, 2)))
-
-                prefix = "{}.{}.{}.{}/{}".format(octet1, octet2, octet3, octet4, prefixlen_v4)
-                prefix_v6 = "20%02X:%02X%02X:0:%02X::/64" % (octet1, octet2, octet3, octet4)
-
-                leaf_asn = leaf_asn_start + podset
-                tor_asn = tor_asn_start + tor
-
-                aspath = None
-                if router_type == "core":
-                    aspath = "{} {}".format(leaf_asn, core_ra_asn)
-                elif router_type == "spine":
-                    aspath = "{} {}".format(leaf_asn, tor_asn)
-                elif router_type == "leaf":
-                    if topo == "t2":
-                        aspath = "{}".format(tor_asn)
-                    elif topo == "t0-mclag":
                         aspath = "{}".format(tor_asn)
                     else:
-                        if podset == 0:
-                            aspath = "{}".format(tor_asn)
-                        else:
-                            aspath = "{} {} {}".format(spine_asn, leaf_asn, tor_asn)
+                        aspath = "{} {} {}".format(spine_asn, leaf_asn, tor_asn)
+
+            address = BASE_ADDRESS_V4 + podset * podset_size + tor * tor_size
+            for _ in range(0, tor_subnet_number):
+                octet1, octet2, octet3, octet4 = (address >> 24), (address >> 16) & 0xff, (address >> 8) & 0xff, address & 0xff
+                if with_v4:
+                    yield (prefix_v4_format.format(octet1, octet2, octet3, octet4), nexthop, aspath)
+                if with_v6:
+                    yield ("20%02X:%02X%02X:0:%02X::/64" % (octet1, octet2, octet3, octet4), nexthop_v6, aspath)
+                address += tor_subnet_size
 
-                if family in ["v4", "both"]:
-                    routes.append((prefix, nexthop, aspath))
-                if family in ["v6", "both"]:
-                    routes.append((prefix_v6, nexthop_v6, aspath))
 
-    return routes
+def generate_routes(*args, **kwargs):
+    """Generate the list of routes advertised by a router, see iter_routes for the arguments"""
+    return list(iter_routes(*args, **kwargs))
 
 
-def fib_t0(topo, ptf_ip, no_default_route=False, action="announce"):
+def fib_t0(topo, announcer, no_default_route=False):
     common_config = topo['configuration_properties'].get('common', {})
     podset_number = common_config.get("podset_number", PODSET_NUMBER)
     tor_number = common_config.get("tor_number", TOR_NUMBER)
@@ -268,20 +378,20 @@ def fib_t0(topo, ptf_ip, no_default_route=False, action="announce"):
         port = IPV4_BASE_PORT + vm_offset
         port6 = IPV6_BASE_PORT + vm_offset
 
-        routes_v4 = generate_routes("v4", podset_number, tor_number, tor_subnet_number,
-                                    spine_asn, leaf_asn_start, tor_asn_start,
-                                    nhipv4, nhipv4, tor_subnet_size, max_tor_subnet_number, "t0",
-                                    no_default_route=no_default_route)
-        routes_v6 = generate_routes("v6", podset_number, tor_number, tor_subnet_number,
-                                    spine_asn, leaf_asn_start, tor_asn_start,
-                                    nhipv6, nhipv6, tor_subnet_size, max_tor_subnet_number, "t0",
-                                    no_default_route=no_default_route)
+        routes_v4 = iter_routes("v4", podset_number, tor_number, tor_subnet_number,
+                                spine_asn, leaf_asn_start, tor_asn_start,
+                                nhipv4, nhipv4, tor_subnet_size, max_tor_subnet_number, "t0",
+                                no_default_route=no_default_route)
+        routes_v6 = iter_routes("v6", podset_number, tor_number, tor_subnet_number,
+                                spine_asn, leaf_asn_start, tor_asn_start,
+                                nhipv6, nhipv6, tor_subnet_size, max_tor_subnet_number, "t0",
+                                no_default_route=no_default_route)
 
-        change_routes(action, ptf_ip, port, routes_v4)
-        change_routes(action, ptf_ip, port6, routes_v6)
+        announcer.add(port, routes_v4)
+        announcer.add(port6, routes_v6)
 
 
-def fib_t1_lag(topo, ptf_ip, no_default_route=False, action="announce"):
+def fib_t1_lag(topo, announcer, no_default_route=False):
     common_config = topo['configuration_properties'].get('common', {})
     podset_number = common_config.get("podset_number", PODSET_NUMBER)
     tor_number = common_config.get("tor_number", TOR_NUMBER)
@@ -309,22 +419,22 @@ def fib_t1_lag(topo, ptf_ip, no_default_route=False, action="announce"):
         tornum = v.get('tornum', None)
         tor_index = tornum - 1 if tornum is not None else None
         if router_type:
-            routes_v4 = generate_routes("v4", podset_number, tor_number, tor_subnet_number,
-                                        None, leaf_asn_start, tor_asn_start,
-                                        nhipv4, nhipv6, tor_subnet_size, max_tor_subnet_number, "t1",
-                                        router_type=router_type, tor_index=tor_index, no_default_route=no_default_route)
-            routes_v6 = generate_routes("v6", podset_number, tor_number, tor_subnet_number,
-                                        None, leaf_asn_start, tor_asn_start,
-                                        nhipv4, nhipv6, tor_subnet_size, max_tor_subnet_number, "t1",
-                                        router_type=router_type, tor_index=tor_index, no_default_route=no_default_route)
-            change_routes(action, ptf_ip, port, routes_v4)
-            change_routes(action, ptf_ip, port6, routes_v6)
+            routes_v4 = iter_routes("v4", podset_number, tor_number, tor_subnet_number,
+                                    None, leaf_asn_start, tor_asn_start,
+                                    nhipv4, nhipv6, tor_subnet_size, max_tor_subnet_number, "t1",
+                                    router_type=router_type, tor_index=tor_index, no_default_route=no_default_route)
+            routes_v6 = iter_routes("v6", podset_number, tor_number, tor_subnet_number,
+                                    None, leaf_asn_start, tor_asn_start,
+                                    nhipv4, nhipv6, tor_subnet_size, max_tor_subnet_number, "t1",
+                                    router_type=router_type, tor_index=tor_index, no_default_route=no_default_route)
+            announcer.add(port, routes_v4)
+            announcer.add(port6, routes_v6)
 
         if 'vips' in v:
             routes_vips = []
             for prefix in v["vips"]["ipv4"]["prefixes"]:
                 routes_vips.append((prefix, nhipv4, v["vips"]["ipv4"]["asn"]))
-            change_routes(action, ptf_ip, port, routes_vips)
+            announcer.add(port, routes_vips)
 
 
 """
@@ -358,7 +468,7 @@ We would have the following distribution:
 """
 
 
-def fib_t2_lag(topo, ptf_ip, action="announce"):
+def fib_t2_lag(topo, announcer):
     vms = topo['topology']['VMs']
     # T1 VMs per linecard(asic) - key is the dut index, and value is a list of T1 VMs
     t1_vms = {}
@@ -377,11 +487,11 @@ def fib_t2_lag(topo, ptf_ip, action="announce"):
             if dut_index not in t3_vms:
                 t3_vms[dut_index] = list()
             t3_vms[dut_index].append(key)
-    generate_t2_routes(t1_vms, topo, ptf_ip, action="announce")
-    generate_t2_routes(t3_vms, topo, ptf_ip, action="announce")
+    generate_t2_routes(t1_vms, topo, announcer)
+    generate_t2_routes(t3_vms, topo, announcer)
 
 
-def generate_t2_routes(dut_vm_dict, topo, ptf_ip, action="announce"):
+def generate_t2_routes(dut_vm_dict, topo, announcer):
     common_config = topo['configuration_properties'].get('common', {})
     vms = topo['topology']['VMs']
     vms_config = topo['configuration']
@@ -425,26 +535,26 @@ def generate_t2_routes(dut_vm_dict, topo, ptf_ip, action="announce"):
             tor_index = None
 
             if router_type:
-                routes_v4 = generate_routes("v4", podset_number, tor_number, tor_subnet_number,
-                                            common_config['dut_asn'], leaf_asn_start, tor_asn_start,
-                                            nhipv4, nhipv6, tor_subnet_size, max_tor_subnet_number, "t2",
-                                            router_type=router_type, tor_index=tor_index, set_num=set_num,
-                                            core_ra_asn=core_ra_asn)
-                routes_v6 = generate_routes("v6", podset_number, tor_number, tor_subnet_number,
-                                            common_config['dut_asn'], leaf_asn_start, tor_asn_start,
-                                            nhipv4, nhipv6, tor_subnet_size, max_tor_subnet_number, "t2",
-                                            router_type=router_type, tor_index=tor_index, set_num=set_num,
-                                            core_ra_asn=core_ra_asn)
-                change_routes(action, ptf_ip, port, routes_v4)
-                change_routes(action, ptf_ip, port6, routes_v6)
+                routes_v4 = iter_routes("v4", podset_number, tor_number, tor_subnet_number,
+                                        common_config['dut_asn'], leaf_asn_start, tor_asn_start,
+                                        nhipv4, nhipv6, tor_subnet_size, max_tor_subnet_number, "t2",
+                                        router_type=router_type, tor_index=tor_index, set_num=set_num,
+                                        core_ra_asn=core_ra_asn)
+                routes_v6 = iter_routes("v6", podset_number, tor_number, tor_subnet_number,
+                                        common_config['dut_asn'], leaf_asn_start, tor_asn_start,
+                                        nhipv4, nhipv6, tor_subnet_size, max_tor_subnet_number, "t2",
+                                        router_type=router_type, tor_index=tor_index, set_num=set_num,
+                                        core_ra_asn=core_ra_asn)
+                announcer.add(port, routes_v4)
+                announcer.add(port6, routes_v6)
 
                 if 'vips' in vms_config[a_vm]:
                     routes_vips = []
                     for prefix in vms_config[a_vm]["vips"]["ipv4"]["prefixes"]:
                         routes_vips.append((prefix, nhipv4, vms_config[a_vm]["vips"]["ipv4"]["asn"]))
-                    change_routes(action, ptf_ip, port, routes_vips)
+                    announcer.add(port, routes_vips)
 
-def fib_t0_mclag(topo, ptf_ip, action="announce"):
+def fib_t0_mclag(topo, announcer):
     common_config = topo['configuration_properties'].get('common', {})
     podset_number = common_config.get("podset_number", PODSET_NUMBER)
     tor_number = common_config.get("tor_number", TOR_NUMBER)
@@ -470,17 +580,17 @@ def fib_t0_mclag(topo, ptf_ip, action="announce"):
         port = IPV4_BASE_PORT + vm_offset
         port6 = IPV6_BASE_PORT + vm_offset
 
-        routes_v4 = generate_routes("v4", podset_number, tor_number, tor_subnet_number,
-                                    spine_asn, leaf_asn_start, tor_asn_start,
-                                    nhipv4, nhipv4, tor_subnet_size, max_tor_subnet_number,
-                                    "t0-mclag", set_num=set_num)
-        routes_v6 = generate_routes("v6", podset_number, tor_number, tor_subnet_number,
-                                    spine_asn, leaf_asn_start, tor_asn_start,
-                                    nhipv6, nhipv6, tor_subnet_size, max_tor_subnet_number,
-                                    "t0-mclag", set_num=set_num)
+        routes_v4 = iter_routes("v4", podset_number, tor_number, tor_subnet_number,
+                                spine_asn, leaf_asn_start, tor_asn_start,
+                                nhipv4, nhipv4, tor_subnet_size, max_tor_subnet_number,
+                                "t0-mclag", set_num=set_num)
+        routes_v6 = iter_routes("v6", podset_number, tor_number, tor_subnet_number,
+                                spine_asn, leaf_asn_start, tor_asn_start,
+                                nhipv6, nhipv6, tor_subnet_size, max_tor_subnet_number,
+                                "t0-mclag", set_num=set_num)
 
-        change_routes(action, ptf_ip, port, routes_v4)
-        change_routes(action, ptf_ip, port6, routes_v6)
+        announcer.add(port, routes_v4)
+        announcer.add(port6, routes_v6)
 
 def main():
     module = AnsibleModule(
@@ -488,7 +598,9 @@ def main():
             topo_name=dict(required=True, type='str'),
             ptf_ip=dict(required=True, type='str'),
             action=dict(required=False, type='str', default='announce', choices=["announce", "withdraw"]),
-            path=dict(required=False, type='str', default='')
+            path=dict(required=False, type='str', default=''),
+            chunk_size=dict(required=False, type='int', default=ROUTE_CHUNK_SIZE),
+            max_workers=dict(required=False, type='int', default=MAX_WORKERS)
         ),
         supports_check_mode=False)
 
@@ -505,24 +617,24 @@ def main():
 
     topo_type = get_topo_type(topo_name)
 
+    announcer = RouteAnnouncer(ptf_ip, action=action, chunk_size=module.params['chunk_size'],
+                               max_workers=module.params['max_workers'])
     try:
         if topo_type == "t0":
-            fib_t0(topo, ptf_ip, no_default_route=is_storage_backend, action=action)
-            module.exit_json(changed=True)
+            fib_t0(topo, announcer, no_default_route=is_storage_backend)
         elif topo_type == "t1":
-            fib_t1_lag(topo, ptf_ip, no_default_route=is_storage_backend, action=action)
-            module.exit_json(changed=True)
+            fib_t1_lag(topo, announcer, no_default_route=is_storage_backend)
         elif topo_type == "t2":
-            fib_t2_lag(topo, ptf_ip, action=action)
-            module.exit_json(changed=True)
+            fib_t2_lag(topo, announcer)
         elif topo_type == "t0-mclag":
-            fib_t0_mclag(topo, ptf_ip, action=action)
-            module.exit_json(changed=True)
+            fib_t0_mclag(topo, announcer)
         else:
             module.exit_json(msg='Unsupported topology "{}" - skipping announcing routes'.format(topo_name))
+        stats = announcer.run()
     except Exception as e:
         module.fail_json(msg='Announcing routes failed, topo_name={}, topo_type={}, exception={}' \
                          .format(topo_name, topo_type, repr(e)))
+    module.exit_json(changed=True, stats=stats)
 
 
 if __name__ == '__main__':
@@ -8,6 +8,9 @@ description: The module scans the 'directory' in search of files which filenames
 The found files are ungzipped and combined together in the rotation order. After that all lines after
 'start_string' are copied into a file with name 'target_filename'. All input strings with 'nsible' in it
 aren't considered as 'start_string' to avoid clashing with ansible output.
+When the inode and size of the log file at the time 'start_string' was written are found in the marker
+index (written by loganalyzer when placing its markers), the file still holding that inode is read from
+that offset instead of scanning all the rotated files.
 
 Options:
     - option-name: directory
@@ -77,6 +80,9 @@ import os
 import gzip
 import re
 import sys
+import json
+import locale
+import shutil
 import hashlib
 import logging
 import logging.handlers
@@ -88,6 +94,10 @@ from ansible.module_utils.basic import *
 
 logger = logging.getLogger('ExtractLog')
 
+# marker index: one file per marker with {log file path: [inode, size before the marker]}
+# written by ansible/roles/test/files/tools/loganalyzer/loganalyzer.py
+MARKER_INDEX_DIR = '/tmp/log_marker_index'
+
 def extract_lines(directory, filename, target_string):
     path = os.path.join(directory, filename)
     file = None
@@ -120,9 +130,6 @@ def extract_number(s):
 def convert_date(fct, s):
     dt = None
     re_result = re.findall(r'^\S{3}\s{1,2}\d{1,2} \d{2}:\d{2}:\d{2}\.?\d*', s)
-    # Workaround for pytest-ansible
-    loc = locale.getlocale()
-    locale.setlocale(locale.LC_ALL, (None, None))
 
     if len(re_result) > 0:
         str_date = '{:04d} '.format(fct.year) + re_result[0]
@@ -140,7 +147,6 @@ def convert_date(fct, s):
         re_result = re.findall(r'^\d{4}-\d{2}-\d{2}\.\d{2}:\d{2}:\d{2}\.\d{6}', s)
         str_date = re_result[0]
         dt = datetime.datetime.strptime(str_date, '%Y-%m-%d.%X.%f')
-    locale.setlocale(locale.LC_ALL, loc)
 
     return dt
 
@@ -207,9 +213,16 @@ def extract_latest_line_with_string(directory, filenames, start_string):
 
     # find the latest line from traget_lines comparing by date in line
     target = target_lines[0] if len(target_lines) > 0 else None
-    for line in target_lines:
-        if comparator(line, target) > 0:
-            target = line
+    if len(target_lines) > 1:
+        # Workaround for pytest-ansible, switch the locale once for all the comparisons
+        loc = locale.getlocale()
+        locale.setlocale(locale.LC_ALL, (None, None))
+        try:
+            for line in target_lines:
+                if comparator(line, target) > 0:
+                    target = line
+        finally:
+            locale.setlocale(locale.LC_ALL, loc)
 
     if target is None:
         raise Exception("{} was not found in {}".format(start_string, directory))
@@ -253,10 +266,75 @@ def combine_logs_and_save(directory, filenames, start_string, target_string, tar
             logger.debug("extract_log combine_logs from file {}, {} lines processed, {} lines copied".format(path, line_processed, line_copied))
 
 
+def load_marker_offset(directory, prefixname, target_string):
+    """Returns [inode, offset] of the log file @directory/@prefixname at the time
+    @target_string was written as saved in the marker index, None if not found"""
+    name = hashlib.md5(target_string.encode('utf-8')).hexdigest()
+    try:
+        with open(os.path.join(MARKER_INDEX_DIR, name + '.json')) as fp:
+            index = json.load(fp)
+    except (IOError, OSError, ValueError):
+        return None
+    if index.get('marker') != target_string:
+        return None
+    return index.get('files', {}).get(os.path.join(directory, prefixname))
+
+
+def copy_file(path, fp):
+    if path.endswith('.gz'):
+        src = gzip.open(path, mode='rb')
+    else:
+        src = open(path, 'rb')
+    with src:
+        shutil.copyfileobj(src, fp)
+
+
+def extract_log_indexed(directory, filenames, target_string, target_filename, entry):
+    """Extracts the log starting from the offset saved in the marker index @entry.
+    Returns False if the file with the saved inode no longer exists (compressed by
+    logrotate) or the start string is not found after the offset"""
+    inode, offset = entry
+    file_with_latest_line = None
+    for filename in filenames:
+        if filename.endswith('.gz'):
+            continue
+        stat = os.stat(os.path.join(directory, filename))
+        if stat.st_ino == inode and stat.st_size >= offset:
+            file_with_latest_line = filename
+            break
+    if file_with_latest_line is None:
+        return False
+
+    target = target_string.encode('utf-8')
+    path = os.path.join(directory, file_with_latest_line)
+    with open(path, 'rb') as src:
+        src.seek(offset)
+        while True:
+            line = src.readline()
+            if not line:
+                return False
+            if target in line and b'extract_log' not in line:
+                break
+        logger.debug("extract_log start file {} offset {} found at {}".format(path, offset, src.tell() - len(line)))
+        files_to_copy = calculate_files_to_copy(filenames, file_with_latest_line)
+        with open(target_filename, 'wb') as fp:
+            fp.write(line)
+            shutil.copyfileobj(src, fp)
+            for filename in reversed(files_to_copy[:-1]):
+                copy_file(os.path.join(directory, filename), fp)
+    logger.debug("extract_log subsequent files {}".format(files_to_copy))
+    return True
+
+
 def extract_log(directory, prefixname, target_string, target_filename):
     logger.debug("extract_log for start string {}".format(target_string.replace("start-", "")))
     filenames = list_files(directory, prefixname)
     logger.debug("extract_log from files {}".format(filenames))
+    entry = load_marker_offset(directory, prefixname, target_string)
+    if entry and extract_log_indexed(directory, filenames, target_string, target_filename, entry):
+        return
+    if entry:
+        logger.debug("extract_log marker index {} not usable, scanning the files".format(entry))
     file_with_latest_line, file_create_time, latest_line, file_size = extract_latest_line_with_string(directory, filenames, target_string)
     m = hashlib.md5()
     m.update(latest_line.encode('utf-8'))
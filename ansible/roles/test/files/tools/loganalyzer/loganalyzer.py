@@ -23,13 +23,20 @@ import re
 import os
 import os.path
 import csv
+import json
 import time
 import pprint
+import hashlib
 import logging
 import logging.handlers
 import subprocess
 from datetime import datetime
 
+try:
+    import re2
+except ImportError:
+    re2 = None
+
 #---------------------------------------------------------------------
 # Global variables
 #---------------------------------------------------------------------
@@ -37,6 +44,11 @@ tokenizer = ','
 comment_key = '#'
 system_log_file = '/var/log/syslog'
 re_rsyslog_pid = re.compile("PID:\s+(\d+)")
+read_block_size = 64 * 1024
+#-- marker index: marker --> {log file path: [inode, size before the marker]}
+#-- one file per marker, also used by ansible/library/extract_log.py
+marker_index_dir = '/tmp/log_marker_index'
+marker_index_max_age = 7 * 24 * 3600
 
 #-- List of ERROR codes to be returned by AnsibleLogAnalyzer
 err_duplicate_start_marker = -1
@@ -48,6 +60,138 @@ err_invalid_input = -6
 err_end_ignore_marker = -7
 err_start_ignore_marker = -8
 
+#---------------------------------------------------------------------
+
+def marker_index_file(marker):
+    '''
+    @summary: Path of the marker index file of the given marker.
+    '''
+    name = hashlib.md5(marker.encode('utf-8')).hexdigest()
+    return os.path.join(marker_index_dir, name + '.json')
+
+#---------------------------------------------------------------------
+
+def decode_line(line):
+    '''
+    @summary: Convert the raw bytes read from the log file to a string.
+    '''
+    if sys.version_info[0] < 3:
+        return line
+    return line.decode('utf-8', 'replace')
+
+#---------------------------------------------------------------------
+
+def read_lines_reverse(log_file, block_size=read_block_size):
+    '''
+    @summary: Generator returning the lines of a file opened in binary mode
+              from the last line to the first one. The file is read in fixed
+              size blocks from the end, so it is never loaded in memory at once.
+    '''
+    log_file.seek(0, os.SEEK_END)
+    position = log_file.tell()
+    tail = b''
+    last_line = True
+    while position > 0:
+        size = min(block_size, position)
+        position -= size
+        log_file.seek(position)
+        parts = (log_file.read(size) + tail).split(b'\n')
+        #-- the first part can continue in the previous block
+        tail = parts.pop(0)
+        for part in reversed(parts):
+            if last_line:
+                #-- text after the last new line in the file
+                last_line = False
+                if part:
+                    yield decode_line(part)
+                continue
+            yield decode_line(part + b'\n')
+    if last_line:
+        if tail:
+            yield decode_line(tail)
+    else:
+        yield decode_line(tail + b'\n')
+
+#---------------------------------------------------------------------
+
+def read_lines_forward(log_file, offset=0):
+    '''
+    @summary: Generator returning the lines of a file opened in binary mode
+              starting from the given byte offset.
+    '''
+    log_file.seek(offset)
+    for line in log_file:
+        yield decode_line(line)
+
+#---------------------------------------------------------------------
+
+def compile_combined(patterns):
+    '''
+    @summary: Compile the given expressions into a single alternation, using the
+              re2 engine when it is installed and supports all the expressions.
+    '''
+    if not patterns:
+        return None
+    pattern = '|'.join(patterns)
+    if re2 is not None:
+        try:
+            return re2.compile(pattern)
+        except Exception:
+            pass
+    return re.compile(pattern)
+
+#---------------------------------------------------------------------
+
+class LineClassifier:
+    '''
+    @summary: Classify log lines as expected, matching or neither in one pass.
+
+    The expect and match expressions are combined into a single expression,
+    so a line that is of no interest, which is the vast majority of lines, is
+    rejected with one search. Only the lines hitting the combined expression
+    are checked against the expect and ignore sets. When the individual expect
+    expressions are given, the ones hit by the expected lines are tracked while
+    classifying, which gives the unused expect expressions without another pass.
+    '''
+
+    EXPECT = 'expect'
+    MATCH = 'match'
+
+    def __init__(self, match_messages_regex, ignore_messages_regex, expect_messages_regex, expect_regex_list=None):
+        self.match_regex = match_messages_regex
+        self.ignore_regex = ignore_messages_regex
+        self.expect_regex = expect_messages_regex
+        if ignore_messages_regex is not None:
+            self.ignore_regex = compile_combined([ignore_messages_regex.pattern])
+        patterns = [regex.pattern for regex in (expect_messages_regex, match_messages_regex) if regex is not None]
+        self.combined = compile_combined(patterns)
+        self.unused_expect = [[item, None] for item in expect_regex_list or []]
+
+    def classify(self, line):
+        if self.combined is None or not self.combined.search(line):
+            return None
+        if self.expect_regex is not None and self.expect_regex.search(line):
+            self.mark_expect_used(line)
+            return self.EXPECT
+        if self.match_regex is None:
+            return None
+        #-- the combined expression is the union of expect and match sets
+        if self.ignore_regex is None or not self.ignore_regex.search(line):
+            return self.MATCH
+        return None
+
+    def mark_expect_used(self, line):
+        unused = []
+        for entry in self.unused_expect:
+            if entry[1] is None:
+                entry[1] = re.compile(entry[0])
+            if not entry[1].search(line):
+                unused.append(entry)
+        self.unused_expect = unused
+
+    def get_unused_expect(self):
+        return [entry[0] for entry in self.unused_expect]
+
 class AnsibleLogAnalyzer:
     '''
     @summary: Overview of functionality
@@ -93,6 +237,7 @@ class AnsibleLogAnalyzer:
         self.run_id = run_id
         self.verbose = verbose
         self.start_marker = start_marker
+        self.classifier = None
     #---------------------------------------------------------------------
 
     def print_diagnostic_message(self, message):
@@ -392,11 +537,17 @@ class AnsibleLogAnalyzer:
 
         return ret_code
 
-    def analyze_file(self, log_file_path, match_messages_regex, ignore_messages_regex, expect_messages_regex):
+    def analyze_file(self, log_file_path, match_messages_regex, ignore_messages_regex, expect_messages_regex,
+                     classifier=None, start_offset=None):
         '''
         @summary: Analyze input file content for messages matching input regex
                   expressions. See line_matches() for details on matching criteria.
 
+                  The file is read backwards in fixed size blocks from the end
+                  marker till the start marker, or forwards from start_offset
+                  when the position of the log at the time of the start marker
+                  is known, so the file is never loaded in memory at once.
+
         @param log_file_path: Patch to the log file.
 
         @param match_messages_regex:
@@ -408,7 +559,9 @@ class AnsibleLogAnalyzer:
         @param expect_messages_regex:
             regex class instance containing messages that are expected to appear in logfile.
 
-        @param end_marker_regex - end marker
+        @param classifier: LineClassifier shared by all the analyzed files.
+
+        @param start_offset: Byte offset in the file before the start marker was placed.
 
         @return: List of strings match search criteria.
         '''
@@ -416,25 +569,38 @@ class AnsibleLogAnalyzer:
 
         self.print_diagnostic_message('analyzing file: %s'% log_file_path)
 
+        if classifier is None:
+            classifier = LineClassifier(match_messages_regex, ignore_messages_regex, expect_messages_regex)
+
         #-- indicates whether log analyzer currently is in the log range between start
         #-- and end marker. see analyze_file method.
         check_marker = self.require_marker_check(log_file_path)
         in_analysis_range = not check_marker
         stdin_as_input = self.is_filename_stdin(log_file_path)
+
+        if check_marker and not stdin_as_input and start_offset is not None:
+            with open(log_file_path, 'rb') as log_file:
+                result = self.analyze_lines_forward(read_lines_forward(log_file, start_offset), classifier)
+            if result is not None:
+                return result
+            self.print_diagnostic_message('start marker not found after offset %d' % start_offset)
+
         matching_lines = []
         expected_lines = []
         found_start_marker = False
         found_end_marker = False
         if stdin_as_input:
-            log_file = sys.stdin
+            log_file = None
+            rev_lines = reversed(sys.stdin.readlines())
         else:
-            log_file = open(log_file_path, 'r')
+            log_file = open(log_file_path, 'rb')
+            rev_lines = read_lines_reverse(log_file)
 
         start_marker = self.create_start_marker()
         end_marker = self.create_end_marker()
 
         ignore_marker_run_ids = []
-        for rev_line in reversed(log_file.readlines()):
+        for rev_line in rev_lines:
             if stdin_as_input:
                 in_analysis_range = True
             else:
@@ -486,12 +652,16 @@ class AnsibleLogAnalyzer:
                 # without much insight while they are time consuming to analyze
                 if not check_marker and len(rev_line) > 1000:
                     continue
-                if self.line_is_expected(rev_line, expect_messages_regex):
+                kind = classifier.classify(rev_line)
+                if kind == LineClassifier.EXPECT:
                     expected_lines.append(rev_line)
 
-                elif self.line_matches(rev_line, match_messages_regex, ignore_messages_regex):
+                elif kind == LineClassifier.MATCH:
                     matching_lines.append(rev_line)
 
+        if log_file is not None:
+            log_file.close()
+
         # care about the markers only if input is not stdin or no need to check start marker
         if not stdin_as_input and check_marker:
             if (not found_start_marker):
@@ -505,7 +675,128 @@ class AnsibleLogAnalyzer:
         return matching_lines, expected_lines
     #---------------------------------------------------------------------
 
-    def analyze_file_list(self, log_file_list, match_messages_regex, ignore_messages_regex, expect_messages_regex):
+    def analyze_lines_forward(self, lines, classifier):
+        '''
+        @summary: Analyze the lines between the start and end markers reading
+                  the file forwards. Same checks as analyze_file in reverse order.
+
+        @return: matching and expected lines in the order used by analyze_file
+                 i.e. last line first, or None if the start marker is not found.
+        '''
+        matching_lines = []
+        expected_lines = []
+        found_start_marker = False
+        in_analysis_range = False
+        start_marker = self.create_start_marker()
+        end_marker = self.create_end_marker()
+
+        ignore_marker_run_ids = []
+        for line in lines:
+            if not found_start_marker:
+                if line.find(start_marker) != -1 and 'extract_log' not in line:
+                    self.print_diagnostic_message('found start marker: %s' % start_marker)
+                    found_start_marker = True
+                    in_analysis_range = True
+                continue
+
+            if end_marker in line:
+                self.print_diagnostic_message('found end marker: %s' % end_marker)
+                if not in_analysis_range:
+                    print('ERROR: found end marker inside the ignore markers')
+                    sys.exit(err_start_ignore_marker)
+                break
+            elif self.start_ignore_marker_prefix in line:
+                marker_run_id = line.split(self.start_ignore_marker_prefix)[1]
+                ignore_marker_run_ids.append(marker_run_id)
+                self.print_diagnostic_message('found start ignore marker: %s'
+                                              % line[line.index(self.start_ignore_marker_prefix):])
+                if not in_analysis_range:
+                    print('ERROR: unexpected start ignore marker found')
+                    sys.exit(err_start_ignore_marker)
+                in_analysis_range = False
+                continue
+            elif self.end_ignore_marker_prefix in line:
+                marker_run_id = ignore_marker_run_ids.pop() if ignore_marker_run_ids else None
+                self.print_diagnostic_message('found end ignore marker: %s'
+                                              % line[line.index(self.end_ignore_marker_prefix):])
+                if in_analysis_range or marker_run_id not in line:
+                    print('ERROR: duplicate end ignore marker found')
+                    sys.exit(err_end_ignore_marker)
+                in_analysis_range = True
+                continue
+            elif line.find(start_marker) != -1 and 'extract_log' not in line:
+                print('ERROR: duplicate start marker found')
+                sys.exit(err_duplicate_start_marker)
+
+            if in_analysis_range:
+                kind = classifier.classify(line)
+                if kind == LineClassifier.EXPECT:
+                    expected_lines.append(line)
+                elif kind == LineClassifier.MATCH:
+                    matching_lines.append(line)
+        else:
+            if not found_start_marker:
+                return None
+            print('ERROR: end marker was not found')
+            sys.exit(err_no_end_marker)
+
+        matching_lines.reverse()
+        expected_lines.reverse()
+        return matching_lines, expected_lines
+    #---------------------------------------------------------------------
+
+    def save_offsets(self, marker, log_file_list):
+        '''
+        @summary: Remember the inode and current size of the log files before
+                  placing the marker, so that the analysis and extract_log can
+                  start reading from there. Saved in the marker index shared
+                  with extract_log, see marker_index_file.
+        '''
+        offsets = {}
+        for log_file in log_file_list + [system_log_file]:
+            try:
+                stat = os.stat(log_file)
+                offsets[log_file] = [stat.st_ino, stat.st_size]
+            except OSError:
+                continue
+        try:
+            if not os.path.isdir(marker_index_dir):
+                os.makedirs(marker_index_dir)
+            #-- drop the entries of the markers which are never analyzed
+            for name in os.listdir(marker_index_dir):
+                path = os.path.join(marker_index_dir, name)
+                if time.time() - os.path.getmtime(path) > marker_index_max_age:
+                    os.remove(path)
+            with open(marker_index_file(marker), 'w') as out_file:
+                json.dump({"marker": marker, "files": offsets}, out_file)
+        except (IOError, OSError) as e:
+            self.print_diagnostic_message('failed to save offsets: %s' % repr(e))
+
+    def load_offsets(self, marker):
+        '''
+        @summary: Get the offsets saved by save_offsets for the files which were
+                  not rotated or truncated since then.
+        '''
+        offsets = {}
+        try:
+            with open(marker_index_file(marker)) as in_file:
+                saved = json.load(in_file)
+        except (IOError, OSError, ValueError):
+            return offsets
+        if saved.get("marker") != marker:
+            return offsets
+        for log_file, (inode, size) in saved["files"].items():
+            try:
+                stat = os.stat(log_file)
+            except OSError:
+                continue
+            if stat.st_ino == inode and stat.st_size >= size:
+                offsets[log_file] = size
+        return offsets
+    #---------------------------------------------------------------------
+
+    def analyze_file_list(self, log_file_list, match_messages_regex, ignore_messages_regex, expect_messages_regex,
+                          expect_regex_list=None, offsets=None):
         '''
         @summary: Analyze input files messages matching input regex expressions.
             See line_matches() for details on matching criteria.
@@ -521,14 +812,25 @@ class AnsibleLogAnalyzer:
         @param expect_messages_regex:
             regex class instance containing messages that are expected to appear in logfile.
 
+        @param expect_regex_list:
+            individual expressions of expect_messages_regex, the ones not found in
+            any of the files are available from get_unused_expect_regex() after the call.
+
+        @param offsets: map <file_name, byte offset to start the analysis from>
+
         @return: Returns map <file_name, list_of_matching_strings>
         '''
         res = {}
+        offsets = offsets or {}
+        self.classifier = LineClassifier(match_messages_regex, ignore_messages_regex,
+                                         expect_messages_regex, expect_regex_list)
 
         for log_file in log_file_list:
             if not len(log_file):
                 continue
-            match_strings, expect_strings = self.analyze_file(log_file, match_messages_regex, ignore_messages_regex, expect_messages_regex)
+            match_strings, expect_strings = self.analyze_file(log_file, match_messages_regex, ignore_messages_regex,
+                                                              expect_messages_regex, self.classifier,
+                                                              offsets.get(log_file, None))
 
             match_strings.reverse()
             expect_strings.reverse()
@@ -537,6 +839,14 @@ class AnsibleLogAnalyzer:
         return res
     #---------------------------------------------------------------------
 
+    def get_unused_expect_regex(self):
+        '''
+        @summary: Expect expressions not found in the files analyzed by the last
+                  analyze_file_list call.
+        '''
+        return self.classifier.get_unused_expect() if self.classifier else []
+    #---------------------------------------------------------------------
+
 def usage():
     print('loganalyzer input parameters:')
     print('--help                           Print usage')
@@ -546,6 +856,8 @@ def usage():
     print('                                 to all log files specified in --logs parameter.')
     print('                                 analyze - perform log analysis of files specified in --logs parameter.')
     print('                                 add_end_marker - add end marker to all log files specified in --logs parameter.')
+    print('                                 analyze_summary - analyze the already extracted files specified in --logs')
+    print('                                 parameter with the expressions in --regex_file and print the result as JSON.')
     print('--out_dir path                   Directory path where to place output files, ')
     print('                                 must be present when --action == analyze')
     print('--logs path{,path}               List of full paths to log files to be analyzed.')
@@ -564,10 +876,12 @@ def usage():
     print('                                 All the strings from these files will be expected to present')
     print('                                 in one of specified log files during the analysis. Must be present')
     print('                                 when action == analyze.')
+    print('--regex_file path                JSON file with "match", "ignore" and "expect" lists of regular')
+    print('                                 expressions. Must be present when action == analyze_summary.')
 
 #---------------------------------------------------------------------
 
-def check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in, expect_files_in):
+def check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in, expect_files_in, regex_file=None):
     '''
     @summary: This function validates command line parameter 'action' and
         other related parameters.
@@ -579,6 +893,10 @@ def check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in,
 
     if action in ['init', 'add_end_marker', 'add_start_ignore_mark', 'add_end_ignore_mark']:
         ret_code = True
+    elif action == 'analyze_summary':
+        if regex_file is None or len(regex_file) == 0 or len(log_files_in) == 0:
+            print('ERROR: missing required regex_file or logs for analyze_summary action')
+            ret_code = False
     elif action == 'analyze':
         if out_dir is None or len(out_dir) == 0:
             print('ERROR: missing required out_dir for analyze action')
@@ -614,7 +932,7 @@ def check_run_id(run_id):
     return ret_code
 #---------------------------------------------------------------------
 
-def write_result_file(run_id, out_dir, analysis_result_per_file, messages_regex_e, unused_regex_messages):
+def write_result_file(run_id, out_dir, analysis_result_per_file, unused_regex_messages):
     '''
     @summary: Write results of analysis into a file.
 
@@ -624,12 +942,13 @@ def write_result_file(run_id, out_dir, analysis_result_per_file, messages_regex_
 
     @param analysis_result_per_file: map file_name: [list of found matching strings]
 
+    @param unused_regex_messages: expect expressions not found in any of the files
+
     @return: void
     '''
 
     match_cnt = 0
     expected_cnt = 0
-    expected_lines_total = []
 
     with open(out_dir + "/result.loganalysis." + run_id + ".log", 'w') as out_file:
         for key, val in analysis_result_per_file.items():
@@ -645,20 +964,11 @@ def write_result_file(run_id, out_dir, analysis_result_per_file, messages_regex_
 
             for i in expected_lines:
                 out_file.write(i)
-                expected_lines_total.append(i)
             out_file.write('\nExpected and found matches:%d\n' % len(expected_lines))
             expected_cnt += len(expected_lines)
 
         out_file.write("\n-------------------------------------------------\n\n")
         out_file.write('Total matches:%d\n' % match_cnt)
-        # Find unused regex matches
-        for regex in messages_regex_e:
-            for line in expected_lines_total:
-                if re.search(regex, line):
-                    break
-            else:
-                unused_regex_messages.append(regex)
-
         out_file.write('Total expected and found matches:%d\n' % expected_cnt)
         out_file.write('Total expected but not found matches: %d\n\n' % len(unused_regex_messages))
         for regex in unused_regex_messages:
@@ -705,6 +1015,43 @@ def write_summary_file(run_id, out_dir, analysis_result_per_file, unused_regex_m
     out_file.close()
 #---------------------------------------------------------------------
 
+def print_json_summary(analyzer, log_file_list, regex_file):
+    '''
+    @summary: Analyze the given files and print the matching and expected lines
+        along with the unused expect expressions as JSON, so that the caller
+        gets the result of the analysis without downloading the files.
+
+    @param analyzer: AnsibleLogAnalyzer instance.
+
+    @param log_file_list: List of paths to the extracted log files.
+
+    @param regex_file: JSON file with "match", "ignore" and "expect" lists of expressions.
+
+    @return: Number of matching lines
+    '''
+    with open(regex_file) as in_file:
+        regex = json.load(in_file)
+
+    def compile_list(name):
+        items = regex.get(name, [])
+        return re.compile('|'.join(items)) if items else None
+
+    def to_text(lines):
+        if sys.version_info[0] < 3:
+            return [line.decode('utf-8', 'replace') for line in lines]
+        return lines
+
+    result = analyzer.analyze_file_list(log_file_list, compile_list('match'), compile_list('ignore'),
+                                        compile_list('expect'), regex.get('expect', []))
+    summary = {"result": {}, "unused_expected_regexp": analyzer.get_unused_expect_regex()}
+    match_cnt = 0
+    for log_file, (matching_lines, expected_lines) in result.items():
+        summary["result"][log_file] = [to_text(matching_lines), to_text(expected_lines)]
+        match_cnt += len(matching_lines)
+    print(json.dumps(summary))
+    return match_cnt
+#---------------------------------------------------------------------
+
 def main(argv):
 
     action = None
@@ -715,10 +1062,11 @@ def main(argv):
     match_files_in = None
     ignore_files_in = None
     expect_files_in = None
+    regex_file = None
     verbose = False
 
     try:
-        opts, args = getopt.getopt(argv, "a:r:s:l:o:m:i:e:vh", ["action=", "run_id=", "start_marker=", "logs=", "out_dir=", "match_files_in=", "ignore_files_in=", "expect_files_in=", "verbose", "help"])
+        opts, args = getopt.getopt(argv, "a:r:s:l:o:m:i:e:x:vh", ["action=", "run_id=", "start_marker=", "logs=", "out_dir=", "match_files_in=", "ignore_files_in=", "expect_files_in=", "regex_file=", "verbose", "help"])
 
     except getopt.GetoptError:
         print("Invalid option specified")
@@ -754,10 +1102,13 @@ def main(argv):
         elif (opt in ("-e", "--expect_files_in")):
             expect_files_in = arg
 
+        elif (opt in ("-x", "--regex_file")):
+            regex_file = arg
+
         elif (opt in ("-v", "--verbose")):
             verbose = True
 
-    if not (check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in, expect_files_in) and check_run_id(run_id)):
+    if not (check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in, expect_files_in, regex_file) and check_run_id(run_id)):
         usage()
         sys.exit(err_invalid_input)
 
@@ -767,6 +1118,7 @@ def main(argv):
 
     result = {}
     if action == "init":
+        analyzer.save_offsets(analyzer.create_start_marker(), log_file_list)
         analyzer.place_marker(log_file_list, analyzer.create_start_marker())
         return 0
     elif action == "analyze":
@@ -785,10 +1137,14 @@ def main(argv):
             log_file_list.append(system_log_file)
 
         result = analyzer.analyze_file_list(log_file_list, match_messages_regex,
-                                            ignore_messages_regex, expect_messages_regex)
-        unused_regex_messages = []
-        write_result_file(run_id, out_dir, result, messages_regex_e, unused_regex_messages)
+                                            ignore_messages_regex, expect_messages_regex,
+                                            messages_regex_e, analyzer.load_offsets(analyzer.create_start_marker()))
+        unused_regex_messages = analyzer.get_unused_expect_regex()
+        write_result_file(run_id, out_dir, result, unused_regex_messages)
         write_summary_file(run_id, out_dir, result, unused_regex_messages)
+    elif action == "analyze_summary":
+        print_json_summary(analyzer, log_file_list, regex_file)
+        return 0
     elif action == "add_end_marker":
         analyzer.place_marker(log_file_list, analyzer.create_end_marker(), wait_for_marker=True)
         return 0
@@ -2,6 +2,7 @@ import os
 import copy
 import socket
 import logging
+import threading
 import netmiko
 
 from .sonic_connection import SonicBaseConnection
@@ -152,39 +153,87 @@ def DeviceConnection(**kws):
     if last_exception:
         raise last_exception
 
+# idle SSH connections used only for file transfers, keyed by (ip, username)
+# and kept open across transfers unless SPYTEST_TRANSFER_POOL is 0;
+# a connection is taken out of the pool while a transfer is using it
+transfer_connections = dict()
+transfer_lock = threading.Lock()
+
+def _get_transfer_connection(net_connect, connection_param):
+    if not connection_param["mgmt-ip"]:
+        return net_connect
+    dev = {
+        'device_type': 'sonic_ssh',
+        'username': connection_param["username"],
+        'password': connection_param["password"],
+        'altpassword': connection_param["altpassword"],
+        'ip': connection_param["mgmt-ip"],
+    }
+    if "altpassword" in connection_param:
+        dev["altpassword"] = connection_param["altpassword"]
+    if os.getenv("SPYTEST_TRANSFER_POOL", "1") == "0":
+        return DeviceConnection(**dev)
+    key = (dev["ip"], dev["username"])
+    while True:
+        with transfer_lock:
+            idle = transfer_connections.get(key, None)
+            conn = idle.pop() if idle else None
+        if not conn:
+            break
+        try:
+            if conn.is_alive():
+                return conn
+        except Exception:
+            pass
+        _disconnect(conn)
+    conn = DeviceConnection(**dev)
+    conn.spytest_transfer_key = key
+    return conn
+
+def _put_transfer_connection(net_connect, conn, failed=False):
+    if conn is net_connect:
+        return
+    key = getattr(conn, "spytest_transfer_key", None)
+    if failed or key is None:
+        _disconnect(conn)
+        return
+    with transfer_lock:
+        transfer_connections.setdefault(key, []).append(conn)
+
+def _disconnect(conn):
+    try:
+        conn.disconnect()
+    except Exception:
+        pass
+
+def DeviceFileTransferClose(ip=None):
+    conns = []
+    with transfer_lock:
+        for key in list(transfer_connections.keys()):
+            if ip is None or key[0] == ip:
+                conns.extend(transfer_connections.pop(key))
+    for conn in conns:
+        _disconnect(conn)
+
 def DeviceFileUpload(net_connect, src_file, dst_file, connection_param):
-    if connection_param["mgmt-ip"]:
-        dev = {
-            'device_type': 'sonic_ssh',
-            'username': connection_param["username"],
-            'password': connection_param["password"],
-            'altpassword': connection_param["altpassword"],
-            'ip': connection_param["mgmt-ip"],
-        }
-        if "altpassword" in connection_param:
-            dev["altpassword"] = connection_param["altpassword"]
-        net_connect = DeviceConnection(**dev)
-    scp_conn = netmiko.SCPConn(net_connect)
-    scp_conn.scp_transfer_file(src_file, dst_file)
-    scp_conn.close()
-    if connection_param["mgmt-ip"]:
-        net_connect.disconnect()
+    conn = _get_transfer_connection(net_connect, connection_param)
+    try:
+        scp_conn = netmiko.SCPConn(conn)
+        scp_conn.scp_transfer_file(src_file, dst_file)
+        scp_conn.close()
+    except Exception:
+        _put_transfer_connection(net_connect, conn, True)
+        raise
+    _put_transfer_connection(net_connect, conn)
 
 def DeviceFileDownload(net_connect, src_file, dst_file, connection_param):
-    if connection_param["mgmt-ip"]:
-        dev = {
-            'device_type': 'sonic_ssh',
-            'username': connection_param["username"],
-            'password': connection_param["password"],
-            'altpassword': connection_param["altpassword"],
-            'ip': connection_param["mgmt-ip"],
-        }
-        if "altpassword" in connection_param:
-            dev["altpassword"] = connection_param["altpassword"]
-        net_connect = DeviceConnection(**dev)
-    scp_conn = netmiko.SCPConn(net_connect)
-    scp_conn.scp_get_file(src_file, dst_file)
-    scp_conn.close()
-    if connection_param["mgmt-ip"]:
-        net_connect.disconnect()
+    conn = _get_transfer_connection(net_connect, connection_param)
+    try:
+        scp_conn = netmiko.SCPConn(conn)
+        scp_conn.scp_get_file(src_file, dst_file)
+        scp_conn.close()
+    except Exception:
+        _put_transfer_connection(net_connect, conn, True)
+        raise
+    _put_transfer_connection(net_connect, conn)
 
@@ -0,0 +1,111 @@
+import os
+import sys
+import gzip
+import time
+import base64
+import random
+import hashlib
+import tempfile
+
+def encode(src_file, compress=True, width=76):
+    """
+    Reads the given file and returns the base64 lines to be echoed
+    on the device along with the flag indicating if it is compressed.
+    Compression is skipped when it does not reduce the size.
+    """
+    with open(src_file, "rb") as fh:
+        data = fh.read()
+    compressed = False
+    if compress and data:
+        zdata = gzip_compress(data)
+        if len(zdata) < len(data):
+            data, compressed = zdata, True
+    encoded = base64.b64encode(data)
+    if sys.version_info[0] >= 3:
+        encoded = encoded.decode()
+    lines = [encoded[i:i+width] for i in range(0, len(encoded), width)]
+    return lines or [""], compressed
+
+def gzip_compress(data):
+    if sys.version_info[0] >= 3:
+        return gzip.compress(data, 6)
+    import io
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=6) as fh:
+        fh.write(data)
+    return buf.getvalue()
+
+def chunks(lines, split):
+    """
+    joins the base64 lines into one echo payload per CLI round-trip
+    """
+    return ["".join(lines[i:i+split]) for i in range(0, len(lines), split)]
+
+def commands(src_file, dst_file, split, compress=True):
+    """
+    returns the shell commands to recreate the given file on the device
+    the first and last commands are setup and decode, every other one
+    needs a prompt round-trip
+    """
+    lines, compressed = encode(src_file, compress)
+    script_cmds = ["rm -f {0}.tmp {0}".format(dst_file)]
+    redir = ">"
+    for line in chunks(lines, split):
+        script_cmds.append("echo {} {} {}.tmp".format(line, redir, dst_file))
+        redir = ">>"
+    if compressed:
+        script_cmds.append("base64 -d {0}.tmp | gunzip -c > {0}".format(dst_file))
+    else:
+        script_cmds.append("base64 -d {0}.tmp > {0}".format(dst_file))
+    script_cmds.append("rm -f {0}.tmp".format(dst_file))
+    return script_cmds
+
+def md5(src_file):
+    hash_md5 = hashlib.md5()
+    with open(src_file, "rb") as fh:
+        for chunk in iter(lambda: fh.read(65536), b""):
+            hash_md5.update(chunk)
+    return hash_md5.hexdigest()
+
+def _make_config(size):
+    # synthetic config_db style content with realistic repetition
+    rnd = random.Random(size)
+    lines, total = ["{"], 0
+    while total < size:
+        index = rnd.randint(0, 4096)
+        line = '    "Ethernet{0}": {{"admin_status": "up", "alias": "Eth1/{0}", ' \
+               '"lanes": "{1},{2},{3},{4}", "mtu": "9100", "speed": "{5}"}},'
+        line = line.format(index, index*4, index*4+1, index*4+2, index*4+3,
+                           rnd.choice(["10000", "25000", "100000"]))
+        lines.append(line)
+        total = total + len(line) + 1
+    lines.append("}")
+    return "\n".join(lines)
+
+def benchmark(sizes=None, split=100, rtt=0.05, baud=115200):
+    """
+    compares plain and compressed console transfer for the given sizes
+    reporting the encode time, bytes on the wire and round-trips; the
+    transfer time is estimated from the prompt round-trip and line rate
+    """
+    sizes = sizes or [1024*1024, 10*1024*1024]
+    print("{:>10} {:>6} {:>10} {:>12} {:>8} {:>10}".format(
+          "Size", "Mode", "Encode(s)", "Wire(bytes)", "Cmds", "Est(s)"))
+    for size in sizes:
+        fd, src_file = tempfile.mkstemp(suffix=".json")
+        os.write(fd, _make_config(size).encode())
+        os.close(fd)
+        try:
+            for compress in [False, True]:
+                start = time.time()
+                script_cmds = commands(src_file, "/tmp/dst.json", split, compress)
+                encode_time = time.time() - start
+                wire = sum([len(cmd) for cmd in script_cmds])
+                print("{:>10} {:>6} {:>10.3f} {:>12} {:>8} {:>10.1f}".format(
+                      size, "gzip" if compress else "plain", encode_time, wire,
+                      len(script_cmds), len(script_cmds) * rtt + wire * 10.0 / baud))
+        finally:
+            os.unlink(src_file)
+
+if __name__ == "__main__":
+    benchmark([int(arg) for arg in sys.argv[1:]])
@@ -2,6 +2,8 @@ import os
 import re
 import sys
 import csv
+import glob
+import heapq
 import shutil
 import logging
 from random import randint
@@ -54,6 +56,7 @@ wa.default_model_topo_pref = "default"
 wa.module_csv = None
 wa.augment_modules_csv = []
 wa.repeat_info = True
+wa.module_durations = {}
 
 #logging.basicConfig(level=logging.DEBUG)
 #wa.logger = logging.getLogger()
@@ -106,6 +109,47 @@ def load_module_csv():
         module_row.extend(row[3:])
         wa.module_rows.append(module_row)
 
+def load_module_durations():
+    """
+    read the module execution times from the modules report csv files
+    of the previous runs given in SPYTEST_BATCH_MODULE_DURATIONS
+    which is comma separated list of files, patterns or logs folders
+    returns module name --> average execution time in seconds
+    """
+    wa.module_durations = {}
+    entries = env.get("SPYTEST_BATCH_MODULE_DURATIONS")
+    if not entries: return wa.module_durations
+    files = []
+    for entry in entries.split(","):
+        entry = entry.strip()
+        if not entry: continue
+        if os.path.isdir(entry):
+            matched = glob.glob(os.path.join(entry, "*_result_all_modules.csv"))
+            files.extend(matched or glob.glob(os.path.join(entry, "*_result_modules.csv")))
+        else:
+            files.extend(glob.glob(entry))
+    samples = {}
+    for filepath in files:
+        rows = utils.read_csv(filepath)
+        if not rows: continue
+        try:
+            name_col = rows[0].index("Module Name")
+            time_col = rows[0].index("Exec Time")
+        except ValueError:
+            trace("module durations not found in {}".format(filepath))
+            continue
+        for row in rows[1:]:
+            if len(row) <= max(name_col, time_col): continue
+            name = row[name_col].strip()
+            if not name or name.startswith("===="): continue
+            secs = utils.time_parse(row[time_col])
+            if secs <= 0: continue
+            samples.setdefault(name, []).append(secs)
+    for name, values in samples.items():
+        wa.module_durations[name] = float(sum(values)) / len(values)
+    trace("Loaded execution time of {} modules from {} files".format(len(wa.module_durations), len(files)))
+    return wa.module_durations
+
 def init_type_nodes():
 
     backup_nodes = env.get("SPYTEST_BATCH_BACKUP_NODES")
@@ -260,6 +304,7 @@ class SpyTestScheduling(object):
         else:
             self.count = 1
         self.order_support = True
+        self.module_order = env.get("SPYTEST_BATCH_MODULE_ORDER", "0") != "0"
         self.topo_support = True
         self.node_modules = {}
         self.collection = []
@@ -274,6 +319,11 @@ class SpyTestScheduling(object):
         self.default_topo = ""
         self.max_order = self.default_order
         self._load_buckets()
+        self.durations = {}
+        self.default_duration = 0
+        self.predicted = {}
+        self.makespan_reported = False
+        self._load_durations()
 
         self.test_spytest_infra_first = None
         self.test_spytest_infra_second = None
@@ -312,6 +362,20 @@ class SpyTestScheduling(object):
                 else:
                     self.base_names[basename] = name
 
+    def _load_durations(self):
+        durations = load_module_durations()
+        if not durations: return
+        self.durations.update(durations)
+        for name, secs in durations.items():
+            self.durations.setdefault(os.path.basename(name), secs)
+        default = utils.integer_parse(env.get("SPYTEST_BATCH_MODULE_DEFAULT_DURATION", "0"), 0)
+        self.default_duration = default or float(sum(durations.values())) / len(durations)
+
+    def get_module_duration(self, mname):
+        if mname in self.durations:
+            return self.durations[mname]
+        return self.durations.get(os.path.basename(mname), self.default_duration)
+
     def add_node(self, node):
         self.node_modules[node] = []
 
@@ -424,6 +488,7 @@ class SpyTestScheduling(object):
                 self.add_nodeid(nodeid, "load", self.main_modules)
         report("save", "", "")
         self.update_matching_modes(self.main_modules, True)
+        self._predict_makespan()
 
     def find_active_nodes(self, names):
         active = []
@@ -592,24 +657,100 @@ class SpyTestScheduling(object):
                 return True
         return False
 
-    def _assign_test(self, node, name, modules):
-        slave = self.wa.slaves[name]
+    # first module in the modules.csv order
+    # without SPYTEST_BATCH_MODULE_ORDER the module data is looked up by node name as before,
+    # which gives every module the default order and keeps the collection order
+    def _find_first(self, name, modules):
         for order in range(0, self.max_order + 1):
             for mname,minfo in modules.items():
                 if name not in minfo.nodes: continue
-                md = self.get_module_data(name, minfo.used_tpref)
+                md = self.get_module_data(mname if self.module_order else name, minfo.used_tpref)
                 if self.order_support and md.order != order:
                     continue
-                if not self._assign_pretest(node, name):
-                    del modules[mname]
-                    self.node_modules[node].extend(minfo.node_indexes)
-                    slave.assigned = slave.assigned + len(minfo.node_indexes)
-                    debug("ASSIGNED", name, md.order, mname, minfo.node_indexes)
-                    for item_index in minfo.node_indexes:
-                        report("add", self.collection[item_index], node.gateway.id)
-                    report("save", "", "")
-                return True
-        return False
+                return mname, md.order
+        return None, None
+
+    # longest module in the lowest order based on the previous runs
+    def _find_longest(self, name, modules):
+        (found, found_key) = (None, None)
+        for mname,minfo in modules.items():
+            if name not in minfo.nodes: continue
+            md = self.get_module_data(mname, minfo.used_tpref)
+            order = md.order if self.order_support else 0
+            key = (order, -self.get_module_duration(mname))
+            if found_key is None or key < found_key:
+                (found, found_key) = (mname, key)
+        if found is None:
+            return None, None
+        return found, found_key[0]
+
+    def _assign_test(self, node, name, modules):
+        slave = self.wa.slaves[name]
+        find_func = self._find_longest if self.durations else self._find_first
+        mname, order = find_func(name, modules)
+        if mname is None:
+            return False
+        if not self._assign_pretest(node, name):
+            minfo = modules.pop(mname)
+            self.node_modules[node].extend(minfo.node_indexes)
+            slave.assigned = slave.assigned + len(minfo.node_indexes)
+            debug("ASSIGNED", name, order, mname, minfo.node_indexes)
+            for item_index in minfo.node_indexes:
+                report("add", self.collection[item_index], node.gateway.id)
+            report("save", "", "")
+        return True
+
+    # simulate the assignment of the modules to the main nodes
+    # as and when the nodes become free, using the module durations
+    def _simulate(self, find_func):
+        modules = SpyTestDict()
+        for mname, minfo in self.main_modules.items():
+            modules[mname] = minfo
+        (loads, heap) = ({}, [])
+        for name, slave in self.wa.slaves.items():
+            if slave.node_type != "Main" or slave.excluded: continue
+            loads[name] = 0
+            heap.append((0, name))
+        heapq.heapify(heap)
+        while heap and modules:
+            (free_at, name) = heapq.heappop(heap)
+            mname, _ = find_func(name, modules)
+            if mname is None: continue
+            modules.pop(mname)
+            loads[name] = free_at + self.get_module_duration(mname)
+            heapq.heappush(heap, (loads[name], name))
+        return loads
+
+    def _predict_makespan(self):
+        if not self.durations: return
+        self.predicted = self._simulate(self._find_longest)
+        in_order = self._simulate(self._find_first)
+        predicted = max(list(self.predicted.values()) + [0])
+        in_order = max(list(in_order.values()) + [0])
+        msg = "Predicted makespan {} with longest modules first, {} in modules.csv order"
+        trace(msg.format(utils.time_format(int(predicted)), utils.time_format(int(in_order))))
+
+    # compare the predicted makespan with actual once all the started nodes are finished
+    def report_makespan(self):
+        if not self.predicted or self.makespan_reported: return
+        slaves = [slave for slave in self.wa.slaves.values() if slave.start_time]
+        if not slaves: return
+        if any(slave.completed is False for slave in slaves): return
+        self.makespan_reported = True
+        (header, rows) = (["Node", "Predicted", "Actual"], [])
+        for slave in slaves:
+            actual = (slave.complete_time - slave.start_time).total_seconds()
+            predicted = self.predicted.get(slave.name, 0)
+            rows.append([slave.name, utils.time_format(int(predicted)), utils.time_format(int(actual))])
+        start = min(slave.start_time for slave in slaves)
+        end = max(slave.complete_time for slave in slaves)
+        actual = (end - start).total_seconds()
+        predicted = max(list(self.predicted.values()) + [0])
+        rows.append(["Total", utils.time_format(int(predicted)), utils.time_format(int(actual))])
+        trace("Makespan predicted {} actual {}".format(utils.time_format(int(predicted)),
+                                                       utils.time_format(int(actual))))
+        filepath = os.path.join(wa.logs_path, "batch_makespan.csv")
+        utils.write_csv_file(header, rows, filepath)
 
     def _schedule_node(self, node):
         name = node.gateway.id
@@ -1134,6 +1275,7 @@ def finish_node(node, error, reader):
             utils.delete_file(os.path.join(wa.logs_path, slave.name, "node_used"))
 
     wa.sched.schedule(node.gateway.id, error)
+    wa.sched.report_makespan()
     _show_testbed_info()
     save_report()
 
@@ -1272,6 +1414,13 @@ def parse_args(numprocesses, buckets_csv, logs_path, augment_modules_csv):
     filename = env.get("SPYTEST_TESTBED_FILE", "testbed.yaml")
     parts = filename.split(",")
     count = len(parts)
+
+    # share the parsed yaml files with the workers
+    if numprocesses or count > 1 or buckets_csv:
+        if logs_path and not env.get("SPYTEST_YAML_CACHE_DIR"):
+            yaml_cache_dir = os.path.join(logs_path, "yaml_cache")
+            os.environ["SPYTEST_YAML_CACHE_DIR"] = yaml_cache_dir
+
     if env.get("SPYTEST_FILE_MODE", "0") != "0":
         if numprocesses and count < numprocesses:
             for _ in range(count, numprocesses):
@@ -21,6 +21,7 @@ defaults = {
     "SPYTEST_MGMT_IFNAME": "eth0",
     "SPYTEST_TOPO_SEP": None,
     "SPYTEST_TESTBED_RANDOMIZE_DEVICES": "0",
+    "SPYTEST_TESTBED_TOPO_SOLVER": "1",
     "SPYTEST_BUCKETS_DEADNODE_RECOVERY": "1",
     "SPYTEST_BATCH_DEFAULT_BUCKET": "1",
     "SPYTEST_TOPO_1": "D1T1:2",
@@ -86,6 +87,9 @@ dev_defaults = {
     "SPYTEST_BATCH_MODULE_TOPO_PREF": None,
     "SPYTEST_BATCH_MATCHING_BUCKET_ORDER": "larger,largest",
     "SPYTEST_BATCH_RERUN": None,
+    "SPYTEST_BATCH_MODULE_DURATIONS": None,
+    "SPYTEST_BATCH_MODULE_DEFAULT_DURATION": "0",
+    "SPYTEST_BATCH_MODULE_ORDER": "0",
     "SPYTEST_TESTBED_FILE": "testbed.yaml",
     "SPYTEST_FILE_MODE": "0",
     "SPYTEST_SCHEDULING": None,
@@ -96,6 +100,17 @@ dev_defaults = {
     "SPYTEST_CMDLINE_ARGS": "",
     "SPYTEST_SUITE_ARGS": "",
     "SPYTEST_TEXTFSM_DUMP_INDENT_JSON": None,
+    "SPYTEST_AUTO_FANOUT": "0",
+    "SPYTEST_CONSOLE_TRANSFER_COMPRESS": "1",
+    "SPYTEST_TRANSFER_POOL": "1",
+    "SPYTEST_PROFILE_REPORTS": "0",
+    "SPYTEST_LIVE_RESULTS_HTML_INTERVAL": "60",
+    "SPYTEST_PROFILE_TOP_COUNT": "50",
+    "SPYTEST_TEXTFSM_PARSE_CACHE": "0",
+    "SPYTEST_TEXTFSM_PARSE_CACHE_DIR": None,
+    "SPYTEST_TEXTFSM_PARSE_CACHE_DISK_MAX": "100000",
+    "SPYTEST_YAML_CACHE": "1",
+    "SPYTEST_YAML_CACHE_DIR": None,
     "SPYTEST_TESTBED_EXCLUDE_DEVICES": None,
     "SPYTEST_TESTBED_INCLUDE_DEVICES": None,
     "SPYTEST_LOGS_PATH": None,
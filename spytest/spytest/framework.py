@@ -27,6 +27,7 @@ import utilities.parallel as putil
 from spytest.net import Net
 from spytest.logger import Logger
 from spytest.result import Result
+from spytest.result import ResultTail
 from spytest.result import ReportType
 from spytest.testbed import Testbed
 from spytest.rps import RPS
@@ -36,6 +37,7 @@ from spytest.tgen import tg as tgapi
 from spytest.version import get_git_ver
 from spytest.datamap import DataMap
 from spytest import batch
+from spytest import profile
 from spytest.st_time import get_timenow
 from spytest.st_time import get_elapsed
 from spytest.st_time import get_timestamp
@@ -2496,6 +2498,7 @@ class WorkArea(object):
                 last_dut_version = swver
             ofh.write("\nSoftware Versions = {}".format(",".join(duts_sw_versions)))
             ofh.write("\nSoftware Version = {}".format(last_dut_version))
+        profile.write_reports(logs_path)
 
         self.log_time("report file generation end")
         return data
@@ -2550,6 +2553,9 @@ class WorkArea(object):
             ofh.write("\nTOTAL HELPER Time = {}".format(stats.helper_cmd_time))
             ofh.write("\nTOTAL TG Time = {}".format(stats.tg_cmd_time))
             ofh.write("\nTOTAL PROMPT NFOUND = {}".format(stats.pnfound))
+            if stats.parse_cache_hits or stats.parse_cache_misses:
+                ofh.write("\nTOTAL PARSE CACHE HITS = {}".format(stats.parse_cache_hits))
+                ofh.write("\nTOTAL PARSE CACHE MISSES = {}".format(stats.parse_cache_misses))
             for [start_time, thid, ctype, dut, cmd, ctime] in stats.cmds:
                 start_msg = "\n{} {}".format(get_timestamp(this=start_time), thid)
                 if ctype == "CMD":
@@ -4404,7 +4410,7 @@ def log_report_master(report, wa):
 
 def session_start(session):
     if env.get("SPYTEST_LIVE_RESULTS", "1") == "1":
-        bg_results.start(consolidate_results)
+        bg_results.start(consolidate_results, live=True)
 
 def get_rate(val, total):
     if total:
@@ -4437,24 +4443,90 @@ def read_all_result_names(logs_path, suffix, extn, dot="."):
 
     return files
 
-def read_all_results(logs_path, suffix):
+def read_all_results(logs_path, suffix, tail=None):
 
     csv_files = read_all_result_names(logs_path, suffix, "csv")
     results = []
     for csv_file in csv_files:
         gw_name = os.path.basename(os.path.dirname(csv_file))
-        for row in Result.read_report_csv(csv_file):
-            row.insert(0, gw_name)
-            results.append(row)
+        if tail:
+            rows, _ = tail.read(csv_file)
+        else:
+            rows = Result.read_report_csv(csv_file)
+        for row in rows:
+            results.append([gw_name] + row)
 
     return results
 
+concat_state = dict()
 def concat_files(target, files, add_prefix=True):
-    utils.write_file(target, "")
+    # skip when none of the files changed since the last concatenation
+    stamp = []
     for fp in files:
-        for line in utils.read_lines(fp):
+        try: stamp.append([fp, os.path.getsize(fp), os.path.getmtime(fp)])
+        except Exception: stamp.append([fp, 0, 0])
+    if concat_state.get(target) == stamp and os.path.exists(target):
+        return
+    utils.ensure_parent(target)
+    with open(target, "w") as ofh:
+        for fp in files:
             prefix = "{},".format(os.path.basename(fp)) if add_prefix else ""
-            utils.write_file(target, "{}{}\n".format(prefix, line), "a")
+            lines = ["{}{}\n".format(prefix, line) for line in utils.read_lines(fp)]
+            ofh.write(utils.to_ascii("".join(lines)))
+    concat_state[target] = stamp
+
+class ConsolidatedReport(object):
+    """
+    rows of one report type from all the nodes, the node result files
+    are read incrementally and the rows added since the previous
+    consolidation are appended to the consolidated csv file
+    """
+    def __init__(self, suffix, rtype, sort=True):
+        self.suffix = suffix
+        self.rtype = rtype
+        self.sort = sort
+        self.tail = ResultTail()
+        self.rows = []
+        self.csv_file = None
+        self.dirty = True
+        self.render_time = 0
+
+    def read(self, logs_path):
+        results = read_all_results(logs_path, self.suffix, self.tail)
+        if self.sort:
+            results = sorted(results, key=itemgetter(5))
+        return results
+
+    def write_csv(self, filepath, rows):
+        count = len(self.rows)
+        unchanged = bool(self.csv_file == filepath and os.path.exists(filepath))
+        unchanged = unchanged and count <= len(rows) and rows[:count] == self.rows
+        if not unchanged:
+            Result.write_report_csv(filepath, rows, self.rtype)
+            self.dirty = True
+        elif count < len(rows):
+            l_rows = [[count + index + 1] + row for index, row in enumerate(rows[count:])]
+            utils.write_csv_file(Result.get_header(self.rtype), l_rows, filepath, True)
+            self.dirty = True
+        self.csv_file = filepath
+        self.rows = rows
+
+    def render_due(self, live=False):
+        if not self.dirty: return False
+        if not live: return True
+        interval = utils.integer_parse(env.get("SPYTEST_LIVE_RESULTS_HTML_INTERVAL", "60"), 0)
+        return bool(time.time() - self.render_time >= interval)
+
+    def rendered(self):
+        self.dirty = False
+        self.render_time = time.time()
+
+consolidate_lock = threading.Lock()
+consolidated_reports = dict()
+def get_consolidated_report(suffix, rtype, sort=True):
+    if suffix not in consolidated_reports:
+        consolidated_reports[suffix] = ConsolidatedReport(suffix, rtype, sort)
+    return consolidated_reports[suffix]
 
 def get_header_info(index, cols, is_batch=True):
     links, indexes = {}, {}
@@ -4463,7 +4535,7 @@ def get_header_info(index, cols, is_batch=True):
     for col in cols: indexes[col] = hdr.index(col) - 1
     return links, indexes
 
-def consolidate_results(progress=None, thread=False, count=None):
+def consolidate_results(progress=None, thread=False, count=None, live=False):
 
     # generate email report
     generate_email_report(count)
@@ -4485,46 +4557,66 @@ def consolidate_results(progress=None, thread=False, count=None):
     if progress is not None and progress <= 0:
         return
 
+    with consolidate_lock:
+        _consolidate_results(logs_path, live)
+
+def _consolidate_results(logs_path, live=False):
+
     # functions
-    results = read_all_results(logs_path, "functions")
-    consolidated = sorted(results, key=itemgetter(5))
+    report = get_consolidated_report("functions", ReportType.FUNCTIONS)
+    consolidated = report.read(logs_path)
     results_csv = paths.get_results_csv(logs_path, True)
-    Result.write_report_csv(results_csv, consolidated, ReportType.FUNCTIONS)
+    report.write_csv(results_csv, consolidated)
+    render = report.render_due(live)
     ############## REMOVE ME ##########################
     results_csv2 = paths.get_file_path("result", "csv", logs_path, True)
     #Result.write_report_csv(results_csv2, consolidated, ReportType.FUNCTIONS)
-    shutil.copy2(results_csv, results_csv2)
+    if render: shutil.copy2(results_csv, results_csv2)
     ###################################################
-    links, indexes = get_header_info(ReportType.FUNCTIONS, ["Node", "Module", "Result", "Syslogs"])
-    for row in consolidated:
-        node_name = row[indexes["Node"]]
-        results_htm = paths.get_results_htm(node_name)
-        syslog_htm = paths.get_syslog_htm(node_name)
-        mlog = paths.get_mlog_path(row[indexes["Module"]], node_name)
-        links["Node"].append(results_htm)
-        links["Module"].append(mlog)
-        links["Result"].append(mlog)
-        links["Syslogs"].append(syslog_htm)
-    results_htm = paths.get_results_htm(logs_path, True)
-    align = {col: True for col in ["Module", "TestFunction", "Description", "Devices"]}
-    Result.write_report_html(results_htm, consolidated, ReportType.FUNCTIONS, True, 4, links=links, align=align)
-    save_failed_function_list(results_csv, 1)
+    if render:
+        links, indexes = get_header_info(ReportType.FUNCTIONS, ["Node", "Module", "Result", "Syslogs"])
+        for row in consolidated:
+            node_name = row[indexes["Node"]]
+            results_htm = paths.get_results_htm(node_name)
+            syslog_htm = paths.get_syslog_htm(node_name)
+            mlog = paths.get_mlog_path(row[indexes["Module"]], node_name)
+            links["Node"].append(results_htm)
+            links["Module"].append(mlog)
+            links["Result"].append(mlog)
+            links["Syslogs"].append(syslog_htm)
+        results_htm = paths.get_results_htm(logs_path, True)
+        align = {col: True for col in ["Module", "TestFunction", "Description", "Devices"]}
+        Result.write_report_html(results_htm, consolidated, ReportType.FUNCTIONS, True, 4, links=links, align=align)
+        save_failed_function_list(results_csv, 1)
+        report.rendered()
     wa = get_work_area()
     if wa and wa._context:
         wa._context.run_progress_report(len(consolidated))
-    tcresults_csv = paths.get_tc_results_csv(logs_path, True)
-    generate_module_report(results_csv, tcresults_csv, 1)
 
     # testcases
-    results = read_all_results(logs_path, "testcases")
-    consolidated = sorted(results, key=itemgetter(5))
+    report = get_consolidated_report("testcases", ReportType.TESTCASES)
+    consolidated = report.read(logs_path)
     tcresults_csv = paths.get_tc_results_csv(logs_path, True)
-    Result.write_report_csv(tcresults_csv, consolidated, ReportType.TESTCASES)
+    report.write_csv(tcresults_csv, consolidated)
+    tc_render = report.render_due(live)
+
+    # modules report needs both functions and testcases
+    if render or tc_render:
+        generate_module_report(results_csv, tcresults_csv, 1)
+    if tc_render:
+        _render_testcases(logs_path, consolidated, results_csv, tcresults_csv)
+        report.rendered()
+
+    _consolidate_others(logs_path, live)
+
+def _render_testcases(logs_path, consolidated, results_csv, tcresults_csv):
     ############## REMOVE ME ##########################
     tcresults_csv2 = paths.get_file_path("tcresult", "csv", logs_path, True)
     #Result.write_report_csv(tcresults_csv2, consolidated, ReportType.TESTCASES)
     shutil.copy2(tcresults_csv, tcresults_csv2)
     ###################################################
+    # the analisys report modifies the rows
+    consolidated = [list(row) for row in consolidated]
     links, indexes = get_header_info(ReportType.TESTCASES, ["Node", "Result", "Module", "ResultType", "ExecutedOn"])
     for row in consolidated:
         node_name = row[indexes["Node"]]
@@ -4556,12 +4648,55 @@ def consolidate_results(progress=None, thread=False, count=None):
             row.append(engineer)
         Result.write_report_csv(analisys_csv, consolidated, ReportType.ANALISYS, row_index=False)
     except Exception:
+        wa = get_work_area()
         if wa: wa.error("Failed to analisys report")
         else: print("Failed to analisys report")
 
+def _consolidate_others(logs_path, live=False):
+
     # syslogs
-    results = read_all_results(logs_path, "syslog")
-    consolidated = sorted(results, key=itemgetter(5))
+    report = get_consolidated_report("syslog", ReportType.SYSLOGS)
+    consolidated = report.read(logs_path)
+    syslog_csv = paths.get_syslog_csv(logs_path, True)
+    report.write_csv(syslog_csv, consolidated)
+    if report.render_due(live):
+        _render_syslogs(logs_path, consolidated)
+        report.rendered()
+
+    # stats
+    report = get_consolidated_report("stats", ReportType.STATS, False)
+    consolidated = report.read(logs_path)
+    stats_csv = paths.get_stats_csv(logs_path, True)
+    report.write_csv(stats_csv, consolidated)
+    if report.render_due(live):
+        _render_stats(logs_path, consolidated)
+        report.rendered()
+
+    # sysinfo
+    report = get_consolidated_report("sysinfo", ReportType.SYSINFO, False)
+    consolidated = report.read(logs_path)
+    sysinfo_csv = paths.get_sysinfo_csv(logs_path, True)
+    report.write_csv(sysinfo_csv, consolidated)
+    if report.render_due(live):
+        _render_sysinfo(logs_path, consolidated)
+        report.rendered()
+
+    # CLI files
+    all_file = paths.get_cli_log("", logs_path, True)
+    files = read_all_result_names(logs_path, "", "cli")
+    concat_files(all_file, files, False)
+
+    # CLI type files
+    all_file = paths.get_cli_type_log("", logs_path, True)
+    files = read_all_result_names(logs_path, "", "cli_type")
+    concat_files(all_file, files)
+
+    # alert files
+    all_file = paths.get_alerts_log(logs_path, True)
+    files = read_all_result_names(logs_path, "alerts", "log")
+    concat_files(all_file, files, False)
+
+def _render_syslogs(logs_path, consolidated):
     links, indexes = get_header_info(ReportType.SYSLOGS, ["Node", "Device", "Module"])
     for row in consolidated:
         node_name = row[indexes["Node"]]
@@ -4571,16 +4706,11 @@ def consolidate_results(progress=None, thread=False, count=None):
         links["Node"].append(syslog_htm)
         links["Device"].append(dlog)
         links["Module"].append(mlog)
-    syslog_csv = paths.get_syslog_csv(logs_path, True)
-    Result.write_report_csv(syslog_csv, consolidated, ReportType.SYSLOGS)
     syslog_htm = paths.get_syslog_htm(logs_path, True)
     align = {col: True for col in ["Module", "TestFunction", "LogMessage"]}
     Result.write_report_html(syslog_htm, consolidated, ReportType.SYSLOGS, True, links=links, align=align)
 
-    # stats
-    consolidated = read_all_results(logs_path, "stats")
-    stats_csv = paths.get_stats_csv(logs_path, True)
-    Result.write_report_csv(stats_csv, consolidated, ReportType.STATS)
+def _render_stats(logs_path, consolidated):
     links, indexes = get_header_info(ReportType.STATS, ["Node", "Module"])
     for row in consolidated:
         node_name = row[indexes["Node"]]
@@ -4592,10 +4722,7 @@ def consolidate_results(progress=None, thread=False, count=None):
     align = {col: True for col in ["Module", "Function", "Description"]}
     Result.write_report_html(stats_htm, consolidated, ReportType.STATS, True, links=links, align=align)
 
-    # sysinfo
-    consolidated = read_all_results(logs_path, "sysinfo")
-    sysinfo_csv = paths.get_sysinfo_csv(logs_path, True)
-    Result.write_report_csv(sysinfo_csv, consolidated, ReportType.SYSINFO)
+def _render_sysinfo(logs_path, consolidated):
     links, indexes = get_header_info(ReportType.SYSINFO, ["Node", "Module"])
     for row in consolidated:
         node_name = row[indexes["Node"]]
@@ -4607,21 +4734,6 @@ def consolidate_results(progress=None, thread=False, count=None):
     align = {col: True for col in ["Module"]}
     Result.write_report_html(sysinfo_htm, consolidated, ReportType.SYSINFO, True, links=links, align=align)
 
-    # CLI files
-    all_file = paths.get_cli_log("", logs_path, True)
-    files = read_all_result_names(logs_path, "", "cli")
-    concat_files(all_file, files, False)
-
-    # CLI type files
-    all_file = paths.get_cli_type_log("", logs_path, True)
-    files = read_all_result_names(logs_path, "", "cli_type")
-    concat_files(all_file, files)
-
-    # alert files
-    all_file = paths.get_alerts_log(logs_path, True)
-    files = read_all_result_names(logs_path, "alerts", "log")
-    concat_files(all_file, files, False)
-
 def generate_compare_report():
     wa = get_work_area()
     [_, logs_path, slave_id] = _get_logs_path()
@@ -5447,6 +5559,7 @@ def fixture_setup(fixturedef, request):
         current_module.global_module_finalized = False
         current_module.name = ""
         current_test.nodeid = ""
+        profile.set_module(mid)
         set_current_result()
         wa._set_device_usage_collection(False)
         log_devices_used_until_now(wa, fixturedef)
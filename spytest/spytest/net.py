@@ -25,6 +25,8 @@ from spytest.template import Template
 from spytest.access.connection import DeviceConnection, DeviceConnectionTimeout
 from spytest.access.connection import DeviceFileUpload, DeviceFileDownload
 from spytest.access.connection import initDeviceConnectionDebug
+from spytest.access.connection import DeviceFileTransferClose
+import spytest.access.transfer as transfer
 from spytest.ansible import ansible_playbook
 from spytest.prompts import Prompts
 from spytest.rest import Rest
@@ -99,6 +101,7 @@ class Net(object):
             self.trace_callback_support = True
         self.use_sample_data = bool(env.get("SPYTEST_USE_SAMPLE_DATA", "0") != "0")
         self.cmd_tmpl_cache = dict()
+        self.auto_fanout = bool(env.get("SPYTEST_AUTO_FANOUT", "0") != "0")
         self.debug_find_prompt = bool(env.get("SPYTEST_DEBUG_FIND_PROMPT", "0") != "0")
         self.dry_run_cmd_delay = env.get("SPYTEST_DRYRUN_CMD_DELAY", "0")
         self.dry_run_cmd_delay = int(self.dry_run_cmd_delay)
@@ -106,6 +109,7 @@ class Net(object):
         self.orig_time_sleep = time.sleep
         self.force_console_transfer = False
         self.max_cmds_once = 100
+        self.compress_console_transfer = bool(env.get("SPYTEST_CONSOLE_TRANSFER_COMPRESS", "1") != "0")
         self.pending_downloads = dict()
         self.log_dutid_fmt = env.get("SPYTEST_LOG_DUTID_FMT", "LABEL")
         self.dut_log_lock = putils.Lock()
@@ -713,6 +717,9 @@ class Net(object):
                     pass
                 hndl.disconnect()
                 self._set_handle(devname, None)
+            connection_param = self._get_dev_access(devname).get("connection_param", None)
+            if connection_param and connection_param.get("mgmt-ip", None):
+                DeviceFileTransferClose(connection_param["mgmt-ip"])
 
     def trace_callback_set(self, devname, val):
         def trace_callback(self, devname, msg):
@@ -3169,24 +3176,22 @@ class Net(object):
     def _transfer_base64(self, access, src_file, dst_file):
         devname = access["devname"]
         prompt = self._get_cli_prompt(devname)
-        script_cmd = "rm -f {0}.tmp {0}".format(dst_file)
-        self._exec(devname, script_cmd, prompt)
-        redir = ">"
-        lines = utils.b64encode(src_file)
-        (count, split) = (len(lines), self.max_cmds_once)
-        for i in range(0, count, split):
-            script_cmds = []
-            for j in range(i, i+split):
-                if j >= count:
-                    break
-                script_cmds.append(lines[j])
-            if script_cmds:
-                line = "".join(script_cmds)
-                script_cmd = "echo {} {} {}.tmp".format(line, redir, dst_file)
-                self._send_command(access, script_cmd, prompt, True)
-                redir = ">>"
-        script_cmd = "base64 -d {0}.tmp > {0}".format(dst_file)
-        self._exec(devname, script_cmd, prompt)
+        script_cmds = transfer.commands(src_file, dst_file, self.max_cmds_once,
+                                        self.compress_console_transfer)
+        self._exec(devname, script_cmds[0], prompt)
+        for script_cmd in script_cmds[1:-2]:
+            self._send_command(access, script_cmd, prompt, True)
+        self._exec(devname, ";".join(script_cmds[-2:]), prompt)
+
+        # verify the content once at the end
+        script_cmd = "md5sum {}".format(dst_file)
+        output = self._send_command(access, script_cmd, prompt, True)
+        if transfer.md5(src_file) not in output:
+            msg = "Console transfer of {} failed md5 check".format(src_file)
+            self.dut_log(devname, msg, lvl=logging.WARNING)
+            self._exec(devname, "rm -f {}".format(dst_file), prompt)
+            return False
+        return True
 
     def _transfer_base64_small(self, access, src_file, dst_file):
         script_cmds = []
@@ -4830,7 +4835,19 @@ class Net(object):
     def parse_show(self, devname, cmd, output):
         return self._tmpl_apply(devname, cmd, output)
 
+    def _fanout(self, devnames, func, cmd, **kwargs):
+        # identical command to multiple devices - run them in parallel
+        # when auto fanout is enabled otherwise one after the other
+        devnames = list(devnames)
+        if self.auto_fanout:
+            [retvals, _] = utils.exec_foreach(True, devnames, func, cmd, **kwargs)
+            return retvals
+        return [func(devname, cmd, **kwargs) for devname in devnames]
+
     def show(self, devname, cmd, **kwargs):
+        if isinstance(devname, (list, tuple)):
+            return self._fanout(devname, self.show, cmd, **kwargs)
+
         opts = self._parse_cli_opts(**kwargs)
 
         # switch to console if the command can cause IP change
@@ -4922,6 +4939,9 @@ class Net(object):
         return self._tmpl_apply(devname, actual_cmd, output)
 
     def config(self, devname, cmd, **kwargs):
+        if isinstance(devname, (list, tuple)):
+            return self._fanout(devname, self.config, cmd, **kwargs)
+
         opts = self._parse_cli_opts(**kwargs)
         cmd_list = self._build_cmd_list(cmd, opts)
         if not cmd_list: return ""
@@ -1,10 +1,137 @@
 import os
 import copy
+import pickle
+import hashlib
+import threading
 import yaml
 
+# use libyaml when available
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 from spytest.dicts import SpyTestDict
+import spytest.env as env
 import utilities.common as utils
 
+def _digest(data):
+    if not isinstance(data, bytes):
+        data = data.encode("utf-8")
+    return hashlib.md5(data).hexdigest()
+
+def _file_digest(filename):
+    try:
+        with open(filename, "rb") as fh:
+            return _digest(fh.read())
+    except Exception:
+        return None
+
+class YamlCache(object):
+    """
+    Cache of the loaded yaml content with all the includes expanded.
+    The entries are keyed by the hash of the content and search paths
+    and hold the hash of each included file to validate them on use.
+    The entries are kept pickled so that each user gets its own copy.
+    Setting SPYTEST_YAML_CACHE_DIR adds an on-disk tier shared by the
+    processes, which is set to the logs folder in batch mode.
+    Setting SPYTEST_YAML_CACHE to 0 disables the cache.
+    """
+    version = 1
+
+    def __init__(self, max_entries=64):
+        self.lock = threading.Lock()
+        self.entries = dict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def enabled(self):
+        return bool(env.get("SPYTEST_YAML_CACHE", "1") != "0")
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def get_stats(self):
+        return [self.hits, self.misses, len(self.entries)]
+
+    def make_key(self, content, paths):
+        parts = [str(self.version), _digest(content), os.getcwd()]
+        parts.extend([os.path.abspath(path) for path in paths])
+        return _digest("\n".join(parts))
+
+    def _disk_file(self, key):
+        cache_dir = env.get("SPYTEST_YAML_CACHE_DIR")
+        if not cache_dir: return None
+        return os.path.join(cache_dir, "{}.pkl".format(key))
+
+    def _read_disk(self, key):
+        disk_file = self._disk_file(key)
+        if not disk_file: return None
+        try:
+            with open(disk_file, "rb") as fh:
+                return fh.read()
+        except Exception:
+            return None
+
+    def _write_disk(self, key, data):
+        disk_file = self._disk_file(key)
+        if not disk_file: return
+        try:
+            utils.ensure_parent(disk_file)
+            tmp_file = "{}.{}.tmp".format(disk_file, os.getpid())
+            with open(tmp_file, "wb") as fh:
+                fh.write(data)
+            os.rename(tmp_file, disk_file)
+        except Exception:
+            pass
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key, None)
+        if data is None:
+            data = self._read_disk(key)
+        entry = None
+        if data is not None:
+            try:
+                entry = pickle.loads(data)
+                for filename, digest in entry[1].items():
+                    if _file_digest(filename) != digest:
+                        entry = None
+                        break
+            except Exception:
+                entry = None
+        with self.lock:
+            if entry is None:
+                self.entries.pop(key, None)
+                self.misses = self.misses + 1
+                return None
+            self._put_mem(key, data)
+            self.hits = self.hits + 1
+        return entry
+
+    def _put_mem(self, key, data):
+        self.entries.pop(key, None)
+        if len(self.entries) >= self.max_entries:
+            self.entries.pop(next(iter(self.entries)))
+        self.entries[key] = data
+
+    def put(self, key, files, obj, include_map, text1):
+        includes = dict()
+        for filename in files:
+            includes[filename] = _file_digest(filename)
+        try:
+            data = pickle.dumps([key, includes, obj, include_map, files, text1], protocol=2)
+        except Exception:
+            return
+        with self.lock:
+            self._put_mem(key, data)
+        self._write_disk(key, data)
+
+yaml_cache = YamlCache()
+
 class OrderedYaml(object):
 
     def _locate(self, filename):
@@ -101,9 +228,20 @@ class OrderedYaml(object):
         all_files = dict()
         try:
             self.text0 = content
-            self.obj = self._load(self.text0, all_files, yaml.SafeLoader)
+            key = None
+            if yaml_cache.enabled():
+                key = yaml_cache.make_key(content, self._paths)
+                entry = yaml_cache.get(key)
+                if entry is not None:
+                    [_, _, self.obj, self.include_map, files, self.text1] = entry
+                    all_files.update(files)
+                    self.valid = True
+                    return all_files
+            self.obj = self._load(self.text0, all_files, SafeLoader)
             self.text1 = self._dump(self.obj)
             self.valid = True
+            if key and not self.errs:
+                yaml_cache.put(key, all_files, self.obj, self.include_map, self.text1)
             return all_files
         except Exception as e:
             self.errs.append(e)
@@ -1,7 +1,195 @@
 
+import os
+import sys
+import json
+import heapq
+import datetime
+import threading
+
 from spytest.st_time import get_timenow
 from spytest.dicts import SpyTestDict
 import spytest.logger as logger
+import spytest.paths as paths
+import spytest.env as env
+import utilities.common as utils
+
+class Recorder(object):
+    """
+    Session wide record of every CLI/TG/helper/wait event used to build
+    the latency histograms, the slowest commands and the timeline reports.
+    Enabled by SPYTEST_PROFILE_REPORTS.
+
+    Histograms and the slowest commands are maintained as events arrive.
+    Timeline events are only buffered until the next write, which appends
+    them to the trace file, so memory does not grow with the session.
+    """
+
+    def __init__(self):
+        self.enabled = bool(env.get("SPYTEST_PROFILE_REPORTS", "0") != "0")
+        self.top_count = int(env.get("SPYTEST_PROFILE_TOP_COUNT", "50"))
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.module = ""
+        self.pending = []
+        self.groups = dict()
+        self.top = []
+        self.seq = 0
+        self.parallel = dict()
+        self.trace_file = None
+        self.trace_ids = [dict(), dict()]
+
+    def set_module(self, name):
+        self.module = name or ""
+
+    def add(self, start_time, thid, ctype, dut, msg, duration, api=None):
+        if not self.enabled:
+            return
+        entry = [start_time, thid, ctype, dut, self.module, api, msg, duration]
+        with self.lock:
+            self.pending.append(entry)
+            if ctype in ["CMD", "HELPER", "TG"]:
+                self._add_histogram(entry)
+                self._add_top(entry)
+
+    def _add_histogram(self, entry):
+        [_, _, _, dut, module, api, _, duration] = entry
+        for scope, name in [["DUT", dut or "TG"], ["MODULE", module], ["API", api]]:
+            if name:
+                # [count, total, {duration: count}]
+                group = self.groups.setdefault((scope, name), [0, 0, dict()])
+                group[0] = group[0] + 1
+                group[1] = group[1] + duration
+                group[2][duration] = group[2].get(duration, 0) + 1
+
+    def _add_top(self, entry):
+        self.seq = self.seq + 1
+        item = (entry[7], self.seq, entry)
+        if len(self.top) < self.top_count:
+            heapq.heappush(self.top, item)
+        elif self.top and item[0] > self.top[0][0]:
+            heapq.heapreplace(self.top, item)
+
+    def add_parallel(self, msg, dut, pdut, duration, pduration):
+        # running both in parallel would have saved the shorter of the two
+        with self.lock:
+            entry = self.parallel.setdefault(self.module, [0, 0, dict()])
+            entry[0] = entry[0] + 1
+            entry[1] = entry[1] + min(duration, pduration)
+            entry[2][msg] = entry[2].get(msg, 0) + 1
+
+    @staticmethod
+    def parallel_report(parallel, count=5):
+        rows = []
+        for module, [total, savings, cmds] in parallel.items():
+            top = sorted(cmds.items(), key=lambda x: x[1], reverse=True)[:count]
+            top = " | ".join(["{} ({})".format(msg, cnt) for msg, cnt in top])
+            rows.append([module, total, savings, top])
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows
+
+    @staticmethod
+    def find_api():
+        try:
+            frame = sys._getframe(2)
+        except Exception:
+            return None
+        marker = "{0}apis{0}".format(os.sep)
+        while frame:
+            filename = frame.f_code.co_filename
+            index = filename.rfind(marker)
+            if index >= 0:
+                filename = filename[index+len(marker):]
+                return "{}:{}".format(filename, frame.f_code.co_name)
+            frame = frame.f_back
+        return None
+
+    @staticmethod
+    def percentile(values, count, pct):
+        # values are (duration, occurrences) pairs sorted by duration
+        if not values:
+            return 0
+        index = int(round(pct * (count - 1) / 100.0))
+        for value, occurrences in values:
+            if index < occurrences:
+                return value
+            index = index - occurrences
+        return values[-1][0]
+
+    @staticmethod
+    def histograms(groups):
+        rows = []
+        for (scope, name), [count, total, counts] in sorted(groups.items()):
+            values = sorted(counts.items())
+            rows.append([scope, name, count, total,
+                         Recorder.percentile(values, count, 50),
+                         Recorder.percentile(values, count, 95),
+                         Recorder.percentile(values, count, 99), values[-1][0]])
+        return rows
+
+    @staticmethod
+    def slowest(top):
+        rows = []
+        for _, _, entry in sorted(top, key=lambda item: item[:2], reverse=True):
+            [start_time, thid, ctype, dut, module, api, msg, duration] = entry
+            rows.append([duration, ctype, dut or "", module, api or "",
+                         thid.strip(": "), start_time, msg])
+        return rows
+
+    def timeline(self, events):
+        epoch = datetime.datetime(1970, 1, 1)
+        pids, tids, trace = self.trace_ids[0], self.trace_ids[1], []
+        for [start_time, thid, ctype, dut, module, api, msg, duration] in events:
+            if ctype in ["WAIT", "TGWAIT"]:
+                duration = duration * 1000
+            elif not isinstance(duration, int):
+                duration = 0
+            pname, tname = dut or ctype, thid.strip(": ")
+            if pname not in pids:
+                pids[pname] = len(pids) + 1
+                trace.append({"name": "process_name", "ph": "M", "pid": pids[pname],
+                              "args": {"name": pname}})
+            if (pname, tname) not in tids:
+                tids[(pname, tname)] = len(tids) + 1
+                trace.append({"name": "thread_name", "ph": "M", "pid": pids[pname],
+                              "tid": tids[(pname, tname)], "args": {"name": tname}})
+            tstamp = int((start_time - epoch).total_seconds() * 1000000)
+            args = {"module": module}
+            if api: args["api"] = api
+            trace.append({"name": msg, "cat": ctype, "ph": "X", "ts": tstamp,
+                          "dur": duration * 1000, "pid": pids[pname],
+                          "tid": tids[(pname, tname)], "args": args})
+        return trace
+
+    def write_trace(self, filepath, events):
+        # the trace uses the JSON array format, where the closing bracket
+        # is optional, so that new events can be appended to the file
+        if self.trace_file != filepath:
+            self.trace_file, self.trace_ids = filepath, [dict(), dict()]
+            with open(filepath, "w") as ofh:
+                ofh.write("[\n")
+        trace = self.timeline(events)
+        if trace:
+            with open(filepath, "a") as ofh:
+                for entry in trace:
+                    ofh.write(json.dumps(entry))
+                    ofh.write(",\n")
+
+    def write(self, logs_path):
+        if not self.enabled:
+            return
+        with self.write_lock:
+            with self.lock:
+                events, self.pending = self.pending, []
+                groups = dict([[k, [v[0], v[1], dict(v[2])]] for k, v in self.groups.items()])
+                top = list(self.top)
+                parallel = dict([[k, [v[0], v[1], dict(v[2])]] for k, v in self.parallel.items()])
+            cols = ["Scope", "Name", "Count", "Total(ms)", "P50(ms)", "P95(ms)", "P99(ms)", "Max(ms)"]
+            utils.write_csv_file(cols, self.histograms(groups), paths.get_profile_latency_csv(logs_path))
+            cols = ["Time(ms)", "Type", "DUT", "Module", "API", "Thread", "Start", "Command"]
+            utils.write_csv_file(cols, self.slowest(top), paths.get_profile_top_csv(logs_path))
+            self.write_trace(paths.get_profile_trace_json(logs_path), events)
+            cols = ["Module", "Count", "Estimated Savings(ms)", "Top Commands"]
+            utils.write_csv_file(cols, self.parallel_report(parallel), paths.get_profile_parallel_csv(logs_path))
 
 class Profile(object):
 
@@ -18,7 +206,10 @@ class Profile(object):
         self.helper_cmds = []
         self.cmds = []
         self.profile_ids = dict()
+        self.durations = dict()
         self.canbe_parallel = []
+        self.parse_cache_hits = 0
+        self.parse_cache_misses = 0
 
     def init(self):
         self.__init__()
@@ -35,23 +226,30 @@ class Profile(object):
         delta = get_timenow() - start_time
         cmd_time = int(delta.total_seconds() * 1000)
         thid = logger.get_thread_name()
+        api = recorder.find_api() if recorder.enabled else None
         if dut:
             if pid > 0 and thid == "T0000: ":
                 [_, pdut, pmsg, _] = self.profile_ids[pid-1]
                 if pmsg == msg and dut != pdut:
                     self.canbe_parallel.append([start_time, msg, dut, pdut])
+                    pcmd_time = self.durations.get(pid-1, 0)
+                    recorder.add_parallel(msg, dut, pdut, cmd_time, pcmd_time)
+            self.durations[pid] = cmd_time
             if "spytest-helper.py" in msg:
                 self.helper_cmds.append([start_time, thid, dut, msg, cmd_time])
                 self.helper_cmd_time = self.helper_cmd_time + cmd_time
                 self.cmds.append([start_time, thid, "HELPER", dut, msg, cmd_time])
+                recorder.add(start_time, thid, "HELPER", dut, msg, cmd_time, api)
             else:
                 self.tc_cmds.append([start_time, thid, dut, msg, cmd_time])
                 self.tc_cmd_time = self.tc_cmd_time + cmd_time
                 self.cmds.append([start_time, thid, "CMD", dut, msg, cmd_time])
+                recorder.add(start_time, thid, "CMD", dut, msg, cmd_time, api)
         else:
             self.tg_cmds.append([start_time, thid, dut, msg, cmd_time])
             self.tg_cmd_time = self.tg_cmd_time + cmd_time
             self.cmds.append([start_time, thid, "TG", dut, msg, cmd_time])
+            recorder.add(start_time, thid, "TG", dut, msg, cmd_time, api)
         return data
 
     def wait(self, val, is_tg=False):
@@ -60,9 +258,11 @@ class Profile(object):
         if is_tg:
             self.tg_total_wait = self.tg_total_wait + val
             self.cmds.append([start_time, thid, "TGWAIT", None, "TG sleep", val])
+            recorder.add(start_time, thid, "TGWAIT", None, "TG sleep", val)
         else:
             self.tc_total_wait = self.tc_total_wait + val
             self.cmds.append([start_time, thid, "WAIT", None, "static delay", val])
+            recorder.add(start_time, thid, "WAIT", None, "static delay", val)
 
     def prompt_nfound(self, cmd):
         start_time = get_timenow()
@@ -70,6 +270,12 @@ class Profile(object):
         self.pnfound = self.pnfound + 1
         self.cmds.append([start_time, thid, "PROMPT_NFOUND", None, cmd, ""])
 
+    def parse_cache(self, hit):
+        if hit:
+            self.parse_cache_hits = self.parse_cache_hits + 1
+        else:
+            self.parse_cache_misses = self.parse_cache_misses + 1
+
     def get_stats(self):
         stats = SpyTestDict()
         stats.tg_total_wait = self.tg_total_wait
@@ -83,8 +289,11 @@ class Profile(object):
         stats.cmds = self.cmds
         stats.canbe_parallel = self.canbe_parallel
         stats.pnfound = self.pnfound
+        stats.parse_cache_hits = self.parse_cache_hits
+        stats.parse_cache_misses = self.parse_cache_misses
         return stats
 
+recorder = Recorder()
 obj = Profile()
 def init():
     return obj.init()
@@ -104,3 +313,11 @@ def get_stats():
 def prompt_nfound(cmd):
     return obj.prompt_nfound(cmd)
 
+def parse_cache(hit):
+    return obj.parse_cache(hit)
+
+def set_module(name):
+    return recorder.set_module(name)
+
+def write_reports(logs_path):
+    return recorder.write(logs_path)
@@ -62,6 +62,72 @@ colors_map = OrderedDict([
     (50, "yellow"),
     (0, "red")
 ])
+class ResultTail(object):
+    """
+    rows of the node result csv files read incrementally, the rows
+    appended since the previous read are parsed from the saved offset
+    the file is read again from the start when it is truncated or rewritten
+    """
+    check_size = 64
+
+    def __init__(self):
+        self.files = dict()
+
+    def reset(self):
+        self.files.clear()
+
+    def _complete(self, data):
+        # end of the last complete csv row, newlines can be within quotes
+        end = data.rfind(b"\n") + 1
+        while end > 0 and data.count(b'"', 0, end) % 2:
+            end = data.rfind(b"\n", 0, end - 1) + 1
+        return end
+
+    def read(self, filepath, rmindex=True):
+        """
+        returns list of all the rows and the number of new rows
+        """
+        entry = self.files.get(filepath, None)
+        try:
+            size = os.path.getsize(filepath)
+        except Exception:
+            self.files.pop(filepath, None)
+            return [], 0
+        if entry is None or size < entry[0]:
+            entry = [0, b"", []]
+        if size == entry[0]:
+            self.files[filepath] = entry
+            return entry[2], 0
+        try:
+            with open(filepath, "rb") as fd:
+                start = max(entry[0] - len(entry[1]), 0)
+                fd.seek(start)
+                data = fd.read(size - start)
+        except Exception:
+            return entry[2], 0
+        if data[:len(entry[1])] != entry[1]:
+            # rewritten file
+            self.files.pop(filepath, None)
+            return self.read(filepath, rmindex)
+        end = self._complete(data[len(entry[1]):])
+        if end <= 0:
+            self.files[filepath] = entry
+            return entry[2], 0
+        window = data[:len(entry[1]) + end]
+        text = window[len(entry[1]):]
+        if sys.version_info.major >= 3:
+            text = text.decode("utf-8", "replace")
+        rows, new_rows = entry[2], []
+        for row in csv.reader(text.splitlines(True)):
+            if not row or row[0] == '#':
+                continue
+            if rmindex:
+                row.pop(0)
+            new_rows.append(row)
+        rows.extend(new_rows)
+        self.files[filepath] = [entry[0] + end, window[-self.check_size:], rows]
+        return rows, len(new_rows)
+
 class Result(object):
 
     def __init__(self, prefix, is_slave=True):
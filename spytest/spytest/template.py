@@ -2,6 +2,11 @@ import sys
 import os
 import re
 import json
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
 
 import textfsm
 try:
@@ -10,6 +15,165 @@ except Exception:
     import textfsm.clitable as clitable
 
 import spytest.env as env
+from spytest import profile
+
+# process wide caches shared by all Template instances
+# compiled: template file path --> [lock, fsm, lower case header, path, mtime]
+# lookup: (index path, cmd, platform, cli) --> template names
+cache_lock = threading.Lock()
+compiled_cache = dict()
+lookup_cache = dict()
+lookup_cache_max = 10000
+
+def clear_cache():
+    with cache_lock:
+        compiled_cache.clear()
+        lookup_cache.clear()
+    parse_cache.clear()
+
+class ParseCache(object):
+    """
+    LRU cache of parsed output keyed by (template, hash of raw output)
+    with an optional on-disk tier that is shared across runs.
+    Enabled by setting SPYTEST_TEXTFSM_PARSE_CACHE to the max entries.
+    The on-disk tier is limited to disk_max files, the least recently
+    used files (by mtime) are removed when the limit is exceeded.
+    """
+
+    def __init__(self, max_entries=0, cache_dir=None, disk_max=0):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.disk_max = disk_max
+        self.disk_count = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def configure(self, max_entries, cache_dir=None, disk_max=0):
+        with self.lock:
+            self.max_entries = max_entries
+            self.cache_dir = cache_dir
+            self.disk_max = disk_max
+            while len(self.entries) > max_entries:
+                self.entries.popitem(last=False)
+        if cache_dir and not os.path.isdir(cache_dir):
+            try: os.makedirs(cache_dir)
+            except Exception: self.cache_dir = None
+        if self.cache_dir:
+            self._prune()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get_stats(self):
+        return [self.hits, self.disk_hits, self.misses, len(self.entries)]
+
+    @staticmethod
+    def make_key(tmpl_path, mtime, output):
+        digest = hashlib.md5(output.encode("utf-8", "ignore")).hexdigest()
+        return "{}:{}:{}".format(tmpl_path, mtime, digest)
+
+    @staticmethod
+    def _copy(objs):
+        retval = []
+        for obj in objs:
+            row = dict()
+            for name, value in obj.items():
+                row[name] = list(value) if isinstance(value, list) else value
+            retval.append(row)
+        return retval
+
+    def _disk_file(self, key):
+        name = hashlib.md5(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "{}.pkl".format(name))
+
+    def _prune(self):
+        """
+        remove the least recently used files when the on-disk tier
+        exceeds disk_max files, down to 90% of it so that the
+        directory is not scanned again on every write
+        """
+        files = []
+        try:
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".pkl"): continue
+                path = os.path.join(self.cache_dir, name)
+                try: files.append([os.path.getmtime(path), path])
+                except Exception: pass
+        except Exception:
+            return
+        count = len(files)
+        if self.disk_max > 0 and count > self.disk_max:
+            files.sort()
+            for _, path in files[:count - int(self.disk_max * 0.9)]:
+                try:
+                    os.remove(path)
+                    count = count - 1
+                except Exception:
+                    pass
+        self.disk_count = count
+
+    def get(self, key):
+        with self.lock:
+            objs = self.entries.pop(key, None)
+            if objs is not None:
+                self.entries[key] = objs
+                self.hits = self.hits + 1
+                profile.parse_cache(True)
+                return self._copy(objs)
+        if self.cache_dir:
+            try:
+                disk_file = self._disk_file(key)
+                with open(disk_file, "rb") as ifh:
+                    [disk_key, objs] = pickle.load(ifh)
+                if disk_key == key:
+                    # mtime is the last use for the pruning
+                    os.utime(disk_file, None)
+                    self._put_mem(key, objs)
+                    with self.lock:
+                        self.disk_hits = self.disk_hits + 1
+                    profile.parse_cache(True)
+                    return self._copy(objs)
+            except Exception:
+                pass
+        with self.lock:
+            self.misses = self.misses + 1
+        profile.parse_cache(False)
+        return None
+
+    def _put_mem(self, key, objs):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = objs
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def put(self, key, objs):
+        objs = self._copy(objs)
+        self._put_mem(key, objs)
+        if self.cache_dir:
+            try:
+                disk_file = self._disk_file(key)
+                tmp_file = "{}.{}.tmp".format(disk_file, os.getpid())
+                with open(tmp_file, "wb") as ofh:
+                    pickle.dump([key, objs], ofh, protocol=2)
+                os.rename(tmp_file, disk_file)
+            except Exception:
+                return
+            with self.lock:
+                self.disk_count = self.disk_count + 1
+                prune = bool(self.disk_max > 0 and self.disk_count > self.disk_max)
+            if prune:
+                self._prune()
+
+parse_cache = ParseCache()
 
 class Template(object):
 
@@ -20,9 +184,15 @@ class Template(object):
         self.root = os.path.join(os.path.dirname(__file__), '..', 'templates')
         self.samples = os.path.join(self.root, 'test')
         index_file = env.get("SPYTEST_TEXTFSM_INDEX_FILENAME", "index")
+        self.index_path = os.path.abspath(os.path.join(self.root, index_file))
         self.cli_table = clitable.CliTable(index_file, self.root)
         self.platform = platform
         self.cli = cli
+        max_entries = int(env.get("SPYTEST_TEXTFSM_PARSE_CACHE", "0"))
+        if max_entries != parse_cache.max_entries:
+            cache_dir = env.get("SPYTEST_TEXTFSM_PARSE_CACHE_DIR", None)
+            disk_max = int(env.get("SPYTEST_TEXTFSM_PARSE_CACHE_DISK_MAX", "100000"))
+            parse_cache.configure(max_entries, cache_dir, disk_max)
 
     # find the template given command
     def get_tmpl(self, cmd):
@@ -32,6 +202,55 @@ class Template(object):
             return None
         return self.cli_table.index.index[row_idx]['Template']
 
+    # find the template given command, platform and cli - memoized
+    def lookup(self, cmd):
+        key = (self.index_path, cmd, self.platform, self.cli)
+        if key in lookup_cache:
+            return lookup_cache[key]
+        attrs = dict(Command=cmd)
+        if self.platform: attrs["Platform"] = self.platform
+        if self.cli: attrs["cli"] = self.cli
+        row_idx = self.cli_table.index.GetRowMatch(attrs)
+        tmpl_file = None
+        if row_idx:
+            tmpl_file = self.cli_table.index.index[row_idx]['Template']
+        with cache_lock:
+            if len(lookup_cache) >= lookup_cache_max:
+                lookup_cache.clear()
+            lookup_cache[key] = tmpl_file
+        return tmpl_file
+
+    # compile the given template once per process
+    def compile(self, tmpl_file):
+        tmpl_path = os.path.abspath(os.path.join(self.root, tmpl_file))
+        entry = compiled_cache.get(tmpl_path, None)
+        if entry:
+            return entry
+        with cache_lock:
+            entry = compiled_cache.get(tmpl_path, None)
+            if not entry:
+                with open(tmpl_path, "r") as tmpl_fp:
+                    fsm = textfsm.TextFSM(tmpl_fp)
+                header = [name.lower() for name in fsm.header]
+                mtime = os.path.getmtime(tmpl_path)
+                entry = [threading.Lock(), fsm, header, tmpl_path, mtime]
+                compiled_cache[tmpl_path] = entry
+        return entry
+
+    # compile all the templates referenced in the index
+    # returns the templates which failed to compile
+    def precompile(self):
+        tmpl_files, errs = set(), dict()
+        for row in self.cli_table.index.index:
+            for tmpl_file in row['Template'].split(":"):
+                tmpl_files.add(tmpl_file.strip())
+        for tmpl_file in sorted(tmpl_files):
+            try:
+                self.compile(tmpl_file)
+            except Exception as exp:
+                errs[tmpl_file] = str(exp)
+        return errs
+
     # retrive template and sameple file given the command
     def read_sample(self, cmd):
         tmpl_file = self.get_tmpl(cmd)
@@ -57,6 +276,37 @@ class Template(object):
 
     # find template the given command and apply on given data
     def apply(self, output, cmd):
+        tmpl_file = self.lookup(cmd)
+        if not tmpl_file:
+            attrs = dict(Command=cmd)
+            if self.platform: attrs["Platform"] = self.platform
+            if self.cli: attrs["cli"] = self.cli
+            msg = 'No template found for attributes: "%s"' % attrs
+            raise Exception('Unable to parse command "%s" - %s' % (cmd, msg))
+
+        # multiple templates need the merge logic of CliTable
+        if ":" in tmpl_file:
+            return [tmpl_file, self._apply_clitable(output, cmd)]
+
+        [lock, fsm, header, tmpl_path, mtime] = self.compile(tmpl_file)
+        cache_key = None
+        if parse_cache.enabled():
+            cache_key = parse_cache.make_key(tmpl_path, mtime, output)
+            objs = parse_cache.get(cache_key)
+            if objs is not None:
+                return [tmpl_file, objs]
+
+        with lock:
+            fsm.Reset()
+            rows = fsm.ParseText(output)
+            objs = [dict(zip(header, row)) for row in rows]
+            fsm.Reset()
+
+        if cache_key:
+            parse_cache.put(cache_key, objs)
+        return [tmpl_file, objs]
+
+    def _apply_clitable(self, output, cmd):
         attrs = dict(Command=cmd)
         if self.platform: attrs["Platform"] = self.platform
         if self.cli: attrs["cli"] = self.cli
@@ -70,23 +320,88 @@ class Template(object):
                         print("HEADER: {} ROW: {}".format(self.cli_table.header, row))
                     temp_dict[self.cli_table.header[index].lower()] = element
                 objs.append(temp_dict)
-            tmpl_file = self.get_tmpl(cmd)
-            return [tmpl_file, objs]
+            return objs
         except clitable.CliTableError as e:
             raise Exception('Unable to parse command "%s" - %s' % (cmd, str(e)))
 
     # apply the given template on given data
     def apply_textfsm(self, tmpl_file, data):
-        tmpl_file2 = os.path.join(self.root, tmpl_file)
-        tmpl_fp = open(tmpl_file2, "r")
-        out = textfsm.TextFSM(tmpl_fp).ParseText(data)
-        tmpl_fp.close()
+        [lock, fsm, _, _, _] = self.compile(tmpl_file)
+        with lock:
+            fsm.Reset()
+            out = list(fsm.ParseText(data))
+            fsm.Reset()
         return out
 
+def benchmark(count=10):
+    template = Template()
+    start = time.time()
+    errs = template.precompile()
+    compile_time = time.time() - start
+
+    # collect the command and sample data from the test folder
+    samples = []
+    if os.path.isdir(template.samples):
+        for row in template.cli_table.index.index:
+            cmd = row['Command']
+            if not re.match(r"^[\w\s\-]+$", cmd):
+                continue
+            [tmpl_file, data] = template.read_sample(cmd)
+            if tmpl_file != "NONE" and data:
+                samples.append([cmd, data])
+    if not samples:
+        print("No sample files found in {}".format(template.samples))
+        return
+
+    def _legacy(output, cmd):
+        template.cli_table.ParseCmd(output, dict(Command=cmd))
+        header = template.cli_table.header
+        objs = []
+        for row in template.cli_table:
+            temp_dict = {}
+            for index, element in enumerate(row):
+                temp_dict[header[index].lower()] = element
+            objs.append(temp_dict)
+        return objs
+
+    # verify the compiled templates parse the samples same as CliTable
+    mismatches = []
+    for cmd, data in samples:
+        try: expected = _legacy(data, cmd)
+        except Exception as exp: expected = str(exp)
+        try: actual = template.apply(data, cmd)[1]
+        except Exception as exp: actual = str(exp)
+        if expected != actual:
+            mismatches.append(cmd)
+
+    def _measure(func):
+        start = time.time()
+        for _ in range(count):
+            for cmd, data in samples:
+                try: func(data, cmd)
+                except Exception: pass
+        return time.time() - start
+
+    legacy = _measure(_legacy)
+    compiled = _measure(template.apply)
+    print("Templates Compiled: {} in {:.3f} sec".format(len(compiled_cache), compile_time))
+    print("Templates Failed: {}".format(len(errs)))
+    print("Samples: {} Iterations: {}".format(len(samples), count))
+    print("Mismatches: {} {}".format(len(mismatches), mismatches))
+    print("CliTable.ParseCmd: {:.3f} sec".format(legacy))
+    print("Compiled Template: {:.3f} sec".format(compiled))
+    if compiled > 0:
+        print("Speedup: {:.2f}x".format(legacy/compiled))
+
 if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--benchmark":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 10)
+        sys.exit(0)
+
     template = Template()
     if len(sys.argv) <= 2:
         print("USAGE: template.py <template file> <data file>")
+        print("       template.py --benchmark [iterations]")
         sys.exit(0)
 
     f = open(sys.argv[2], "r")
@@ -101,4 +416,3 @@ if __name__ == "__main__":
     except Exception as exp:
         print("============ ERROR: {}".format(exp))
         print (rv)
-
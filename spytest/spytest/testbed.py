@@ -4,8 +4,10 @@ import copy
 import json
 import shutil
 import tempfile
+import time
 from random import Random
 from itertools import permutations
+from itertools import islice
 from collections import OrderedDict
 
 from spytest.ordyaml import OrderedYaml
@@ -18,6 +20,166 @@ import utilities.common as utils
 testbeds_root = os.path.join(os.path.dirname(__file__), '..')
 testbeds_root = os.path.join(os.path.abspath(testbeds_root), "testbeds")
 
+class TopoMatcher(object):
+    """
+    Finds the testbed DUTs for the positions (D1, D2...) of a topology.
+    The TGEN and DUT link counts are computed once per testbed state and
+    the positions are filled by backtracking, where each pick removes the
+    DUTs without enough links from the choices of the remaining positions.
+    The positions are filled in order and the DUTs are tried in testbed
+    order, so that the setups found are the same as the permutation scan.
+    The setups found are memoized per normalized topology.
+    """
+
+    def __init__(self, tb, stamp=None):
+        self.tb = tb
+        self.stamp = stamp
+        self.tg_links = dict()
+        self.dut_links = dict()
+        self.results = dict()
+
+    def get_tg_links(self, dut):
+        if dut not in self.tg_links:
+            self.tg_links[dut] = len(self.tb.get_links(dut, None, "TG"))
+        return self.tg_links[dut]
+
+    def get_dut_links(self, dut, peer):
+        if dut not in self.dut_links:
+            counts = dict()
+            for _, partner, _ in self.tb.get_links(dut, None, "DUT"):
+                counts[partner] = counts.get(partner, 0) + 1
+            self.dut_links[dut] = counts
+        return self.dut_links[dut].get(peer, 0)
+
+    @staticmethod
+    def make_key(requests, properties, dut_list, num, randomise):
+        props = sorted([[str(d), sorted(v.items())] for d, v in properties.items()])
+        args = [arg for _, _, _, arg in requests]
+        return repr([args, props, dut_list, num, randomise])
+
+    def get_result(self, key):
+        found_setups = self.results.get(key, None)
+        if found_setups is None:
+            return None
+        return [list(setup) for setup in found_setups]
+
+    def set_result(self, key, found_setups):
+        self.results[key] = [list(setup) for setup in found_setups]
+
+    def build_constraints(self, log, requests, properties, num_duts, dut_list):
+        """
+        returns the candidate DUTs of each position and the minimum number of
+        links needed between the positions, None when the topology can't match
+        """
+        checks = [[False, 0] for _ in range(num_duts)]
+        links = [dict() for _ in range(num_duts)]
+        found = False
+        for from_dev, to_dev, res, arg in requests:
+            if from_dev == 'D' and to_dev == 'T':
+                pos = int(res.group(1)) - 1
+                if pos < 0 or pos >= num_duts:
+                    Testbed.trace2(log, "no match tg dut position", arg)
+                    return None
+                checks[pos][0] = True
+                checks[pos][1] = max(checks[pos][1], int(res.group(3)))
+                found = True
+            elif from_dev == 'D' and to_dev == 'D':
+                pos1, pos2 = int(res.group(1)) - 1, int(res.group(2)) - 1
+                if pos1 < 0 or pos1 >= num_duts or pos2 < 0 or pos2 >= num_duts:
+                    Testbed.trace2(log, "no match dut links position", arg)
+                    return None
+                count = max(links[pos1].get(pos2, 0), int(res.group(3)))
+                links[pos1][pos2] = links[pos2][pos1] = count
+                found = True
+            else:
+                print("UNKNOWN", arg)
+        if not found:
+            return None
+
+        domains = []
+        for pos, [check_name, tg_count] in enumerate(checks):
+            dut_req, domain = "D{}".format(pos+1), []
+            for dut in dut_list:
+                if check_name and not Testbed.check_dut_name(log, self.tb, dut_req, dut, properties):
+                    continue
+                if not Testbed.check_model(log, self.tb, dut_req, dut, properties):
+                    continue
+                if not Testbed.check_chip(log, self.tb, dut_req, dut, properties):
+                    continue
+                if self.get_tg_links(dut) < tg_count:
+                    Testbed.trace2(log, "no match tg links", dut_req, dut, tg_count)
+                    continue
+                domain.append(dut)
+            if not domain:
+                Testbed.trace2(log, "no candidate dut", dut_req, properties)
+                return None
+            domains.append(domain)
+        return [domains, links]
+
+    def _prune(self, pos, dut, domains, links):
+        retval = domains[:pos+1]
+        for pos2 in range(pos+1, len(domains)):
+            count = links[pos].get(pos2, 0)
+            domain = []
+            for dut2 in domains[pos2]:
+                if dut2 == dut:
+                    continue
+                if count and self.get_dut_links(dut, dut2) < count:
+                    continue
+                domain.append(dut2)
+            if not domain:
+                return None
+            retval.append(domain)
+        return retval
+
+    def solve(self, log, constraints, properties, dut_list):
+        """
+        generates the setups matching the constraints using the given DUTs
+        """
+        [domains, links] = constraints
+        domains = [[dut for dut in domain if dut in dut_list] for domain in domains]
+        if not all(domains):
+            return
+        setup = [None] * len(domains)
+
+        def _fill(pos, domains):
+            if pos >= len(domains):
+                if Testbed.check_dut_names(log, self.tb, setup, properties):
+                    yield list(setup)
+                return
+            for dut in domains[pos]:
+                setup[pos] = dut
+                pruned = self._prune(pos, dut, domains, links)
+                if pruned is None:
+                    continue
+                for found in _fill(pos + 1, pruned):
+                    yield found
+
+        for found in _fill(0, domains):
+            yield found
+
+    def find_setups(self, log, requests, properties, num_duts, dut_list, num, randomise):
+        found_setups = []
+        constraints = self.build_constraints(log, requests, properties, num_duts, dut_list)
+        while constraints and len(found_setups) < num:
+            used_list = [] if randomise else [j for i in found_setups for j in i]
+            dut_list2 = [dut for dut in dut_list if dut not in used_list]
+            if not Testbed.check_dut_name_any(log, dut_list2, properties):
+                break
+            dut_list2 = Testbed.check_dut_names_any(log, dut_list2, properties)
+            if len(dut_list2) < num_duts:
+                break
+            solutions = self.solve(log, constraints, properties, dut_list2)
+            if randomise:
+                found_setups.extend(islice(solutions, num))
+                break
+            found_match = next(solutions, None)
+            if not found_match:
+                break
+            Testbed.trace2(log, "found match", found_match, properties)
+            found_setups.append(found_match)
+        return found_setups
+
 class Testbed(object):
 
     def __init__(self, filename=None, logger=None, cfg=None, flex_dut=False, flex_port=False):
@@ -74,6 +236,7 @@ class Testbed(object):
         self.global_params = SpyTestDict()
         self.valid = False
         self.logger = logger or getNoneLogger()
+        self.topo_matcher = None
         self._load_and_check(filename)
 
     def _debug(self, msg):
@@ -1619,8 +1782,53 @@ class Testbed(object):
         cache[from_dev][to_dev][dev_type] = entries
         return entries
 
+    def get_topo_matcher(self):
+        stamp = repr([self.derived.duts, self.derived.down_ports])
+        if not self.topo_matcher or self.topo_matcher.stamp != stamp:
+            self.topo_matcher = TopoMatcher(self, stamp)
+        return self.topo_matcher
+
     @staticmethod
     def identify_topology_randomise(log, tb, rdict, num, randomise, *args):
+        if env.get("SPYTEST_TESTBED_TOPO_SOLVER", "1") == "0":
+            return Testbed.identify_topology_permutations(log, tb, rdict, num, randomise, *args)
+
+        # normalize the topo and get the DUTs needed in topo
+        arg_list = Testbed._split_args(*args)
+        [requests, properties, req_duts, errs] = Testbed.normalize_topo(*arg_list)
+
+        # bailout if TG card/model is not satified
+        errs = Testbed.ensure_tgen_model_and_card(log, tb, properties, errs)
+        if errs:
+            Testbed.trace2(log, "tgen requirements not met", errs, properties)
+            return [None, None, None]
+
+        # build available duts by excluding used ones from all
+        used_list = []
+        if rdict:
+            for _, duts in rdict.items():
+                used_list.extend(duts)
+        dut_list = []
+        for dut in tb.get_device_names("DUT"):
+            if dut not in used_list:
+                dut_list.append(dut)
+
+        matcher = tb.get_topo_matcher()
+        key = matcher.make_key(requests, properties, dut_list, num, randomise)
+        found_setups = matcher.get_result(key)
+        if found_setups is None:
+            found_setups = matcher.find_setups(log, requests, properties,
+                                  len(req_duts), dut_list, num, randomise)
+            matcher.set_result(key, found_setups)
+
+        if not found_setups:
+            Testbed.trace2(log, "not found match", "req_duts", req_duts, properties)
+            return [None, None, None]
+
+        return [found_setups, properties, errs]
+
+    @staticmethod
+    def identify_topology_permutations(log, tb, rdict, num, randomise, *args):
 
         # normalize the topo and get the DUTs needed in topo
         arg_list = Testbed._split_args(*args)
@@ -1965,3 +2173,82 @@ class Testbed(object):
         except Exception:
             return None
 
+
+def _synthetic_testbed(num_duts):
+    """
+    builds a testbed with the DUTs connected in a ring, a link to the
+    DUT across the ring from every other DUT and a varying TGEN links
+    """
+    models = [["AS7712", "TD3"], ["Z9100", "TH"], ["AS9716", "TH3"]]
+    lines = ["version: 2.0"]
+    lines.append("services: {default: !include sonic_services.yaml}")
+    lines.append("params: !include sonic_params.yaml")
+    lines.append("builds: !include sonic_builds.yaml")
+    lines.append("configs: {default: !include sonic_configs.yaml}")
+    lines.append("devices:")
+    dut_fmt = "  dut-{:02d}: {{device_type: DevSonic, params: {{model: {}, chip: {}}}, "
+    dut_fmt = dut_fmt + "access: {{protocol: telnet, ip: 1.2.3.4, port: {}}}, "
+    dut_fmt = dut_fmt + "credentials: {{username: admin, password: admin, altpassword: test}}, "
+    dut_fmt = dut_fmt + "properties: {{config: default, build: default, services: default, params: def_dut}}}}"
+    for i in range(num_duts):
+        [model, chip] = models[i % len(models)]
+        lines.append(dut_fmt.format(i, model, chip, 2000 + i))
+    lines.append("  tg-01: {device_type: TGEN, properties: {type: ixia, version: 8.40, ip: 1.2.3.5, params: def_tg}}")
+    lines.append("topology:")
+    tg_port = 0
+    for i in range(num_duts):
+        lines.append("  dut-{:02d}:".format(i))
+        lines.append("    interfaces:")
+        peers = [[(i + 1) % num_duts, 2]]
+        if i % 2 == 0 and i < num_duts // 2:
+            peers.append([i + num_duts // 2, 1])
+        port = 0
+        for peer, count in peers:
+            for _ in range(count):
+                link = "      Ethernet{}: {{EndDevice: dut-{:02d}, EndPort: Ethernet{}, params: def_link}}"
+                lines.append(link.format(port, peer, 100 + port + i * 4))
+                port = port + 4
+        for _ in range(i % 4):
+            link = "      Ethernet{}: {{EndDevice: tg-01, EndPort: 1/{}, params: def_tg_link}}"
+            lines.append(link.format(port, tg_port))
+            port, tg_port = port + 4, tg_port + 1
+    return "\n".join(lines)
+
+def benchmark(sizes=(16, 32), legacy=True):
+    topologies = [
+        [1, "D1T1:2 D2T1:2 D1D2:2"],
+        [1, "D1D2:2 D2D3:2 D1D3:1"],
+        [1, "D1D2:2 D2D3:2 D3D4:2 D1T1:3 D4T1:3"],
+        [1, "D1D2:1 D2D3:2 D1T1:1 D1MODEL:AS9716 D3CHIP:TH"],
+        [100, "D1D2:2 D2D3:2 D1T1:2"],
+        [100, "D1T1:2 D2T1:2"],
+    ]
+    for num_duts in sizes:
+        filename = Testbed.write_file(_synthetic_testbed(num_duts))
+        tb = Testbed(filename)
+        os.remove(filename)
+        print("DUTs: {} Valid: {}".format(num_duts, tb.is_valid()))
+        for num, topo in topologies:
+            tb.topo_matcher = None
+            start = time.time()
+            rv = Testbed.identify_topology(None, tb, None, num, topo)
+            solver = time.time() - start
+            start = time.time()
+            Testbed.identify_topology(None, tb, None, num, topo)
+            cached = time.time() - start
+            found = len(rv[0] or [])
+            msg = "  {:<48} setups: {:>3} solver: {:.4f} sec cached: {:.4f} sec"
+            msg = msg.format("{}x {}".format(num, topo), found, solver, cached)
+            if legacy:
+                start = time.time()
+                rv2 = Testbed.identify_topology_permutations(None, tb, None, num, False, topo)
+                msg = msg + " permutations: {:.3f} sec".format(time.time() - start)
+                assert rv == rv2, "{} {} {}".format(topo, rv, rv2)
+            print(msg)
+
+if __name__ == "__main__":
+    import sys
+    if "--no-legacy" in sys.argv:
+        benchmark(legacy=False)
+    else:
+        benchmark()
@@ -1,21 +1,29 @@
 """
-AF_PACKET receive support
+AF_PACKET receive and batched transmit support
 
 When VLAN offload is enabled on the NIC Linux will not deliver the VLAN tag
 in the data returned by recv. Instead, it delivers the VLAN TCI in a control
 message. Python 2.x doesn't have built-in support for recvmsg, so we have to
 use ctypes to call it. The recv function exported by this module reconstructs
 the VLAN tag if it was offloaded.
+
+The RxRing class maps a PACKET_RX_RING (TPACKET_V2) into the process so that
+the frames can be inspected in place, without a system call or copy for each
+frame. The VLAN tag is reconstructed from the frame header in the same way.
 """
 
+import mmap
+import select
 import struct
 from ctypes import sizeof
 from ctypes import get_errno
 from ctypes import byref
+from ctypes import addressof
 from ctypes import c_void_p
 from ctypes import cast
 from ctypes import pointer
 from ctypes import create_string_buffer
+from ctypes import string_at
 from ctypes import c_size_t
 from ctypes import c_int
 from ctypes import POINTER
@@ -28,6 +36,11 @@ from ctypes import c_uint32
 ETH_P_8021Q = 0x8100
 SOL_PACKET = 263
 PACKET_AUXDATA = 8
+PACKET_RX_RING = 5
+PACKET_VERSION = 10
+TPACKET_V2 = 1
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1 << 0
 TP_STATUS_VLAN_VALID = 1 << 4
 
 class struct_iovec(Structure):
@@ -47,6 +60,12 @@ class struct_msghdr(Structure):
         ("msg_flags", c_int),
     ]
 
+class struct_mmsghdr(Structure):
+    _fields_ = [
+        ("msg_hdr", struct_msghdr),
+        ("msg_len", c_uint),
+    ]
+
 class struct_cmsghdr(Structure):
     _fields_ = [
         ("cmsg_len", c_size_t),
@@ -65,11 +84,70 @@ class struct_tpacket_auxdata(Structure):
         ("tp_padding", c_ushort),
     ]
 
+class struct_tpacket_req(Structure):
+    _fields_ = [
+        ("tp_block_size", c_uint),
+        ("tp_block_nr", c_uint),
+        ("tp_frame_size", c_uint),
+        ("tp_frame_nr", c_uint),
+    ]
+
+# struct tpacket2_hdr: status, len, snaplen, mac, net, sec, nsec, vlan_tci
+TPACKET2_HDR = struct.Struct("IIIHHIIH")
+
 libc = CDLL("libc.so.6")
 recvmsg = libc.recvmsg
 recvmsg.argtypes = [c_int, POINTER(struct_msghdr), c_int]
 recvmsg.retype = c_int
 
+try:
+    libc_sendmmsg = libc.sendmmsg
+    libc_sendmmsg.argtypes = [c_int, POINTER(struct_mmsghdr), c_uint, c_int]
+    libc_sendmmsg.restype = c_int
+except AttributeError:
+    libc_sendmmsg = None
+
+def sendmmsg_supported():
+    return bool(libc_sendmmsg)
+
+class SendmmsgError(RuntimeError):
+    """
+    Raised when sendmmsg fails, sent is the number of leading frames
+    that were transmitted before the failure
+    """
+    def __init__(self, msg, sent):
+        RuntimeError.__init__(self, msg)
+        self.sent = sent
+
+def sendmmsg(sk, frames):
+    """
+    Send the given frames on a bound AF_PACKET socket with as few
+    sendmmsg system calls as possible
+    @sk Socket
+    @frames list of frame bytes
+    Raises SendmmsgError carrying the count of frames already sent
+    """
+    count = len(frames)
+    if not count:
+        return 0
+    bufs = [create_string_buffer(frame, len(frame)) for frame in frames]
+    iovs = (struct_iovec * count)()
+    msgs = (struct_mmsghdr * count)()
+    for index, buf in enumerate(bufs):
+        iovs[index].iov_base = cast(buf, c_void_p)
+        iovs[index].iov_len = len(frames[index])
+        msgs[index].msg_hdr.msg_iov = pointer(iovs[index])
+        msgs[index].msg_hdr.msg_iovlen = 1
+    sent = 0
+    while sent < count:
+        first = cast(addressof(msgs) + sent * sizeof(struct_mmsghdr), POINTER(struct_mmsghdr))
+        rv = libc_sendmmsg(sk.fileno(), first, count - sent, 0)
+        if rv <= 0:
+            msg = "sendmmsg failed: rv=%d errno=%d sent=%d/%d" % (rv, get_errno(), sent, count)
+            raise SendmmsgError(msg, sent)
+        sent = sent + rv
+    return sent
+
 def enable_auxdata(sk):
     """
     Ask the kernel to return the VLAN tag in a control message
@@ -124,3 +202,79 @@ def recv(sk, bufsize):
         return buf.raw[:12] + tag + buf.raw[12:rv]
     else:
         return buf.raw[:rv]
+
+class RxRing(object):
+    """
+    Memory mapped PACKET_RX_RING on an AF_PACKET socket
+    @sk Socket - must not be bound yet
+    @frame_size Maximum frame size including the tpacket header
+    @frame_nr Number of frames in the ring
+    """
+
+    def __init__(self, sk, frame_size=16384, frame_nr=512):
+        page_size = mmap.PAGESIZE
+        frame_size = ((frame_size + 15) // 16) * 16
+        block_size = ((frame_size + page_size - 1) // page_size) * page_size
+        frames_per_block = block_size // frame_size
+        block_nr = (frame_nr + frames_per_block - 1) // frames_per_block
+        self.sk = sk
+        self.frame_size = frame_size
+        self.frame_nr = block_nr * frames_per_block
+        self.block_size = block_size
+        self.frames_per_block = frames_per_block
+        sk.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V2)
+        req = struct_tpacket_req(block_size, block_nr, frame_size, self.frame_nr)
+        sk.setsockopt(SOL_PACKET, PACKET_RX_RING, string_at(addressof(req), sizeof(req)))
+        self.ring = mmap.mmap(sk.fileno(), block_size * block_nr,
+                              mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        self.poller = select.poll()
+        self.poller.register(sk.fileno(), select.POLLIN | select.POLLERR)
+        self.index = 0
+
+    def close(self):
+        try: self.ring.close()
+        except Exception: pass
+
+    def _offset(self, index):
+        block, frame = divmod(index, self.frames_per_block)
+        return block * self.block_size + frame * self.frame_size
+
+    def _next(self, timeout):
+        offset = self._offset(self.index)
+        if not struct.unpack_from("I", self.ring, offset)[0] & TP_STATUS_USER:
+            self.poller.poll(timeout)
+            if not struct.unpack_from("I", self.ring, offset)[0] & TP_STATUS_USER:
+                return None
+        return offset
+
+    def _release(self, offset):
+        struct.pack_into("I", self.ring, offset, TP_STATUS_KERNEL)
+        self.index = (self.index + 1) % self.frame_nr
+
+    def recv(self, timeout=1000, tail=12, full=False):
+        """
+        Wait for the next frame and return (length, tail bytes, frame)
+        The frame bytes are only copied out of the ring when full is set
+        @timeout Poll timeout in milli seconds
+        @tail Number of bytes to return from the end of the frame
+        @full Return the complete frame including the reconstructed VLAN tag
+        """
+        offset = self._next(timeout)
+        if offset is None:
+            return None
+        try:
+            (status, _, snaplen, mac, _, _, _, tci) = TPACKET2_HDR.unpack_from(self.ring, offset)
+            start = offset + mac
+            end = start + snaplen
+            vlan = bool(tci != 0 or status & TP_STATUS_VLAN_VALID)
+            length = snaplen + 4 if vlan else snaplen
+            last = self.ring[max(start, end - tail):end]
+            data = None
+            if full and vlan:
+                tag = struct.pack("!HH", ETH_P_8021Q, tci)
+                data = self.ring[start:start+12] + tag + self.ring[start+12:end]
+            elif full:
+                data = self.ring[start:end]
+        finally:
+            self._release(offset)
+        return (length, last, data)
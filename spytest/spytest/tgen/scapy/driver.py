@@ -1,5 +1,6 @@
 import os
 import time
+import heapq
 import traceback
 import threading
 
@@ -118,9 +119,10 @@ class ScapyDriver(object):
             # read packets
             while self.rx_any_enable():
                 try:
-                    packet = self.packet.readp(iface=self.iface)
-                    if packet:
-                        self.handle_recv(None, packet)
+                    decode = self.captureState.is_set()
+                    entry = self.packet.readp(iface=self.iface, decode=decode)
+                    if entry:
+                        self.handle_recv(*entry)
                 except Exception as e:
                     if str(e) != "[Errno 100] Network is down":
                         self.logger.debug(e, traceback.format_exc())
@@ -142,30 +144,33 @@ class ScapyDriver(object):
                 self.packet.set_link(status)
             self.iface_status = status
 
-    def handle_stats(self, packet):
-        pktlen = 0 if not packet else len(packet)
+    def handle_stats(self, pktlen, sig):
         framesReceived = self.port.incrStat('framesReceived')
         self.port.incrStat('bytesReceived', pktlen)
         if self.dbg > 2:
             self.logger.debug("{} framesReceived: {}".format(self.iface, framesReceived))
         if pktlen > 1518:
             self.port.incrStat('oversizeFramesReceived')
-        for stream in self.port.track_streams:
-            if self.packet.match_stream(stream, packet):
-                stream.incrStat('framesReceived')
-                stream.incrStat('bytesReceived', pktlen)
-                break # no need to check in other streams
+        stream = self.port.find_track_stream(sig, self.packet.match_stream_sig)
+        if stream:
+            stream.incrStat('framesReceived')
+            stream.incrStat('bytesReceived', pktlen)
 
     def handle_capture(self, packet):
         self.pkts_captured.append(packet)
 
-    def handle_recv(self, hdr, packet):
+    # packet is only decoded when the capture is enabled
+    def handle_recv(self, pktlen, sig, packet):
         if self.statState.is_set():
-            self.handle_stats(packet)
-        if self.captureState.is_set():
+            self.handle_stats(pktlen, sig)
+        if self.captureState.is_set() and packet is not None:
             self.handle_capture(packet)
 
     def txInit(self):
+        self.tx_rates = dict()
+        self.tx_tick = self.utils.get_env_int("SPYTEST_SCAPY_TX_TICK_USEC", 200) / 1000000.0
+        self.tx_rescan = 0.1
+        self.tx_resync = 1.0
         self.txState = threading.Event()
         self.txState.clear()
         self.txStateAck = dict()
@@ -301,9 +306,10 @@ class ScapyDriver(object):
                     self.logger.debug(" start {} {}/{}".format(stream.stream_id, stream.enable, stream.enable2))
                 if stream.enable and stream.enable2:
                     pwa = self.packet.build_first(stream)
-                    pwa.tx_time = time.clock()
+                    pwa.tx_time = self.utils.clock()
                     pwa_list.append(pwa)
                     sids[stream.stream_id] = 0
+                    self.tx_rate_start(pwa)
                     self.stop_ack_wait(stream.stream_id)
         except Exception as exp:
             self.logger.log_exception(exp, traceback.format_exc())
@@ -312,83 +318,129 @@ class ScapyDriver(object):
 
     def txThreadMainInner(self):
 
-        sids = {}
-        pwa_list = []
+        sids, heap, pending = {}, [], []
+        self.tx_rates = dict()
         self.logger.debug("txThreadMainInner {} start {}".format(self.iface, self.port.streams.keys()))
-        if not self.txThreadMainInnerStart(pwa_list, sids):
+        if not self.txThreadMainInnerStart(pending, sids):
             self.logger.debug("txThreadMainInner {} Nothing Todo".format(self.iface))
             return
 
-        tx_count = 0
+        # heap of (absolute deadline, sequence, pwa) - the next deadline of
+        # a stream is derived from its previous deadline and not from the time
+        # the packet was actually sent so that the errors don't accumulate
+        tx_count, seq, rescan = 0, 0, 0
         while (self.txState.is_set()):
-            # call start again to see if new streams are created
-            # while there are transmitting streams
-            if not self.txThreadMainInnerStart(pwa_list, sids):
-                break
-
-            # sort based on next packet send time
-            pwa_list.sort(key=self.pwa_sort)
+            now = self.utils.clock()
+
+            # check for new streams created while transmitting
+            if now >= rescan or not heap:
+                if not heap and not pending:
+                    self.txThreadMainInnerStart(pending, sids)
+                    if not pending: break
+                elif now >= rescan:
+                    self.txThreadMainInnerStart(pending, sids)
+                for pwa in pending:
+                    heapq.heappush(heap, (pwa.tx_time, seq, pwa))
+                    seq = seq + 1
+                pending = []
+                rescan = now + self.tx_rescan
+
+            (deadline, _, pwa) = heap[0]
+            if not pwa.stream.enable or not pwa.stream.enable2:
+                heapq.heappop(heap)
+                self.tx_rate_done(pwa)
+                continue
+
+            # all the streams due within the tick are sent back to back
+            if deadline > now + self.tx_tick:
+                # send the frames queued so far before waiting
+                self.packet.flush(self.iface)
+                self.utils.sleep_until(self.utils.min_value(deadline, rescan))
+                continue
+
+            heapq.heappop(heap)
+            try:
+                pkt = self.send_packet(pwa, pwa.stream.stream_id)
+                bytesSent = len(pkt)
 
-            pwa_next_list = []
-            for pwa in pwa_list:
-                if not pwa.stream.enable or not pwa.stream.enable2:
-                    continue
-                self.pwa_wait(pwa)
-                try:
-                    send_start_time = time.clock()
-                    pkt = self.send_packet(pwa, pwa.stream.stream_id)
-                    bytesSent = len(pkt)
-                    send_time = time.clock() - send_start_time
-
-                    # increment port counters
-                    framesSent = self.port.incrStat('framesSent')
-                    self.port.incrStat('bytesSent', bytesSent)
-                    if self.dbg > 2:
-                        self.logger.debug("{} framesSent: {}".format(self.iface, framesSent))
-                    pwa.stream.incrStat('framesSent')
-                    pwa.stream.incrStat('bytesSent', bytesSent)
-                    tx_count = tx_count + 1
-
-                    # increment stream counters
-                    stream_tx = self.stream_pkts[pwa.stream.stream_id] + 1
-                    self.stream_pkts[pwa.stream.stream_id] = stream_tx
-                    if self.dbg > 2 or (self.dbg > 1 and stream_tx%100 == 99):
-                        self.logger.debug("{}/{} framesSent: {}".format(self.iface,
-                                            pwa.stream.stream_id, stream_tx))
-                except Exception as e:
-                    self.logger.log_exception(e, traceback.format_exc())
-                    pwa.stream.enable2 = False
-                else:
-                    build_start_time = time.clock()
-                    pwa = self.packet.build_next(pwa)
-                    if not pwa: continue
-                    build_time = time.clock() - build_start_time
-                    ipg = self.packet.build_ipg(pwa)
-                    pwa.tx_time = time.clock() + ipg - build_time - send_time
-                    pwa_next_list.append(pwa)
-            pwa_list = pwa_next_list
+                # increment port counters
+                framesSent = self.port.incrStat('framesSent')
+                self.port.incrStat('bytesSent', bytesSent)
+                if self.dbg > 2:
+                    self.logger.debug("{} framesSent: {}".format(self.iface, framesSent))
+                pwa.stream.incrStat('framesSent')
+                pwa.stream.incrStat('bytesSent', bytesSent)
+                tx_count = tx_count + 1
+                self.tx_rate_sent(pwa, now)
+
+                # increment stream counters
+                stream_tx = self.stream_pkts[pwa.stream.stream_id] + 1
+                self.stream_pkts[pwa.stream.stream_id] = stream_tx
+                if self.dbg > 2 or (self.dbg > 1 and stream_tx%100 == 99):
+                    self.logger.debug("{}/{} framesSent: {}".format(self.iface,
+                                        pwa.stream.stream_id, stream_tx))
+            except Exception as e:
+                self.logger.log_exception(e, traceback.format_exc())
+                pwa.stream.enable2 = False
+                self.tx_rate_done(pwa)
+                continue
+
+            stream = pwa.stream
+            pwa = self.packet.build_next(pwa)
+            if not pwa:
+                self.tx_rate_done(None, stream)
+                continue
+            pwa.tx_time = deadline + self.packet.build_ipg(pwa)
+            if pwa.tx_time < now - self.tx_resync:
+                # too far behind the schedule - don't try to catch up
+                pwa.tx_time = now
+            heapq.heappush(heap, (pwa.tx_time, seq, pwa))
+            seq = seq + 1
+
+        self.packet.flush(self.iface)
+        for _, _, pwa in heap:
+            self.tx_rate_done(pwa)
         self.logger.debug("txThreadMainInner {} Completed {}".format(self.iface, tx_count))
 
-    def pwa_sort(self, pwa):
-        return pwa.tx_time
-
-    def pwa_wait(self, pwa):
-        delay = pwa.tx_time - time.clock()
-        if self.dbg > 2 or (self.dbg > 1 and pwa.left != 0):
-            self.logger.debug("stream: {} delay: {} pps: {}".format(pwa.stream.stream_id, delay, pwa.rate_pps))
-        if delay <= 0:
-            # yield
-            time.sleep(0)
-        elif delay > 1.0/10:
-            self.utils.msleep(delay * 1000, 10)
-        elif delay > 1.0/100:
-            self.utils.msleep(delay * 1000, 1)
-        elif delay > 1.0/200:
-            self.utils.usleep(delay * 1000 * 1000, 100)
-        elif delay > 1.0/500:
-            self.utils.usleep(delay * 1000 * 1000, 10)
-        else:
-            self.utils.usleep(delay * 1000 * 1000)
+    def tx_rate_start(self, pwa):
+        pps = self.utils.min_value(pwa.rate_pps, self.packet.max_rate_pps)
+        period = float(pwa.pkts_per_burst) / pps if pps > 0 else 0
+        self.tx_rates[pwa.stream.stream_id] = [pps, period, 0, 0, 0, None]
+
+    def tx_rate_sent(self, pwa, now):
+        entry = self.tx_rates.get(pwa.stream.stream_id, None)
+        if entry:
+            if not entry[2]: entry[3] = now
+            entry[2] = entry[2] + 1
+            entry[4] = now
+
+    @staticmethod
+    def tx_rate_achieved(entry):
+        # frames over the time from first frame till the end of the last burst
+        [_, period, frames, first, last, _] = entry
+        span = last - first + period
+        return float(frames) / span if frames and span > 0 else 0.0
+
+    def tx_rate_done(self, pwa, stream=None):
+        stream = stream or pwa.stream
+        self.packet.precompile_release(stream.stream_id)
+        entry = self.tx_rates.get(stream.stream_id, None)
+        if not entry or entry[5] is not None:
+            return
+        entry[5] = self.tx_rate_achieved(entry)
+        msg = "{}/{} TX rate requested: {} pps achieved: {:.2f} pps frames: {}"
+        self.logger.info(msg.format(self.iface, stream.stream_id, entry[0], entry[5], entry[2]))
+
+    # stream_id --> [requested pps, achieved pps, frames sent]
+    def get_tx_rates(self):
+        retval = dict()
+        # the TX thread replaces and updates the entries meanwhile
+        for stream_id, entry in list(self.tx_rates.items()):
+            achieved = entry[5]
+            if achieved is None:
+                achieved = self.tx_rate_achieved(entry)
+            retval[stream_id] = [entry[0], achieved, entry[2]]
+        return retval
 
     def send_packet(self, pwa, stream_name):
         return self.packet.send_packet(pwa, self.iface, stream_name, pwa.left)
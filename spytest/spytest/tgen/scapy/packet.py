@@ -130,6 +130,13 @@ class ScapyPacket(object):
         except Exception: self.logger.info("SCAPY VERSION = UNKNOWN")
         self.utils = Utils(self.dry, logger=self.logger)
         self.max_rate_pps = self.utils.get_env_int("SPYTEST_SCAPY_MAX_RATE_PPS", 100)
+        self.precompile_max = self.utils.get_env_int("SPYTEST_SCAPY_PRECOMPILE_MAX", 1024)
+        self.precompile_budget = self.utils.get_env_int("SPYTEST_SCAPY_PRECOMPILE_BUDGET", 4*1024*1024)
+        self.precompiled = dict()
+        self.tx_batch = self.utils.get_env_int("SPYTEST_SCAPY_TX_BATCH", 64)
+        if not afpacket.sendmmsg_supported(): self.tx_batch = 0
+        self.tx_queue = []
+        self.tx_raw_sock = None
         self.dbg = dbg
         self.show_summary = bool(self.dbg > 2)
         self.hex = hex
@@ -138,6 +145,8 @@ class ScapyPacket(object):
         self.tx_count = 0
         self.rx_count = 0
         self.rx_sock = None
+        self.rx_ring = None
+        self.rx_ring_frames = self.utils.get_env_int("SPYTEST_SCAPY_RX_RING_FRAMES", 512)
         self.tx_sock = None
         self.finished = False
         self.exabgp_nslist = []
@@ -225,8 +234,14 @@ class ScapyPacket(object):
         self.logger.info("ScapyPacket {} cleanup...".format(self.iface))
         self.exabgpd_stop_all()
         self.finished = True
+        if self.rx_ring:
+            self.rx_ring.close()
+            self.rx_ring = None
         self.rx_sock = self.close_sock(self.rx_sock)
         self.tx_sock = self.close_sock(self.tx_sock)
+        self.tx_raw_sock = self.close_sock(self.tx_raw_sock)
+        self.tx_queue = []
+        self.precompiled.clear()
         self.init_bridge(self.iface)
         self.finished = False
 
@@ -235,6 +250,12 @@ class ScapyPacket(object):
         ETH_P_ALL = 3
         self.rx_sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
         self.rx_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 12 * 1024)
+        if self.rx_ring_frames > 0:
+            try:
+                self.rx_ring = afpacket.RxRing(self.rx_sock, 16 * 1024, self.rx_ring_frames)
+            except Exception as exp:
+                self.logger.info("RX ring not available on {}: {}".format(self.iface, exp))
+                self.rx_ring = None
         self.rx_sock.bind((self.iface+"-rx", 3))
         afpacket.enable_auxdata(self.rx_sock)
 
@@ -242,7 +263,8 @@ class ScapyPacket(object):
         msg = "link:{} status:{}".format
         self.logger.debug(msg(iface, status))
 
-    def readp(self, iface):
+    # returns (frame length, stream signature, decoded packet or None)
+    def readp(self, iface, decode=True):
 
         if self.dry:
             time.sleep(2)
@@ -251,25 +273,36 @@ class ScapyPacket(object):
         if not self.iface:
             return None
 
+        decode = bool(decode or self.dbg > 1)
         try:
-            data = afpacket.recv(self.rx_sock, 12 * 1024)
+            if self.rx_ring:
+                entry = self.rx_ring.recv(1000, 12, decode)
+                if not entry:
+                    return None
+                (pktlen, tail, data) = entry
+            else:
+                data = afpacket.recv(self.rx_sock, 12 * 1024)
+                (pktlen, tail) = (len(data), data[-12:])
         except Exception as exp:
             if self.finished:
                 return None
             raise exp
-        packet = Ether(data)
+        packet = Ether(data) if decode else None
         self.rx_count = self.rx_count + 1
         self.trace_stats()
 
         if self.dbg > 1:
             cmd = "" if not self.show_summary else packet.command()
             msg = "readp:{} len:{} count:{} {}".format
-            self.logger.debug(msg(iface, len(data), self.rx_count, cmd))
+            self.logger.debug(msg(iface, pktlen, self.rx_count, cmd))
 
         if self.dbg > 2:
             self.trace_packet(packet, self.hex)
 
-        return packet
+        sig = tail[:8]
+        if not isinstance(sig, str):
+            sig = sig.decode("latin-1")
+        return (pktlen, sig, packet)
 
     def sendp(self, pkt, data, iface, stream_name, left):
         self.tx_count = self.tx_count + 1
@@ -284,20 +317,56 @@ class ScapyPacket(object):
             self.trace_packet(pkt, self.hex)
 
         if not self.dry:
-            if not self.tx_sock:
-                try:
-                    self.tx_sock = L2Socket(iface)
-                except Exception as exp:
-                    self.logger.debug("Failed to create L2Socket {} {}".format(iface, exp))
-
-            if self.tx_sock:
-                try: return self.tx_sock.send(data)
-                except Exception: pass
+            if self.tx_batch > 1 and self.tx_queue_open(iface):
+                self.tx_queue.append(data)
+                if len(self.tx_queue) >= self.tx_batch:
+                    self.flush(iface)
+                return len(data)
+            self.send_one(data, iface)
+
+    def send_one(self, data, iface):
+        if not self.tx_sock:
             try:
-                sendp(data, iface=iface, verbose=False)
+                self.tx_sock = L2Socket(iface)
             except Exception as exp:
-                self.logger.debug("Failed to send legacy {} {}".format(iface, exp))
-                if self.is_vde: self.os_system("ip link set dev {0} up".format(iface))
+                self.logger.debug("Failed to create L2Socket {} {}".format(iface, exp))
+
+        if self.tx_sock:
+            try: return self.tx_sock.send(data)
+            except Exception: pass
+        try:
+            sendp(data, iface=iface, verbose=False)
+        except Exception as exp:
+            self.logger.debug("Failed to send legacy {} {}".format(iface, exp))
+            if self.is_vde: self.os_system("ip link set dev {0} up".format(iface))
+
+    def tx_queue_open(self, iface):
+        if not self.tx_raw_sock:
+            try:
+                self.tx_raw_sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW)
+                self.tx_raw_sock.bind((iface, 0))
+            except Exception as exp:
+                self.logger.debug("Failed to create TX socket {} {}".format(iface, exp))
+                self.tx_raw_sock = self.close_sock(self.tx_raw_sock)
+                self.tx_batch = 0
+        return bool(self.tx_raw_sock)
+
+    def flush(self, iface):
+        """
+        send all the queued frames using batched system calls
+        """
+        if not self.tx_queue:
+            return 0
+        (frames, self.tx_queue) = (self.tx_queue, [])
+        try:
+            return afpacket.sendmmsg(self.tx_raw_sock, frames)
+        except Exception as exp:
+            self.logger.debug("Failed to send batch {} {}".format(iface, exp))
+            sent = getattr(exp, "sent", 0)
+        # send the frames not sent in batch one at a time
+        for data in frames[sent:]:
+            self.send_one(data, iface)
+        return len(frames)
 
     def trace_stats(self):
         #self.logger.debug("Name: {} RX: {} TX: {}".format(self.iface, self.rx_count, self.tx_count))
@@ -316,7 +385,7 @@ class ScapyPacket(object):
         if fields: self.show_pkt(pkt)
         if hex: hexdump(pkt)
 
-    def send_packet(self, pwa, iface, stream_name, left):
+    def build_bytes(self, pwa):
         if pwa.padding:
             strpkt = str(pwa.pkt/pwa.padding)
         else:
@@ -334,10 +403,89 @@ class ScapyPacket(object):
             crc = binascii.unhexlify(crc1)
         except Exception:
             crc = binascii.unhexlify('00' * 4)
-        bstr = bytes(strpkt+crc)
+        return bytes(strpkt+crc)
+
+    def send_packet(self, pwa, iface, stream_name, left):
+        if pwa.ring:
+            bstr = pwa.ring[pwa.ring_index]
+        else:
+            bstr = self.build_bytes(pwa)
         self.sendp(pwa.pkt, bstr, iface, stream_name, left)
         return bstr
 
+    def precompile_period(self, pwa):
+        """
+        number of packets after which the stream repeats itself
+        zero when the stream can't be precompiled
+        """
+        if pwa.length_mode != "fixed":
+            return 0
+        kws = pwa.stream.kws
+        fields = [["mac_src", None], ["mac_dst", None],
+                  ["arp_src_hw", ARP], ["arp_dst_hw", ARP],
+                  ["ip_src", IP], ["ip_dst", IP],
+                  ["ipv6_src", IPv6], ["ipv6_dst", IPv6],
+                  ["vlan_id", Dot1Q],
+                  ["tcp_src_port", TCP], ["tcp_dst_port", TCP],
+                  ["udp_src_port", UDP], ["udp_dst_port", UDP]]
+        period = 1
+        for name, layer in fields:
+            if layer and layer not in pwa.pkt:
+                continue
+            mode = kws.get("{}_mode".format(name), "fixed").strip()
+            if mode == "fixed":
+                continue
+            if mode in ["increment", "decrement", "incr", "decr"]:
+                count = self.utils.intval(kws, "{}_count".format(name), 0)
+            elif mode == "list" and name in ["mac_src", "mac_dst"]:
+                count = len(kws[name])
+            else:
+                count = 0
+            if count <= 0:
+                return 0
+            period = self.utils.lcm(period, count)
+            if period > self.precompile_max:
+                return 0
+        return period
+
+    def precompile(self, pwa):
+        """
+        build the ring of ready to send frames for the streams
+        whose fields change only by increment/decrement/list
+        """
+        pwa.ring, pwa.ring_index = None, 0
+        self.precompile_release(pwa.stream.stream_id)
+        if self.precompile_max <= 0:
+            return
+        period = self.precompile_period(pwa)
+        if period <= 0:
+            return
+        # the byte budget is shared by all the streams on the port
+        budget = self.precompile_budget - sum(self.precompiled.values())
+        work = SpyTestDict(pwa)
+        work.pkt = pwa.pkt.copy()
+        ring, total = [], 0
+        for _ in range(period):
+            bstr = self.build_bytes(work)
+            total = total + len(bstr)
+            if total > budget:
+                self.logger.debug("precompile {} exceeds budget {}".format(pwa.stream.stream_id, budget))
+                return
+            ring.append(bstr)
+            self.build_next_dma(work)
+        if self.build_bytes(work) != ring[0]:
+            self.logger.debug("precompile {} mismatch after {} packets".format(pwa.stream.stream_id, period))
+            return
+        self.logger.debug("precompiled {} {} packets".format(pwa.stream.stream_id, period))
+        self.precompiled[pwa.stream.stream_id] = total
+        pwa.ring = ring
+
+    def precompile_release(self, stream_id):
+        """
+        return the bytes held by the ring of the stream to the budget
+        """
+        self.precompiled.pop(stream_id, None)
+
     def check(self, pkt):
         pkt.do_build()
         if self.dbg > 3:
@@ -767,6 +915,7 @@ class ScapyPacket(object):
         pwa.frame_size_max = frame_size_max
         pwa.frame_size_step = frame_size_step
         self.add_padding(pwa, True)
+        self.precompile(pwa)
 
         return pwa
 
@@ -796,6 +945,11 @@ class ScapyPacket(object):
 
     def build_next_dma(self, pwa):
 
+        # precompiled stream - just move to next frame in the ring
+        if pwa.ring:
+            pwa.ring_index = (pwa.ring_index + 1) % len(pwa.ring)
+            return pwa
+
         # Change Ether SRC MAC
         mac_src_mode  = pwa.stream.kws.get("mac_src_mode", "fixed").strip()
         mac_src_step  = pwa.stream.kws.get("mac_src_step", "00:00:00:00:00:01")
@@ -1082,6 +1236,14 @@ class ScapyPacket(object):
         #self.logger.debug("{}: CMP1: {} {}".format(self.iface, sid, strpkt[-12:-4]))
         return False
 
+    # same as match_stream but on the signature read from the raw frame
+    def match_stream_sig(self, stream, sig):
+        sid = stream.get_sid()
+        if not sid or sid != sig: return False
+        if self.dbg > 2:
+            self.logger.debug("{}: CMP0: {} {}".format(self.iface, sid, sig))
+        return True
+
     def if_delete_cmds(self, index, intf):
         ns = "{}_{}".format(intf.name, index)
 
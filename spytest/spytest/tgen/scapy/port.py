@@ -1,4 +1,6 @@
+import sys
 import copy
+import time
 import threading
 
 from dicts import SpyTestDict
@@ -23,6 +25,37 @@ def incrStat(stats, name, val = 1):
     stats[name] = val
     return val
 
+class StreamIndex(object):
+    """
+    Maps the stream signature inserted by send_packet to the tracked stream
+    so that RX statistics cost one dict lookup per frame irrespective of
+    the number of streams. Streams without signature are checked linearly.
+    """
+
+    def __init__(self):
+        self.index = dict()
+        self.unsigned = []
+
+    def rebuild(self, streams):
+        index, unsigned = dict(), []
+        for stream in streams:
+            sid = stream.get_sid()
+            if not sid:
+                unsigned.append(stream)
+            elif sid not in index:
+                index[sid] = stream
+        # replace as a whole as the RX thread may be looking up
+        (self.index, self.unsigned) = (index, unsigned)
+
+    def find(self, sig, match=None):
+        stream = self.index.get(sig, None)
+        if stream or not match:
+            return stream
+        for stream in self.unsigned:
+            if match(stream, sig):
+                return stream
+        return None
+
 class ScapyStream(object):
     def __init__(self, port, index, stream_id, track_port, *args, **kws):
         self.port = port
@@ -38,12 +71,14 @@ class ScapyStream(object):
         #print("ScapyStream: {} {} {}".format(self.port, self.stream_id, kws))
         if self.track_port:
             self.track_port.track_streams.append(self)
+            self.track_port.track_update()
         self.stream_lock = threading.Lock()
 
     def __del__(self):
         print("ScapyStream {} exiting...".format(self.stream_id))
         if self.track_port:
             self.track_port.track_streams.remove(self)
+            self.track_port.track_update()
 
     def get_sid(self):
         #if not self.track_port: return None
@@ -110,6 +145,7 @@ class ScapyPort(object):
         self.utils = Utils(self.dry, logger=self.logger)
         self.streams = SpyTestDict()
         self.track_streams = []
+        self.track_index = StreamIndex()
         self.interfaces = SpyTestDict()
         self.stats = SpyTestDict()
         initStatistics(self.stats)
@@ -134,6 +170,13 @@ class ScapyPort(object):
             stream.track_port = None
             stream.unlock()
         self.track_streams = []
+        self.track_update()
+
+    def track_update(self):
+        self.track_index.rebuild(self.track_streams)
+
+    def find_track_stream(self, sig, match=None):
+        return self.track_index.find(sig, match)
 
     def cleanup(self):
         self.logger.debug("ScapyPort {} cleanup...".format(self.name))
@@ -168,6 +211,10 @@ class ScapyPort(object):
     def getStats(self):
         return self.stats
 
+    # stream_id --> [requested pps, achieved pps, frames sent]
+    def getTxRates(self):
+        return self.driver.get_tx_rates()
+
     def getStreamStats(self):
         res = []
         for _, stream in self.streams.items():
@@ -473,3 +520,34 @@ class ScapyPort(object):
         self.errs.append(msg)
         raise ValueError(msg)
 
+
+def benchmark(counts, frames=100000):
+    """
+    Compare the per frame cost of matching the received stream signature
+    using a linear scan of the tracked streams and using the StreamIndex
+    """
+    print("{:>8} {:>14} {:>14}".format("streams", "scan ns/frame", "index ns/frame"))
+    for count in counts:
+        streams = [ScapyStream(1, i, "stream-{}".format(i), None) for i in range(count)]
+        index = StreamIndex()
+        index.rebuild(streams)
+        # received frames spread evenly across the streams
+        sigs = [streams[i % count].get_sid() for i in range(frames)]
+
+        start = time.time()
+        for sig in sigs:
+            for stream in streams:
+                if stream.get_sid() == sig:
+                    break
+        scan = time.time() - start
+
+        start = time.time()
+        for sig in sigs:
+            index.find(sig)
+        lookup = time.time() - start
+
+        print("{:>8} {:>14.0f} {:>14.0f}".format(count, scan*1e9/frames, lookup*1e9/frames))
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or [1, 10, 100, 500, 1000]
+    benchmark(counts, 20000)
@@ -493,33 +493,38 @@ class ScapyServer(object):
         time.sleep(5)
         if mode == "aggregate" and stream_id:
             for port in self.ports.values():
+                rates = port.getTxRates()
                 for stream, stats in port.getStreamStats():
                     if stream_id == stream.stream_id:
                         res[mode] = SpyTestDict()
-                        self.fill_stats(res[mode], stats, stats, True)
+                        self.fill_stats(res[mode], stats, stats, True, rates.get(stream_id))
         elif mode == "aggregate":
             if not port_handle or port_handle not in self.ports:
                 self.error("Invalid", "port_handle", port_handle)
             stats = self.ports[port_handle].getStats()
             res[port_handle] = SpyTestDict()
             res[port_handle][mode] = SpyTestDict()
-            self.fill_stats(res[port_handle][mode], stats, stats)
+            rates = list(self.ports[port_handle].getTxRates().values())
+            rate = [sum(r[0] for r in rates), sum(r[1] for r in rates)] if rates else None
+            self.fill_stats(res[port_handle][mode], stats, stats, False, rate)
         elif mode == "traffic_item":
             res[mode] = SpyTestDict()
             for port in self.ports.values():
                 #self.fill_stats(res[mode]["aggregate"], stats, stats)
+                rates = port.getTxRates()
                 for stream, stats in port.getStreamStats():
                     stream_id = stream.stream_id
                     res[mode][stream_id] = SpyTestDict()
-                    self.fill_stats(res[mode][stream_id], stats, stats)
+                    self.fill_stats(res[mode][stream_id], stats, stats, False, rates.get(stream_id))
         elif mode in ["stream", "streams"]:
             res[port_handle] = SpyTestDict()
             res[port_handle]["stream"] = SpyTestDict()
             for port in self.ports.values():
+                rates = port.getTxRates()
                 for stream, stats in port.getStreamStats():
                     stream_id = stream.stream_id
                     res[port_handle]["stream"][stream_id] = SpyTestDict()
-                    self.fill_stats(res[port_handle]["stream"][stream_id], stats, stats)
+                    self.fill_stats(res[port_handle]["stream"][stream_id], stats, stats, False, rates.get(stream_id))
         elif mode == "flow":
             if not port_handle or port_handle not in self.ports:
                 self.error("Invalid", "port_handle", port_handle)
@@ -556,9 +561,14 @@ class ScapyServer(object):
             return val
         return {"count":val, "max":0, "min":0, "sum":0, "avg":0}
 
-    def fill_stats(self, res, tx_stats, rx_stats, detailed=False):
+    # tx_rate: [requested pps, achieved pps, ...] of the last transmit
+    def fill_stats(self, res, tx_stats, rx_stats, detailed=False, tx_rate=None):
         res["tx"] = SpyTestDict()
-        res["tx"]["total_pkt_rate"] = self.stat_value(1, detailed)
+        if tx_rate:
+            res["tx"]["total_pkt_rate"] = self.stat_value(round(tx_rate[1], 2), detailed)
+            res["tx"]["requested_pkt_rate"] = self.stat_value(tx_rate[0], detailed)
+        else:
+            res["tx"]["total_pkt_rate"] = self.stat_value(1, detailed)
         res["tx"]["raw_pkt_count"] = self.stat_value(tx_stats.framesSent, detailed)
         res["tx"]["pkt_byte_count"] = self.stat_value(tx_stats.bytesSent, detailed)
         res["tx"]["total_pkts"] = self.stat_value(tx_stats.framesSent, detailed)
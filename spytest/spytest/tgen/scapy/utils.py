@@ -138,6 +138,13 @@ class Utils(object):
     def min_value(v1, v2):
         return v1 if v1 < v2 else v2
 
+    @staticmethod
+    def lcm(v1, v2):
+        (a, b) = (v1, v2)
+        while b:
+            (a, b) = (b, a % b)
+        return v1 * v2 // a
+
     @staticmethod
     def incrementMac(mac, step):
         step = step.replace(':', '').replace(".",'')
@@ -288,6 +295,18 @@ class Utils(object):
             pass
         return default
 
+    # monotonic high resolution clock in seconds
+    clock = staticmethod(getattr(time, "perf_counter", time.time))
+
+    @staticmethod
+    def sleep_until(deadline, spin=0.001):
+        # sleep till close to the deadline and spin for the remaining time
+        delay = deadline - Utils.clock()
+        if delay > spin:
+            time.sleep(delay - spin)
+        while Utils.clock() < deadline:
+            time.sleep(0)
+
     @staticmethod
     def msleep(delay, block=1):
         mdelay = delay /1000.0
@@ -29,6 +29,7 @@ import os
 
 from collections import defaultdict
 from datetime import datetime
+from multiprocessing import Pool
 from utilities import TestResultJSONValidationError
 from utilities import validate_json_file
 
@@ -172,10 +173,7 @@ def validate_junit_xml_archive(directory_name, strict=False):
     roots = []
     metadata_source = None
     metadata = {}
-    doc_list = glob.glob(os.path.join(directory_name, "tr.xml"))
-    doc_list += glob.glob(os.path.join(directory_name, "*test*.xml"))
-    doc_list += glob.glob(os.path.join(directory_name, "**", "*test*.xml"), recursive=True)
-    doc_list = set(doc_list)
+    doc_list = _find_junit_xml_documents(directory_name)
 
     total_size = 0
     for document in doc_list:
@@ -214,6 +212,13 @@ def validate_junit_xml_archive(directory_name, strict=False):
     return roots
 
 
+def _find_junit_xml_documents(directory_name):
+    doc_list = glob.glob(os.path.join(directory_name, "tr.xml"))
+    doc_list += glob.glob(os.path.join(directory_name, "*test*.xml"))
+    doc_list += glob.glob(os.path.join(directory_name, "**", "*test*.xml"), recursive=True)
+    return set(doc_list)
+
+
 def validate_junit_xml_path(path, strict=False):
     if os.path.isfile(path):
         roots = [validate_junit_xml_file(path)]
@@ -223,6 +228,162 @@ def validate_junit_xml_path(path, strict=False):
     return roots
 
 
+def iterparse_junit_xml_file(document_name):
+    """Validate and parse a JUnit XML file without loading the whole document.
+
+    The test cases are validated and parsed as soon as they are read, then dropped from the tree,
+    so the memory used does not grow with the size of the file and no size limit is applied.
+
+    Args:
+        document_name: The name of the document.
+
+    Returns:
+        A tuple of the test metadata and the test cases grouped by feature, same as
+        _parse_test_metadata and _parse_test_cases.
+
+    Raises:
+        JUnitXMLValidationError: if the file is unparseable or is missing required fields.
+    """
+    if not os.path.exists(document_name) or not os.path.isfile(document_name):
+        raise JUnitXMLValidationError("file not found")
+
+    root = None
+    depth = 0
+    metadata = None
+    test_case_results = defaultdict(list)
+    try:
+        for event, element in ET.iterparse(document_name, events=("start", "end"), forbid_dtd=True):
+            if event == "start":
+                depth += 1
+                if root is None:
+                    root = element
+                    _validate_test_summary(root)
+                continue
+
+            depth -= 1
+            if depth != 1:
+                continue
+
+            # Only the direct children of the root are of interest, the same as find/findall.
+            if element.tag == TESTCASE_TAG:
+                _validate_test_case(element)
+                feature, result = _parse_test_case(element)
+                test_case_results[feature].append(result)
+            elif element.tag == PROPERTIES_TAG and metadata is None:
+                _validate_test_metadata_properties(element)
+                metadata = _parse_test_metadata_properties(element)
+            root.remove(element)
+    except JUnitXMLValidationError:
+        raise
+    except Exception as e:
+        raise JUnitXMLValidationError(f"could not parse {document_name}: {e}") from e
+
+    return metadata or {}, dict(test_case_results)
+
+
+def _iterparse_junit_xml_document(document_name):
+    # Runs in the worker processes, errors are returned so that the rest of the files are still parsed.
+    try:
+        metadata, test_cases = iterparse_junit_xml_file(document_name)
+        return document_name, metadata, test_cases, None
+    except Exception as e:
+        return document_name, None, None, e
+
+
+def iter_junit_xml_path(path, strict=False, processes=None):
+    """Validate and parse the JUnit XML files of a path one by one.
+
+    The files of a directory are parsed in parallel by a pool of processes, with the same metadata
+    checks as validate_junit_xml_archive. Files that fail are skipped unless strict is set.
+
+    Args:
+        path: A JUnit XML file or a directory containing XML documents.
+        strict: Fail if any file in a directory is not parseable.
+        processes: The number of worker processes, defaults to the number of CPUs.
+
+    Yields:
+        A tuple of the document name, the test metadata and the test cases grouped by feature.
+    """
+    if os.path.isfile(path):
+        metadata, test_cases = iterparse_junit_xml_file(path)
+        yield path, metadata, test_cases
+        return
+
+    if not os.path.exists(path) or not os.path.isdir(path):
+        print("directory {} not found".format(path))
+        return
+
+    doc_list = sorted(_find_junit_xml_documents(path))
+    processes = min(processes or os.cpu_count() or 1, len(doc_list))
+    if processes > 1:
+        pool = Pool(processes)
+        results = pool.imap(_iterparse_junit_xml_document, doc_list, max(1, len(doc_list) // (processes * 4)))
+    else:
+        pool = None
+        results = map(_iterparse_junit_xml_document, doc_list)
+
+    found = False
+    metadata_source = None
+    metadata = {}
+    try:
+        for document, doc_metadata, test_cases, error in results:
+            try:
+                if error:
+                    raise error
+
+                root_metadata = {k: v for k, v in doc_metadata.items()
+                                 if k in REQUIRED_METADATA_PROPERTIES and k != "timestamp"}
+                if root_metadata:
+                    if not metadata_source:
+                        metadata_source = document
+                        metadata = root_metadata
+
+                    if root_metadata != metadata:
+                        raise JUnitXMLValidationError(f"{document} metadata differs from {metadata_source}\n"
+                                                      f"{document}: {root_metadata}\n"
+                                                      f"{metadata_source}: {metadata}")
+            except Exception as e:
+                if strict:
+                    raise JUnitXMLValidationError(f"could not parse {document}: {e}") from e
+
+                print(f"could not parse {document}: {e} - skipping")
+                continue
+
+            found = True
+            yield document, doc_metadata, test_cases
+    finally:
+        if pool:
+            pool.terminate()
+
+    if not found:
+        print("provided directory {} does not contain any valid XML files".format(path))
+
+
+def iter_test_case_records(path, test_result_json, strict=False, processes=None):
+    """Stream the test cases of the JUnit XML files of a path.
+
+    The "test_metadata" and "test_summary" of test_result_json are updated as the files are read, the
+    same as parse_test_result, and are complete once the iterator is exhausted.
+
+    Args:
+        path: A JUnit XML file or a directory containing XML documents.
+        test_result_json: A dict to collect the test metadata and summary into.
+        strict: Fail if any file in a directory is not parseable.
+        processes: The number of worker processes, defaults to the number of CPUs.
+
+    Yields:
+        A dict per test case, the parsed test case with its "feature".
+    """
+    for _, metadata, test_cases in iter_junit_xml_path(path, strict, processes):
+        test_result_json["test_metadata"] = _update_test_metadata(test_result_json.get("test_metadata"), metadata)
+        test_result_json["test_summary"] = _update_test_summary(test_result_json.get("test_summary"),
+                                                                _extract_test_summary(test_cases))
+        for feature, cases in test_cases.items():
+            for case in cases:
+                case["feature"] = feature
+                yield case
+
+
 def _validate_junit_xml(root):
     _validate_test_summary(root)
     _validate_test_metadata(root)
@@ -250,8 +411,10 @@ def _validate_test_summary(root):
 
 
 def _validate_test_metadata(root):
-    properties_element = root.find(PROPERTIES_TAG)
+    _validate_test_metadata_properties(root.find(PROPERTIES_TAG))
+
 
+def _validate_test_metadata_properties(properties_element):
     if not properties_element:
         return
 
@@ -316,16 +479,17 @@ def _validate_test_case_properties(root):
     if missing_testcase_property:
         print("missing testcase property: {}".format(list(missing_testcase_property)))
 
-def _validate_test_cases(root):
-    def _validate_test_case(test_case):
-        for attribute in REQUIRED_TESTCASE_ATTRIBUTES:
-            if attribute not in test_case.keys():
-                raise JUnitXMLValidationError(
-                    f'"{attribute}" not found in test case '
-                    f"\"{test_case.get('name', 'Name Not Found')}\""
-                )
-        _validate_test_case_properties(test_case)
+def _validate_test_case(test_case):
+    for attribute in REQUIRED_TESTCASE_ATTRIBUTES:
+        if attribute not in test_case.keys():
+            raise JUnitXMLValidationError(
+                f'"{attribute}" not found in test case '
+                f"\"{test_case.get('name', 'Name Not Found')}\""
+            )
+    _validate_test_case_properties(test_case)
+
 
+def _validate_test_cases(root):
     cases = root.findall(TESTCASE_TAG)
 
     for test_case in cases:
@@ -387,8 +551,10 @@ def _extract_test_summary(test_cases):
 
 
 def _parse_test_metadata(root):
-    properties_element = root.find(PROPERTIES_TAG)
+    return _parse_test_metadata_properties(root.find(PROPERTIES_TAG))
+
 
+def _parse_test_metadata_properties(properties_element):
     if not properties_element:
         return {}
 
@@ -412,62 +578,63 @@ def _parse_testcase_properties(root):
 
     return testcase_properties
 
-def _parse_test_cases(root):
-    test_case_results = defaultdict(list)
-
-    def _parse_test_case(test_case):
-        result = {}
+def _parse_test_case(test_case):
+    result = {}
+
+    # FIXME: This is specific to pytest, needs to be extended to support spytest.
+    test_class_tokens = test_case.get("classname").split(".")
+    feature = test_class_tokens[0]
+
+    for attribute in REQUIRED_TESTCASE_ATTRIBUTES:
+        result[attribute] = test_case.get(attribute)
+    for attribute in REQUIRED_TESTCASE_PROPERTIES:
+        testcase_properties = _parse_testcase_properties(test_case)
+        if attribute in testcase_properties:
+            result[attribute] = testcase_properties[attribute]
+
+    # NOTE: "if failure" and "if error" does not work with the ETree library.
+    failure = test_case.find("failure")
+    error = test_case.find("error")
+    skipped = test_case.find("skipped")
+
+    # Any test which marked as xfail will drop out a property to the report xml file.
+    # Add prefix "xfail_" to tests which are marked with xfail
+    properties_element = test_case.find(PROPERTIES_TAG)
+    xfail_case = ""
+    if properties_element:
+        for prop in properties_element.iterfind(PROPERTY_TAG):
+            if prop.get("name") == "xfail":
+                xfail_case = "xfail_"
+                break
+
+    # NOTE: "error" is unique in that it can occur alongside a succesful, failed, or skipped test result.
+    # Because of this, we track errors separately so that the error can be correlated with the stage it
+    # occurred.
+    # By looking into test results from past 300 days, error only occur with skipped test result.
+    #
+    # If there is *only* an error tag we note that as well, as this indicates that the framework
+    # errored out during setup or teardown.
+    if failure is not None:
+        result["result"] = "{}failure".format(xfail_case)
+        summary = failure.get("message", "")
+    elif skipped is not None:
+        result["result"] = "{}skipped".format(xfail_case)
+        summary = skipped.get("message", "")
+    elif error is not None:
+        result["result"] = "{}error".format(xfail_case)
+        summary = error.get("message", "")
+    else:
+        result["result"] = "{}success".format(xfail_case)
+        summary = ""
 
-        # FIXME: This is specific to pytest, needs to be extended to support spytest.
-        test_class_tokens = test_case.get("classname").split(".")
-        feature = test_class_tokens[0]
+    result["summary"] = summary[:min(len(summary), MAXIMUM_SUMMARY_SIZE)]
+    result["error"] = error is not None
 
-        for attribute in REQUIRED_TESTCASE_ATTRIBUTES:
-            result[attribute] = test_case.get(attribute)
-        for attribute in REQUIRED_TESTCASE_PROPERTIES:
-            testcase_properties = _parse_testcase_properties(test_case)
-            if attribute in testcase_properties:
-                result[attribute] = testcase_properties[attribute]
-
-        # NOTE: "if failure" and "if error" does not work with the ETree library.
-        failure = test_case.find("failure")
-        error = test_case.find("error")
-        skipped = test_case.find("skipped")
-
-        # Any test which marked as xfail will drop out a property to the report xml file.
-        # Add prefix "xfail_" to tests which are marked with xfail
-        properties_element = test_case.find(PROPERTIES_TAG)
-        xfail_case = ""
-        if properties_element:
-            for prop in properties_element.iterfind(PROPERTY_TAG):
-                if prop.get("name") == "xfail":
-                    xfail_case = "xfail_"
-                    break
-
-        # NOTE: "error" is unique in that it can occur alongside a succesful, failed, or skipped test result.
-        # Because of this, we track errors separately so that the error can be correlated with the stage it
-        # occurred.
-        # By looking into test results from past 300 days, error only occur with skipped test result.
-        #
-        # If there is *only* an error tag we note that as well, as this indicates that the framework
-        # errored out during setup or teardown.
-        if failure is not None:
-            result["result"] = "{}failure".format(xfail_case)
-            summary = failure.get("message", "")
-        elif skipped is not None:
-            result["result"] = "{}skipped".format(xfail_case)
-            summary = skipped.get("message", "")
-        elif error is not None:
-            result["result"] = "{}error".format(xfail_case)
-            summary = error.get("message", "")
-        else:
-            result["result"] = "{}success".format(xfail_case)
-            summary = ""
+    return feature, result
 
-        result["summary"] = summary[:min(len(summary), MAXIMUM_SUMMARY_SIZE)]
-        result["error"] = error is not None
 
-        return feature, result
+def _parse_test_cases(root):
+    test_case_results = defaultdict(list)
 
     for test_case in root.findall("testcase"):
         feature, result = _parse_test_case(test_case)
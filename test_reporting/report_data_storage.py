@@ -21,7 +21,7 @@ except ImportError:
 
 from utilities import validate_json_file
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterable, List
 
 
 TASK_RESULT_FILE = "pipeline_task_results.json"
@@ -187,6 +187,30 @@ class KustoConnector(ReportDBConnector):
         self._upload_summary(report_json, report_guid)
         self._upload_test_cases(report_json, report_guid)
 
+    def upload_report_stream(self, test_cases: Iterable[Dict], report_json: Dict, external_tracking_id: str = "",
+                             report_guid: str = "", testbed: str = "", os_version: str = "") -> None:
+        """Upload a report whose test cases are streamed to the back-end data store.
+
+        The test cases are written to the ingest file as they come, then the metadata and summary are uploaded.
+
+        Args:
+            test_cases: An iterator of test case records. See junit_xml_parser.iter_test_case_records.
+            report_json: The test metadata and summary, complete once test_cases is exhausted.
+            external_tracking_id: An identifier that a client can use to map a test report
+                to some external system of their choosing (e.g. Jenkins, Travis CI, JIRA, etc.).
+                This id does not have to be unique.
+            report_guid: A randomly generated UUID that is used to query for a specific test run across tables.
+        """
+        self._upload_pipeline_results(external_tracking_id, report_guid, testbed, os_version)
+        print("Upload test case")
+        self._ingest_data(self.TEST_CASE_TABLE, (dict(case, id=report_guid) for case in test_cases))
+        if not report_json:
+            print("Test result file is not found or empty. We will only upload pipeline results and summary.")
+            self._upload_summary(None, report_guid)
+            return
+        self._upload_metadata(report_json, external_tracking_id, report_guid)
+        self._upload_summary(report_json, report_guid)
+
     def upload_reachability_data(self, ping_output: List) -> None:
         ping_time = str(datetime.utcnow())
         for result in ping_output:
@@ -292,14 +316,26 @@ class KustoConnector(ReportDBConnector):
             ingestion_mapping_reference=self.TABLE_MAPPING_LOOKUP[table]
         )
 
+        count = len(data) if isinstance(data, list) else 1
         with tempfile.NamedTemporaryFile(mode="w+") as temp:
             if isinstance(data, list):
                 temp.writelines('\n'.join([json.dumps(entry) for entry in data]))
-            else:
+            elif isinstance(data, dict):
                 temp.write(json.dumps(data))
+            else:
+                # Stream the entries of an iterator, nothing is ingested if it is empty.
+                count = 0
+                for entry in data:
+                    if count:
+                        temp.write('\n')
+                    temp.write(json.dumps(entry))
+                    count += 1
+                if not count:
+                    return count
             temp.seek(0)
             print("Ingest to primary cluster...")
             self._ingestion_client.ingest_from_file(temp.name, ingestion_properties=props)
             if self._ingestion_client_backup:
                 print("Ingest to backup cluster...")
                 self._ingestion_client_backup.ingest_from_file(temp.name, ingestion_properties=props)
+        return count
@@ -7,7 +7,8 @@ import re
 from junit_xml_parser import (
     validate_junit_json_file,
     validate_junit_xml_path,
-    parse_test_result
+    parse_test_result,
+    iter_test_case_records
 )
 from report_data_storage import KustoConnector
 
@@ -43,6 +44,13 @@ python3 report_uploader.py tests/files/sample_tr.xml -e TRACKING_ID#22
     parser.add_argument(
         "--json", "-j", action="store_true", help="Load an existing test result JSON file from path_name.",
     )
+    parser.add_argument(
+        "--stream", "-s", action="store_true",
+        help="Parse the JUnit XML files in parallel and stream the test cases to the ingest file.",
+    )
+    parser.add_argument(
+        "--processes", "-p", type=int, help="Number of processes used by --stream, defaults to the number of CPUs.",
+    )
     parser.add_argument(
         "--category", "-c", type=str, help="Type of data to upload (i.e. test_result, reachability, etc.)"
     )
@@ -77,6 +85,12 @@ python3 report_uploader.py tests/files/sample_tr.xml -e TRACKING_ID#22
             else:
                 if args.json:
                     test_result_json = validate_junit_json_file(path_name)
+                elif args.stream:
+                    test_result_json = {}
+                    test_cases = iter_test_case_records(path_name, test_result_json, processes=args.processes)
+                    kusto_db.upload_report_stream(test_cases, test_result_json, tracking_id, report_guid,
+                                                  testbed, version)
+                    continue
                 else:
                     roots = validate_junit_xml_path(path_name)
                     test_result_json = parse_test_result(roots)
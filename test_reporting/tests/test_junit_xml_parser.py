@@ -4,6 +4,7 @@ import pytest
 
 from test_reporting.junit_xml_parser import validate_junit_xml_stream, validate_junit_xml_file
 from test_reporting.junit_xml_parser import validate_junit_xml_archive, parse_test_result, JUnitXMLValidationError
+from test_reporting.junit_xml_parser import iterparse_junit_xml_file, iter_test_case_records
 
 
 VALID_TEST_RESULT = """<?xml version="1.0" encoding="utf-8"?>
@@ -242,11 +243,75 @@ def test_json_output_from_archive():
     assert ordered(parse_test_result(roots)) == ordered(EXPECTED_JSON_OUTPUT)
 
 
+def test_iterparse_json_output_from_file():
+    metadata, test_cases = iterparse_junit_xml_file(VALID_TEST_RESULT_FILE)
+    root = validate_junit_xml_file(VALID_TEST_RESULT_FILE)
+    expected = parse_test_result([root])
+    assert ordered(metadata) == ordered(expected["test_metadata"])
+    assert ordered(test_cases) == ordered(expected["test_cases"])
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_stream_json_output_from_archive(processes):
+    test_result_json = {}
+    records = list(iter_test_case_records(VALID_TEST_RESULT_ARCHIVE, test_result_json, processes=processes))
+    expected = parse_test_result(validate_junit_xml_archive(VALID_TEST_RESULT_ARCHIVE))
+    assert ordered(_group_records(records)) == ordered(expected["test_cases"])
+    assert ordered(test_result_json["test_metadata"]) == ordered(expected["test_metadata"])
+    assert ordered(test_result_json["test_summary"]) == ordered(expected["test_summary"])
+
+
+@pytest.mark.parametrize(
+    "token,replacement,message",
+    [
+        ("</", "<", "could not parse .*"),
+        ("testsuite", "fail", ".* tag not found on root element"),
+        ("hwsku", "host", "duplicate metadata element: .*"),
+        ("classname", "hehe", ".* not found in test case .*"),
+    ],
+)
+def test_iterparse_invalid_junit_xml(tmp_path, token, replacement, message):
+    document = tmp_path / "test_invalid.xml"
+    document.write_text(VALID_TEST_RESULT.replace(token, replacement))
+    with pytest.raises(JUnitXMLValidationError, match=message):
+        iterparse_junit_xml_file(str(document))
+
+
+@pytest.mark.parametrize(
+    "exploit_string", ["billion laughs", "quadratic blowup", "external entity", "dtd retrieval"]
+)
+def test_iterparse_junit_xml_exploits(tmp_path, exploit_string):
+    document = tmp_path / "test_exploit.xml"
+    document.write_text(exploits[exploit_string])
+    with pytest.raises(JUnitXMLValidationError, match="could not parse .*"):
+        iterparse_junit_xml_file(str(document))
+
+
+def test_stream_archive_with_invalid_file(tmp_path):
+    (tmp_path / "test_valid.xml").write_text(VALID_TEST_RESULT)
+    (tmp_path / "test_invalid.xml").write_text(VALID_TEST_RESULT.replace("</", "<"))
+
+    test_result_json = {}
+    records = list(iter_test_case_records(str(tmp_path), test_result_json, processes=2))
+    assert len(records) == 4
+    assert test_result_json["test_summary"]["tests"] == "4"
+
+    with pytest.raises(JUnitXMLValidationError, match="could not parse .*test_invalid.xml"):
+        list(iter_test_case_records(str(tmp_path), {}, strict=True, processes=2))
+
+
 def test_xml_file_not_found():
     with pytest.raises(JUnitXMLValidationError, match="file not found"):
         validate_junit_xml_file("nonexistent.xml")
 
 
+def _group_records(records):
+    test_cases = {}
+    for record in records:
+        test_cases.setdefault(record.pop("feature"), []).append(record)
+    return test_cases
+
+
 # credit to: https://stackoverflow.com/questions/25851183/
 def ordered(obj):
     if isinstance(obj, dict):
@@ -6,8 +6,10 @@ import os
 import pickle
 import shutil
 import sys
+import tempfile
+import time
 
-from collections import defaultdict
+from collections import OrderedDict
 from threading import Lock
 from six import with_metaclass
 
@@ -19,6 +21,10 @@ CACHE_LOCATION = os.path.join(CURRENT_PATH, '../../../_cache')
 
 SIZE_LIMIT = 1000000000  # 1G bytes, max disk usage allowed by cache
 ENTRY_LIMIT = 1000000    # Max number of pickle files allowed in cache.
+MEMORY_LIMIT = 200000000 # 200M bytes (pickled size), max memory usage allowed by cache
+
+# Marks the pickle files written with metadata, files without it hold the bare facts
+ENTRY_MAGIC = '__facts_cache_entry__'
 
 
 class Singleton(type):
@@ -39,6 +45,10 @@ class FactsCache(with_metaclass(Singleton, object)):
 
     Used singleton design pattern. Only a single instance of this class can be initialized.
 
+    Facts are kept in memory up to MEMORY_LIMIT bytes (pickled size), least recently used facts are dropped from
+    memory first. On disk the least recently used pickle files are removed when SIZE_LIMIT or ENTRY_LIMIT is
+    exceeded. The disk usage is counted once and then maintained on every write and cleanup.
+
     Args:
         with_metaclass ([function]): Python 2&3 compatible function from the six library for adding metaclass.
     """
@@ -47,24 +57,134 @@ class FactsCache(with_metaclass(Singleton, object)):
 
     def __init__(self, cache_location=CACHE_LOCATION):
         self._cache_location = os.path.abspath(cache_location)
-        self._cache = defaultdict(dict)
+        self._cache = OrderedDict()     # (zone, key) --> [value, size, expires, version]
+        self._memory_size = 0
+        self._disk_index = None         # (zone, key) --> [size, last access time]
+        self._disk_size = 0
+        self._zone_versions = {}
+        self._zone_hosts = {}           # '<hostname>-<namespace>' zone --> hostname
         self._write_lock = Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "evictions": 0, "disk_evictions": 0}
 
-    def _check_usage(self):
-        """Check cache usage, raise exception if usage exceeds the limitations.
+    def _facts_file(self, zone, key):
+        return os.path.join(self._cache_location, '{}/{}.pickle'.format(zone, key))
+
+    def _load_disk_index(self):
+        """Count the disk usage of the cache, only once per process.
         """
-        total_size = 0
-        total_entries = 0
+        if self._disk_index is not None:
+            return
+        self._disk_index = {}
+        self._disk_size = 0
         for root, _, files in os.walk(self._cache_location):
             for f in files:
-                fp = os.path.join(root, f)
-                total_size += os.path.getsize(fp)
-                total_entries += 1
+                if not f.endswith('.pickle'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, f))
+                except OSError:
+                    continue
+                zone = os.path.relpath(root, self._cache_location)
+                self._disk_index[(zone, f[:-len('.pickle')])] = [stat.st_size, stat.st_mtime]
+                self._disk_size += stat.st_size
+
+    def _disk_update(self, zone, key, size=None):
+        """Update the disk usage for the given facts, size None means the file is removed.
+        """
+        if self._disk_index is None:
+            return
+        old = self._disk_index.pop((zone, key), None)
+        if old:
+            self._disk_size -= old[0]
+        if size is not None:
+            self._disk_index[(zone, key)] = [size, time.time()]
+            self._disk_size += size
+
+    def _check_usage(self):
+        """Check cache usage, remove the least recently used pickle files if usage exceeds the limitations.
+        """
+        self._load_disk_index()
+        if self._disk_size <= SIZE_LIMIT and len(self._disk_index) <= ENTRY_LIMIT:
+            return
+        for (zone, key), _ in sorted(self._disk_index.items(), key=lambda item: item[1][1]):
+            if self._disk_size <= SIZE_LIMIT and len(self._disk_index) <= ENTRY_LIMIT:
+                break
+            logger.info('Cache usage exceeds limitations. total_size={}, SIZE_LIMIT={}, total_entries={}, '
+                        'ENTRY_LIMIT={}, evicting "{}.{}"'
+                        .format(self._disk_size, SIZE_LIMIT, len(self._disk_index), ENTRY_LIMIT, zone, key))
+            try:
+                os.remove(self._facts_file(zone, key))
+            except OSError:
+                pass
+            self._disk_update(zone, key)
+            self._stats["disk_evictions"] += 1
+
+    def _memory_put(self, zone, key, entry):
+        old = self._cache.pop((zone, key), None)
+        if old:
+            self._memory_size -= old[1]
+        self._cache[(zone, key)] = entry
+        self._memory_size += entry[1]
+        while self._memory_size > MEMORY_LIMIT and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._memory_size -= evicted[1]
+            self._stats["evictions"] += 1
+
+    def _memory_pop(self, zone, key):
+        old = self._cache.pop((zone, key), None)
+        if old:
+            self._memory_size -= old[1]
+
+    def _zone_version(self, zone):
+        if zone in self._zone_versions:
+            return self._zone_versions[zone]
+        # zones like '<hostname>-<namespace>' share the version of the host
+        return self._zone_versions.get(self._zone_hosts.get(zone))
+
+    def _is_valid(self, zone, key, entry):
+        if entry[2] is not None and entry[2] < time.time():
+            logger.debug('Cached facts "{}.{}" expired'.format(zone, key))
+            return False
+        version = self._zone_version(zone)
+        if entry[3] is not None and version is not None and entry[3] != version:
+            logger.info('Cached facts "{}.{}" are for version {}, current version {}'
+                        .format(zone, key, entry[3], version))
+            return False
+        return True
+
+    def set_zone_version(self, zone, version):
+        """Set the version, usually the DUT image version, of the facts cached in the zone.
+
+        Facts cached with a different version are invalidated when they are read.
+
+        Args:
+            zone (str): Name of the zone, also applies to the '<zone>-<namespace>' zones registered by set_zone_host.
+            version (str): Version, None to disable the check.
+        """
+        self._zone_versions[zone] = version
+
+    def set_zone_host(self, zone, hostname):
+        """Set the host of a '<hostname>-<namespace>' zone, the zone shares the version of the host zone.
+
+        Args:
+            zone (str): Name of the zone.
+            hostname (str): Name of the host zone.
+        """
+        self._zone_hosts[zone] = hostname
 
-        if total_size > SIZE_LIMIT or total_entries > ENTRY_LIMIT:
-            msg = 'Cache usage exceeds limitations. total_size={}, SIZE_LIMIT={}, total_entries={}, ENTRY_LIMIT={}' \
-                .format(total_size, SIZE_LIMIT, total_entries, ENTRY_LIMIT)
-            raise Exception(msg)
+    def get_stats(self):
+        """Get the cache statistics.
+
+        Returns:
+            dict: hit/miss/eviction counters and current memory and disk usage.
+        """
+        stats = dict(self._stats)
+        stats["memory_entries"] = len(self._cache)
+        stats["memory_size"] = self._memory_size
+        if self._disk_index is not None:
+            stats["disk_entries"] = len(self._disk_index)
+            stats["disk_size"] = self._disk_size
+        return stats
 
     def read(self, zone, key):
         """Read cached facts.
@@ -78,22 +198,53 @@ class FactsCache(with_metaclass(Singleton, object)):
             obj: Cached object, usually a dictionary.
         """
         # Lazy load
-        if zone in self._cache and key in self._cache[zone]:
-            logger.debug('Read cached facts "{}.{}"'.format(zone, key))
-            return self._cache[zone][key]
+        with self._write_lock:
+            entry = self._cache.get((zone, key))
+            if entry is not None and self._is_valid(zone, key, entry):
+                logger.debug('Read cached facts "{}.{}"'.format(zone, key))
+                self._cache.pop((zone, key))
+                self._cache[(zone, key)] = entry
+                self._stats["hits"] += 1
+                return entry[0]
+        if entry is not None:
+            self._stats["expired"] += 1
+            self.cleanup(zone, key)
+            self._stats["misses"] += 1
+            return self.NOTEXIST
+
+        facts_file = self._facts_file(zone, key)
+        try:
+            with open(facts_file, 'rb') as f:
+                data = f.read()
+            obj = pickle.loads(data)
+        except (IOError, ValueError, EOFError, pickle.UnpicklingError) as e:
+            logger.info('Load cache file "{}" failed with exception: {}'\
+                .format(os.path.abspath(facts_file), repr(e)))
+            self._stats["misses"] += 1
+            return self.NOTEXIST
+
+        if isinstance(obj, dict) and obj.get(ENTRY_MAGIC):
+            entry = [obj["value"], len(data), obj.get("expires"), obj.get("version")]
         else:
-            facts_file = os.path.join(self._cache_location, '{}/{}.pickle'.format(zone, key))
-            try:
-                with open(facts_file, 'rb') as f:
-                    self._cache[zone][key] = pickle.load(f)
-                    logger.debug('Loaded cached facts "{}.{}" from {}'.format(zone, key, facts_file))
-                    return self._cache[zone][key]
-            except (IOError, ValueError) as e:
-                logger.info('Load cache file "{}" failed with exception: {}'\
-                    .format(os.path.abspath(facts_file), repr(e)))
-                return self.NOTEXIST
-
-    def write(self, zone, key, value):
+            entry = [obj, len(data), None, None]
+        if not self._is_valid(zone, key, entry):
+            self._stats["expired"] += 1
+            self.cleanup(zone, key)
+            self._stats["misses"] += 1
+            return self.NOTEXIST
+
+        with self._write_lock:
+            self._memory_put(zone, key, entry)
+            self._disk_update(zone, key, len(data))
+        try:
+            os.utime(facts_file, None)
+        except OSError:
+            pass
+        logger.debug('Loaded cached facts "{}.{}" from {}'.format(zone, key, facts_file))
+        self._stats["disk_hits"] += 1
+        return entry[0]
+
+    def write(self, zone, key, value, ttl=None):
         """Store facts to cache.
 
         Args:
@@ -101,26 +252,43 @@ class FactsCache(with_metaclass(Singleton, object)):
                 The zone name could be hostname.
             key (str): Name of cached facts.
             value (obj): Value of cached facts. Usually a dictionary.
+            ttl (int): Number of seconds the facts are valid. Default is None, valid until cleaned up.
 
         Returns:
             boolean: Caching facts is successful or not.
         """
+        expires = time.time() + ttl if ttl else None
+        version = self._zone_version(zone)
         with self._write_lock:
             self._check_usage()
-            facts_file = os.path.join(self._cache_location, '{}/{}.pickle'.format(zone, key))
+            facts_file = self._facts_file(zone, key)
+            tmp_file = None
             try:
                 cache_subfolder = os.path.join(self._cache_location, zone)
                 if not os.path.exists(cache_subfolder):
                     logger.info('Create cache dir {}'.format(cache_subfolder))
-                    os.makedirs(cache_subfolder)
-
-                with open(facts_file, 'wb') as f:
-                    pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
-                    self._cache[zone][key] = value
-                    logger.info('Cached facts "{}.{}" to {}'.format(zone, key, facts_file))
-                    return True
-            except (IOError, ValueError) as e:
+                    try:
+                        os.makedirs(cache_subfolder)
+                    except OSError:
+                        # created by another worker meanwhile
+                        if not os.path.isdir(cache_subfolder):
+                            raise
+
+                data = pickle.dumps({ENTRY_MAGIC: 1, "value": value, "expires": expires, "version": version},
+                                    pickle.HIGHEST_PROTOCOL)
+                # write to a temporary file and rename, so that other workers never read a partial file
+                fd, tmp_file = tempfile.mkstemp(prefix='.{}.'.format(key), dir=cache_subfolder)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.rename(tmp_file, facts_file)
+                self._memory_put(zone, key, [value, len(data), expires, version])
+                self._disk_update(zone, key, len(data))
+                logger.info('Cached facts "{}.{}" to {}'.format(zone, key, facts_file))
+                return True
+            except (IOError, OSError, ValueError, pickle.PicklingError) as e:
                 logger.error('Dump cache file "{}" failed with exception: {}'.format(facts_file, repr(e)))
+                if tmp_file and os.path.exists(tmp_file):
+                    os.remove(tmp_file)
                 return False
 
     def cleanup(self, zone=None, key=None):
@@ -132,35 +300,44 @@ class FactsCache(with_metaclass(Singleton, object)):
                 will be cleaned up.
             key (str): Name of cached facts. Default is None.
         """
-        if zone:
-            if key:
-                if zone in self._cache and key in self._cache[zone]:
-                    del self._cache[zone][key]
-                    logger.debug('Removed "{}.{}" from cache.'.format(zone, key))
-                try:
-                    cache_file = os.path.join(self._cache_location, zone, '{}.pickle'.format(key))
-                    os.remove(cache_file)
-                    logger.debug('Removed cache file "{}.pickle"'.format(cache_file))
-                except OSError as e:
-                    logger.error('Cleanup cache {}.{}.pickle failed with exception: {}'.format(zone, key, repr(e)))
+        with self._write_lock:
+            if zone:
+                if key:
+                    if (zone, key) in self._cache:
+                        self._memory_pop(zone, key)
+                        logger.debug('Removed "{}.{}" from cache.'.format(zone, key))
+                    self._disk_update(zone, key)
+                    try:
+                        cache_file = os.path.join(self._cache_location, zone, '{}.pickle'.format(key))
+                        os.remove(cache_file)
+                        logger.debug('Removed cache file "{}.pickle"'.format(cache_file))
+                    except OSError as e:
+                        logger.error('Cleanup cache {}.{}.pickle failed with exception: {}'.format(zone, key, repr(e)))
+                else:
+                    zone_keys = [item for item in list(self._cache) if item[0] == zone]
+                    if zone_keys:
+                        for item in zone_keys:
+                            self._memory_pop(*item)
+                        logger.debug('Removed zone "{}" from cache'.format(zone))
+                    if self._disk_index is not None:
+                        for item in [item for item in self._disk_index if item[0] == zone]:
+                            self._disk_update(*item)
+                    try:
+                        cache_subfolder = os.path.join(self._cache_location, zone)
+                        shutil.rmtree(cache_subfolder)
+                        logger.debug('Removed cache subfolder "{}"'.format(cache_subfolder))
+                    except OSError as e:
+                        logger.error('Remove cache subfolder "{}" failed with exception: {}'.format(zone, repr(e)))
             else:
-                if zone in self._cache:
-                    del self._cache[zone]
-                    logger.debug('Removed zone "{}" from cache'.format(zone))
+                self._cache = OrderedDict()
+                self._memory_size = 0
+                self._disk_index = None
                 try:
-                    cache_subfolder = os.path.join(self._cache_location, zone)
-                    shutil.rmtree(cache_subfolder)
-                    logger.debug('Removed cache subfolder "{}"'.format(cache_subfolder))
+                    shutil.rmtree(self._cache_location)
+                    logger.debug('Removed all cache files under "{}"'.format(self._cache_location))
                 except OSError as e:
-                    logger.error('Remove cache subfolder "{}" failed with exception: {}'.format(zone, repr(e)))
-        else:
-            self._cache = defaultdict(dict)
-            try:
-                shutil.rmtree(self._cache_location)
-                logger.debug('Removed all cache files under "{}"'.format(self._cache_location))
-            except OSError as e:
-                logger.error('Remove cache folder "{}" failed with exception: {}'\
-                    .format(self._cache_location, repr(e)))
+                    logger.error('Remove cache folder "{}" failed with exception: {}'\
+                        .format(self._cache_location, repr(e)))
 
 
 def _get_default_zone(function, func_args, func_kargs):
@@ -184,12 +361,13 @@ def _get_default_zone(function, func_args, func_kargs):
             namespace = func_args[index]
             if namespace and isinstance(namespace, str):
                 zone = "{}-{}".format(hostname,namespace)
+                FactsCache().set_zone_host(zone, hostname)
         except IndexError:
             pass
     return zone
 
 
-def cached(name, zone_getter=None, after_read=None, before_write=None):
+def cached(name, zone_getter=None, after_read=None, before_write=None, ttl=None):
     """Decorator for enabling cache for facts.
 
     The cached facts are to be stored by <name>.pickle. Because the cached pickle files must be stored under subfolder
@@ -206,6 +384,7 @@ def cached(name, zone_getter=None, after_read=None, before_write=None):
         zone_getter ([function]): Function used to get hostname used as zone.
         after_read ([function]): Hook function used to process facts after read from cache.
         before_write ([function]): Hook function used to process facts before write into cache.
+        ttl ([int]): Number of seconds the cached facts are valid. Default is None, valid until cleaned up.
     Returns:
         [function]: Decorator function.
     """
@@ -225,9 +404,9 @@ def cached(name, zone_getter=None, after_read=None, before_write=None):
                 facts = target(*args, **kargs)
                 if before_write:
                     _facts = before_write(facts, target, args, kargs)
-                    cache.write(zone, name, _facts)
+                    cache.write(zone, name, _facts, ttl=ttl)
                 else:
-                    cache.write(zone, name, facts)
+                    cache.write(zone, name, facts, ttl=ttl)
                 return facts
         return wrapper
     return decorator
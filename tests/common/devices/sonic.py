@@ -1,5 +1,6 @@
 
 import ipaddress
+import itertools
 import json
 import logging
 import os
@@ -17,8 +18,10 @@ from tests.common.devices.base import AnsibleHostBase
 from tests.common.helpers.dut_utils import is_supervisor_node
 from tests.common.utilities import get_host_visible_vars
 from tests.common.cache import cached
+from tests.common.cache import FactsCache
 from tests.common.helpers.constants import DEFAULT_ASIC_ID, DEFAULT_NAMESPACE
 from tests.common.helpers.platform_api.chassis import is_inband_port
+from tests.common.helpers import show_parser
 from tests.common.errors import RunAnsibleModuleFail
 from tests.common import constants
 
@@ -70,8 +73,10 @@ class SonicHost(AnsibleHostBase):
             }
             self.host.options['variable_manager'].extra_vars.update(evars)
 
-        self._facts = self._gather_facts()
+        # Facts cached for another image version are invalidated after the DUT is upgraded
         self._os_version = self._get_os_version()
+        FactsCache().set_zone_version(self.hostname, self._os_version)
+        self._facts = self._gather_facts()
         self._sonic_release = self._get_sonic_release()
         self.is_multi_asic = True if self.facts["num_asic"] > 1 else False
         self._kernel_version = self._get_kernel_version()
@@ -1328,61 +1333,11 @@ Totals               6450                 6449
             Returns a list. Each item is a tuple with two elements. The first element is start position of a column. The
             second element is the end position of the column.
         """
-        prev = ' ',
-        positions = []
-        for pos, char in enumerate(sep_line + ' '):
-            if char == sep_char:
-                if char != prev:
-                    left = pos
-            else:
-                if char != prev:
-                    right = pos
-                    positions.append((left, right))
-            prev = char
-        return positions
-
-
-    def _parse_show(self, output_lines):
-
-        result = []
-
-        sep_line_pattern = re.compile(r"^( *-+ *)+$")
-        sep_line_found = False
-        for idx, line in enumerate(output_lines):
-            if sep_line_pattern.match(line):
-                sep_line_found = True
-                header_line = output_lines[idx-1]
-                sep_line = output_lines[idx]
-                content_lines = output_lines[idx+1:]
-                break
-
-        if not sep_line_found:
-            logging.error('Failed to find separation line in the show command output')
-            return result
-
-        try:
-            positions = self._parse_column_positions(sep_line)
-        except Exception as e:
-            logging.error('Possibly bad command output, exception: {}'.format(repr(e)))
-            return result
+        return show_parser.parse_column_positions(sep_line, sep_char)
 
-        headers = []
-        for (left, right) in positions:
-            headers.append(header_line[left:right].strip().lower())
-
-        for content_line in content_lines:
-            # When an empty line is encountered while parsing the tabulate content, it is highly possible that the
-            # tabulate content has been drained. The empty line and rest of the lines should not be parsed.
-            if len(content_line) == 0:
-                break
-            item = {}
-            for idx, (left, right) in enumerate(positions):
-                k = headers[idx]
-                v = content_line[left:right].strip()
-                item[k] = v
-            result.append(item)
-
-        return result
+    def _parse_show(self, output_lines, output_format=show_parser.FORMAT_DICT, types=None):
+        """Parse the tabulated output of a show command, see show_and_parse and tests.common.helpers.show_parser."""
+        return show_parser.parse_show(output_lines, output_format=output_format, types=types)
 
     def show_and_parse(self, show_cmd, **kwargs):
         """Run a show command and parse the output using a generic pattern.
@@ -1444,6 +1399,11 @@ Totals               6450                 6449
 
         Args:
             show_cmd: The show command that will be executed.
+            output_format: Optional; 'dict' (default), 'namedtuple' for a list of namedtuples with the column headers
+                as field names, or 'columns' for a dictionary of column header to the list of column values.
+            types: Optional; Dictionary of column header to a function converting the column values, like int.
+            stream: Optional; If True, return a generator of the rows parsed from the command output, without
+                building the list of output lines and rows.
 
         Returns:
             Return the parsed output of the show command in a list of dictionary. Each list item is a dictionary,
@@ -1452,12 +1412,19 @@ Totals               6450                 6449
         """
         start_line_index = kwargs.pop("start_line_index", 0)
         end_line_index = kwargs.pop("end_line_index", None)
+        output_format = kwargs.pop("output_format", show_parser.FORMAT_DICT)
+        types = kwargs.pop("types", None)
+        stream = kwargs.pop("stream", False)
+        if stream:
+            lines = show_parser.iter_lines(self.shell(show_cmd, **kwargs)["stdout"])
+            lines = itertools.islice(lines, start_line_index, end_line_index)
+            return show_parser.iter_show(lines, output_format=output_format, types=types)
         output = self.shell(show_cmd, **kwargs)["stdout_lines"]
         if end_line_index is None:
             output = output[start_line_index:]
         else:
             output = output[start_line_index:end_line_index]
-        return self._parse_show(output)
+        return self._parse_show(output, output_format=output_format, types=types)
 
     @cached(name='mg_facts')
     def get_extended_minigraph_facts(self, tbinfo, namespace = DEFAULT_NAMESPACE):
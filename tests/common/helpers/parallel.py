@@ -1,38 +1,61 @@
 import datetime
+import functools
 import logging
-import math
+import multiprocessing
 import os
+import pickle
 import shutil
 import tempfile
 import signal
+import time
 import traceback
 
-from multiprocessing import Process, Manager, Pipe
-from psutil import wait_procs
+from multiprocessing import Process, Pipe
 
 from tests.common.helpers.assertions import pytest_assert as pt_assert
 
+try:
+    from multiprocessing.connection import wait as wait_connections
+except ImportError:
+    # Python 2, see _wait_ready
+    wait_connections = None
+
 logger = logging.getLogger(__name__)
 
+# The persistent workers need the fork context and the process sentinels of Python 3
+PARALLEL_POOL_SUPPORTED = wait_connections is not None and hasattr(multiprocessing, 'get_context')
+
+# Interval of polling the running tasks when multiprocessing.connection.wait is not available
+POLL_INTERVAL = 0.1
+
+# Pool of persistent per node workers used by parallel_run, see set_parallel_pool
+_parallel_pool = None
+
+
 class SonicProcess(Process):
     """
     Wrapper class around multiprocessing.Process that would capture the exception thrown if the Process throws
     an exception when run.
 
     This exception (including backtrace) can be logged in test log to provide better info of why a particular Process failed.
+
+    The results dict passed to the target in kwargs is sent back to the parent process over the same pipe.
     """
     def __init__(self, *args, **kwargs):
         Process.__init__(self, *args, **kwargs)
         self._pconn, self._cconn = Pipe()
         self._exception = None
+        self._results = None
+        self._received = False
 
     def run(self):
+        results = self._kwargs.get('results')
         try:
             Process.run(self)
-            self._cconn.send(None)
+            self._cconn.send((None, results))
         except Exception as e:
             tb = traceback.format_exc()
-            self._cconn.send((e, tb))
+            _send_result(self._cconn, results, (e, tb))
             raise e
 
     # for wait_procs
@@ -43,12 +66,229 @@ class SonicProcess(Process):
     def is_running(self):
         return self.is_alive()
 
+    @property
+    def conn(self):
+        return self._pconn
+
+    def receive(self):
+        """Read the result sent by the process, if any.
+
+        Returns:
+            bool: True if the result has been received.
+        """
+        if not self._received and self._pconn.poll():
+            try:
+                self._exception, self._results = self._pconn.recv()
+            except EOFError:
+                pass
+            self._received = True
+        return self._received
+
     @property
     def exception(self):
-        if self._pconn.poll():
-            self._exception = self._pconn.recv()
+        self.receive()
         return self._exception
 
+    @property
+    def results(self):
+        self.receive()
+        return self._results
+
+
+def _send_result(conn, results, exception):
+    try:
+        conn.send((exception, results))
+    except Exception:
+        # The exception may not be picklable
+        conn.send(((repr(exception[0]), exception[1]), results))
+
+
+def _node_key(node):
+    return getattr(node, 'hostname', None) or str(node)
+
+
+def _node_state(node):
+    """Snapshot of the attributes of the node, changes when an attribute is set to another object."""
+    try:
+        return tuple(sorted((name, id(value)) for name, value in vars(node).items()))
+    except TypeError:
+        return None
+
+
+def _worker_loop(conn, node):
+    """Run the tasks received from the parent process on the node until the pipe is closed."""
+    while True:
+        try:
+            task = conn.recv_bytes()
+        except EOFError:
+            break
+        if not task:
+            break
+        results = {}
+        try:
+            target, args, kwargs = pickle.loads(task)
+        except Exception:
+            # The target could not be imported in the worker, let the parent fork a process for it
+            conn.send(('unavailable', None, None))
+            continue
+        kwargs['node'] = node
+        kwargs['results'] = results
+        try:
+            target(*args, **kwargs)
+            conn.send(('done', None, results))
+        except Exception as e:
+            tb = traceback.format_exc()
+            logger.error('Target "{}" failed on {}: {}'.format(target.__name__, _node_key(node), tb))
+            try:
+                conn.send(('failed', (e, tb), results))
+            except Exception:
+                conn.send(('failed', (repr(e), tb), results))
+
+
+class ParallelWorker(object):
+    """
+    Persistent process which runs the parallel_run tasks of one node.
+
+    The process is forked when the first task is dispatched, so it inherits the node object including its Ansible
+    setup. Connections opened by the tasks stay warm for the next tasks of the same node.
+
+    The worker runs on a copy of the node taken when it was forked. It is forked again when an attribute of the node
+    is set to another object in the parent, changes made in place, like updating a dict attribute, are not detected
+    and require ParallelPool.refresh. Changes made to the node by the tasks are not seen by the parent.
+    """
+    def __init__(self, node):
+        self.node = node
+        self.key = _node_key(node)
+        self.process = None
+        self.conn = None
+        self.state = None
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        self.conn, child_conn = Pipe()
+        ctx = multiprocessing.get_context('fork')
+        self.process = ctx.Process(name='parallel-worker--{}'.format(self.key), target=_worker_loop,
+                                   args=(child_conn, self.node))
+        self.process.daemon = True
+        self.process.start()
+        self.state = _node_state(self.node)
+        child_conn.close()
+        logger.debug('Started parallel worker {} for {}'.format(self.process.pid, self.key))
+
+    def submit(self, task):
+        if self.is_alive() and self.state != _node_state(self.node):
+            logger.debug('Node {} changed, restarting parallel worker {}'.format(self.key, self.process.pid))
+            self.stop()
+        if not self.is_alive():
+            self.start()
+        self.conn.send_bytes(task)
+
+    def receive(self):
+        return self.conn.recv()
+
+    def kill(self):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            try:
+                os.kill(self.process.pid, signal.SIGKILL)
+            except OSError as err:
+                logger.error('Unable to kill parallel worker {}:{}, error:{}'.format(self.process.pid, self.key, err))
+        self.process.join(5)
+        self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def stop(self):
+        if self.is_alive():
+            try:
+                self.conn.send_bytes(b'')
+            except (IOError, OSError):
+                pass
+            self.process.join(5)
+        self.kill()
+
+
+class ParallelPool(object):
+    """
+    Persistent workers for parallel_run, one per node.
+
+    Used by parallel_run once activated with set_parallel_pool. Only the tasks with a picklable target and arguments
+    are run by the pool workers, the other tasks fall back to a new process per node. The targets should only use the
+    node to run commands on it and report through the results dict, see ParallelWorker for the state of the node
+    seen by the workers.
+
+    Not available on Python 2, check PARALLEL_POOL_SUPPORTED first.
+    """
+    def __init__(self, nodes):
+        if not PARALLEL_POOL_SUPPORTED:
+            raise NotImplementedError('ParallelPool requires Python 3')
+        self.workers = {}
+        for node in nodes:
+            worker = ParallelWorker(node)
+            self.workers[worker.key] = worker
+
+    def get_worker(self, node):
+        worker = self.workers.get(_node_key(node))
+        # The same key could be used by a different object, like an ASIC of the DUT
+        if worker is None or worker.node is not node:
+            return None
+        return worker
+
+    def refresh(self, node=None):
+        """Stop the worker of the node, or all the workers, so that the next task forks it with the current node."""
+        for worker in self.workers.values():
+            if node is None or worker.node is node:
+                worker.stop()
+
+    def close(self):
+        self.refresh()
+
+
+def set_parallel_pool(pool):
+    """Set the pool of persistent workers used by parallel_run, None to fork a process per node."""
+    global _parallel_pool
+    _parallel_pool = pool
+
+
+def _wait_ready(processes, timeout):
+    """Wait until a task sends its result or its process exits.
+
+    Args:
+        processes (dict): Connection of each running task to its process.
+        timeout (float): Maximum time to wait, None to wait until a task is ready.
+
+    Returns:
+        list: The connections of the tasks which are ready, empty on timeout.
+    """
+    if wait_connections is not None:
+        sentinels = dict((process.sentinel, conn) for conn, process in processes.items())
+        ready = wait_connections(list(processes.keys()) + list(sentinels.keys()), timeout=timeout)
+        return [sentinels.get(item, item) for item in ready]
+
+    # Python 2 has no multiprocessing.connection.wait, poll the pipes and the processes
+    deadline = time.time() + timeout if timeout is not None else None
+    while True:
+        ready = [conn for conn, process in processes.items() if conn.poll() or not process.is_alive()]
+        if ready:
+            return ready
+        if deadline is None:
+            time.sleep(POLL_INTERVAL)
+        elif time.time() >= deadline:
+            return []
+        else:
+            time.sleep(min(POLL_INTERVAL, deadline - time.time()))
+
+
+def _pickle_task(target, args, kwargs):
+    try:
+        return pickle.dumps((target, tuple(args), kwargs), pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        logger.debug('Target "{}" cannot be run by the parallel pool: {}'.format(target.__name__, repr(e)))
+        return None
+
 
 def parallel_run(
     target, args, kwargs, nodes_list, timeout=None, concurrent_tasks=24
@@ -59,128 +299,154 @@ def parallel_run(
         target (function): The target function to be executed in parallel.
         args (list of tuple): List of arguments for the target function.
         kwargs (dict): Keyword arguments for the target function. It will be extended with two keys: 'node' and
-            'results'. The 'node' key will hold an item of the nodes list. The 'result' key will hold an instance of
-            multiprocessing.Manager().dict(). It is a proxy of the shared dict that will be used by each process for
-            returning execution results.
+            'results'. The 'node' key will hold an item of the nodes list. The 'result' key will hold a dict that is
+            used by the target for returning execution results. The dict is sent back over a pipe when the target
+            returns and merged into the returned results.
         nodes (list of nodes): List of nodes to be used by the target function
-        timeout (int or float, optional): Total time allowed for the spawned multiple processes to run. Defaults to
-            None. When timeout is specified, this function will wait at most 'timeout' seconds for the processes to
-            run. When time is up, this function will try to terminate or even kill all the processes.
+        timeout (int or float, optional): Time allowed for the target to run on each node. Defaults to None. When
+            timeout is specified, the target running on a node for more than 'timeout' seconds is terminated or even
+            killed, and its result is set to [{'failed': True}].
 
     Raises:
         flag.: In case any of the spawned process cannot be terminated, fail the test.
 
     Returns:
-        dict: An instance of multiprocessing.Manager().dict(). It is a proxy to the shared dict that is used by all the
-            spawned processes.
+        dict: The merged results of all the nodes.
     """
     nodes = [node for node in nodes_list]
-    # Callback API for wait_procs
-    def on_terminate(worker):
-        logger.info("process {} terminated with exit code {}".format(
-            worker.name, worker.returncode)
-        )
-
-    def force_terminate(workers):
-        # Some processes cannot be terminated. Try to kill them and raise flag.
-        running_processes = [worker for worker in workers if worker.is_alive()]
-        if len(running_processes) > 0:
-            logger.info(
-                'Found processes still running: {}. Try to kill them.'.format( #lgtm [py/clear-text-logging-sensitive-data]
-                    str(running_processes)
-                )
-            )
-            for p in running_processes:
-                results[p.name] = [{'failed': True}]
-                try:
-                    os.kill(p.pid, signal.SIGKILL)
-                except OSError as err:
-                    logger.error("Unable to kill {}:{}, error:{}".format(
-                        p.pid, p.name, err
-                    ))
-
-                    pt_assert(
-                        False,
-                        """Processes running target "{}" could not be terminated.
-                        Unable to kill {}:{}, error:{}""".format(target.__name__, p.pid, p.name, err)
-                    )
-
-    workers = []
-    results = Manager().dict()
+    results = {}
     start_time = datetime.datetime.now()
-    tasks_done = 0
-    total_tasks = len(nodes)
-    tasks_running = 0
-    total_timeout = timeout * math.ceil(
-        len(nodes)/float(concurrent_tasks)
-    ) if timeout else None
     failed_processes = {}
 
-    while tasks_done < total_tasks:
-        # If execution time of processes exceeds timeout, need to force
-        # terminate them all.
-        if total_timeout is not None:
-            if (datetime.datetime.now() - start_time).seconds > total_timeout:
-                logger.error('Process execution time exceeds {} seconds.'.format(
-                    str(total_timeout)
-                ))
-                break
-
-        while len(nodes) and tasks_running < concurrent_tasks:
-            node = nodes.pop(0)
-            kwargs['node'] = node
-            kwargs['results'] = results
-            process_name = "{}--{}".format(target.__name__, node)
-            worker = SonicProcess(
-                        name=process_name, target=target, args=args,
-                        kwargs=kwargs
-                    )
-            worker.start()
-            tasks_running += 1
-            logger.debug('Started process {} running target "{}"'.format(
-                worker.pid, process_name
-            ))
-            workers.append(worker)
-
-        gone, alive = wait_procs(workers, timeout=timeout, callback=on_terminate)
-        workers = alive
-
-        logger.debug("task completed {}, running {}".format(
-            len(gone), len(alive)
+    # Use the persistent workers when the task can be sent to them
+    pool = _parallel_pool
+    task = None
+    if pool is not None:
+        task_kwargs = dict((k, v) for k, v in kwargs.items() if k not in ('node', 'results'))
+        task = _pickle_task(target, args, task_kwargs)
+
+    # connection --> [SonicProcess or ParallelWorker, node, process name, deadline]
+    running = {}
+
+    def start_process(node, process_name):
+        process_kwargs = dict(kwargs)
+        process_kwargs['node'] = node
+        process_kwargs['results'] = {}
+        worker = SonicProcess(
+                    name=process_name, target=target, args=args,
+                    kwargs=process_kwargs
+                )
+        worker.start()
+        logger.debug('Started process {} running target "{}"'.format(
+            worker.pid, process_name
         ))
+        return worker
 
-        if len(gone) == 0:
-            logger.debug("all processes have timedout")
-            tasks_running -= len(workers)
-            tasks_done += len(workers)
-            force_terminate(workers)
-            del workers[:]
+    def start_task(node, deadline):
+        process_name = "{}--{}".format(target.__name__, node)
+        worker = pool.get_worker(node) if task else None
+        if worker is not None and (worker.conn is None or worker.conn not in running):
+            worker.submit(task)
         else:
-            tasks_running -= len(gone)
-            tasks_done += len(gone)
-
-        # check if we have any processes that failed - have exitcode non-zero
-        for worker in gone:
-            if worker.exitcode != 0:
-                failed_processes[worker.name] = {}
-                failed_processes[worker.name]['exit_code'] = worker.exitcode
-                failed_processes[worker.name]['exception'] = worker.exception
-
-    # In case of timeout force terminate spawned processes
-    for worker in workers:
+            worker = start_process(node, process_name)
+        running[worker.conn] = [worker, node, process_name, deadline]
+
+    def finish_task(conn, exit_code=0, exception=None, task_results=None):
+        _, _, process_name, _ = running.pop(conn)
+        if task_results:
+            results.update(task_results)
+        if exit_code != 0:
+            failed_processes[process_name] = {}
+            failed_processes[process_name]['exit_code'] = exit_code
+            failed_processes[process_name]['exception'] = exception
+
+    def handle_process(conn, worker):
+        if not worker.receive() and worker.is_alive():
+            return
+        worker.join()
+        logger.info("process {} terminated with exit code {}".format(
+            worker.name, worker.exitcode
+        ))
+        finish_task(conn, worker.exitcode, worker.exception, worker.results)
+
+    def handle_worker(conn, worker):
+        if not conn.poll():
+            if worker.is_alive():
+                return
+            # The worker died without reporting a result
+            logger.error('Parallel worker for {} exited with code {}'.format(worker.key, worker.process.exitcode))
+            finish_task(conn, worker.process.exitcode or -1)
+            worker.kill()
+            return
+        try:
+            status, exception, task_results = worker.receive()
+        except EOFError:
+            finish_task(conn, -1)
+            worker.kill()
+            return
+        if status == 'unavailable':
+            _, node, process_name, deadline = running.pop(conn)
+            process = start_process(node, process_name)
+            running[process.conn] = [process, node, process_name, deadline]
+        else:
+            finish_task(conn, 0 if status == 'done' else 1, exception, task_results)
+
+    def force_terminate(conn):
+        # Some processes cannot be terminated. Try to kill them and raise flag.
+        worker, _, process_name, _ = running.pop(conn)
+        results[process_name] = [{'failed': True}]
+        if isinstance(worker, ParallelWorker):
+            worker.kill()
+            return
+        worker.terminate()
+        worker.join(1)
         if worker.is_alive():
-            logger.error('Process {} is alive, force terminate it.'.format(
-                worker.name
-            ))
-            worker.terminate()
-            results[worker.name] = [{'failed': True}]
+            logger.info('Found process still running: {}. Try to kill it.'.format(process_name))
+            try:
+                os.kill(worker.pid, signal.SIGKILL)
+            except OSError as err:
+                logger.error("Unable to kill {}:{}, error:{}".format(
+                    worker.pid, process_name, err
+                ))
+
+                pt_assert(
+                    False,
+                    """Processes running target "{}" could not be terminated.
+                    Unable to kill {}:{}, error:{}""".format(target.__name__, worker.pid, process_name, err)
+                )
+
+    while nodes or running:
+        while len(nodes) and len(running) < concurrent_tasks:
+            start_task(nodes.pop(0), time.time() + timeout if timeout else None)
+
+        deadlines = [entry[3] for entry in running.values() if entry[3] is not None]
+        wait_timeout = max(min(deadlines) - time.time(), 0) if deadlines else None
+        processes = {}
+        for conn, entry in running.items():
+            processes[conn] = entry[0].process if isinstance(entry[0], ParallelWorker) else entry[0]
+        ready = _wait_ready(processes, wait_timeout)
+
+        for conn in ready:
+            if conn not in running:
+                continue
+            worker = running[conn][0]
+            if isinstance(worker, ParallelWorker):
+                handle_worker(conn, worker)
+            else:
+                handle_process(conn, worker)
+
+        # Terminate the tasks which exceed their timeout
+        now = time.time()
+        for conn, entry in list(running.items()):
+            if entry[3] is not None and entry[3] <= now:
+                logger.error('Process {} execution time exceeds {} seconds, force terminate it.'.format(
+                    entry[2], timeout
+                ))
+                force_terminate(conn)
 
     end_time = datetime.datetime.now()
     delta_time = end_time - start_time
 
-    # force terminate any workers still running
-    force_terminate(workers)
-
     # if we have failed processes, we should log the exception and exit code
     # of each Process and fail
     if len(failed_processes.keys()):
@@ -215,6 +481,8 @@ def reset_ansible_local_tmp(target):
         target (function): The function to be decorated.
     """
 
+    # functools.wraps keeps the target picklable by name for the parallel pool workers
+    @functools.wraps(target)
     def wrapper(*args, **kwargs):
 
         # Reset the ansible default local tmp directory for the current subprocess
@@ -228,6 +496,4 @@ def reset_ansible_local_tmp(target):
             # User of tempfile.mkdtemp need to take care of cleaning up.
             shutil.rmtree(constants.DEFAULT_LOCAL_TMP)
 
-    wrapper.__name__ = target.__name__
-
     return wrapper
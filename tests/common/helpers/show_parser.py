@@ -0,0 +1,212 @@
+"""
+Parser for the tabulated output of SONiC show commands.
+
+The output has a line of column headers, then a separation line with '-' under each column header. Both header and
+column content are within the width of the '-' chars of the column. For example:
+
+          Interface            Lanes    Speed    MTU
+    ---------------  ---------------  -------  -----
+          Ethernet0          0,1,2,3      40G   9100
+
+The slices of the columns are computed once from the separation line and applied to each content line. The rows can
+be returned as dictionaries (the default, same as SonicHost.show_and_parse), namedtuples or column lists.
+
+Building one dictionary per row costs about as much as the per field parser used before, so only FORMAT_COLUMNS
+(several times faster) and to a lesser extent FORMAT_NAMEDTUPLE are faster, see tests/scripts/show_parser_benchmark.py.
+"""
+import io
+import logging
+import re
+
+from collections import namedtuple, OrderedDict
+from itertools import islice, repeat, takewhile
+from operator import methodcaller
+
+from six import string_types, text_type
+
+logger = logging.getLogger(__name__)
+
+FORMAT_DICT = 'dict'
+FORMAT_NAMEDTUPLE = 'namedtuple'
+FORMAT_COLUMNS = 'columns'
+
+# Number of content lines parsed at a time by the row iterators
+ROW_BLOCK = 1024
+
+
+def is_sep_line(line, sep_char='-'):
+    """Check if the line is a separation line, made of sep_char and spaces only.
+
+    Same as matching regex '^( *-+ *)+$' but without backtracking.
+    """
+    return sep_char in line and not line.replace(sep_char, '').replace(' ', '')
+
+
+def parse_column_positions(sep_line, sep_char='-'):
+    """Parse the position of each columns in the command output
+
+    Args:
+        sep_line: The output line separating actual data and column headers
+        sep_char: The character used in separation line. Defaults to '-'.
+
+    Returns:
+        Returns a list. Each item is a tuple with two elements. The first element is start position of a column. The
+        second element is the end position of the column.
+    """
+    return [(m.start(), m.end()) for m in re.finditer('{}+'.format(re.escape(sep_char)), sep_line)]
+
+
+def iter_lines(text):
+    """Iterate the lines of a command output without splitting it into a list first."""
+    stream = io.StringIO(text) if isinstance(text, text_type) else io.BytesIO(text)
+    return map(methodcaller('rstrip', '\r\n'), stream)
+
+
+class ShowTable(object):
+    """Columns of a show command output, found from its header and separation lines.
+
+    The content lines are parsed in blocks of ROW_BLOCK lines, one column at a time, and the rows are assembled from
+    the columns with zip, so that no Python code runs per row. The rows are streamed block by block.
+
+    Attributes:
+        headers: Column headers in lowercase.
+        slices: Slice of each column in the content lines.
+        row_type: The namedtuple type of the rows, invalid and duplicate field names are renamed.
+    """
+
+    def __init__(self, header_line, sep_line, sep_char='-', types=None):
+        """
+        Args:
+            header_line: The line of column headers.
+            sep_line: The separation line under the column headers.
+            sep_char: The character used in separation line. Defaults to '-'.
+            types: Optional dictionary of column header to a function converting the column values, like int. The
+                value is kept as string if the conversion fails.
+        """
+        positions = parse_column_positions(sep_line, sep_char)
+        self.headers = [header_line[left:right].strip().lower() for (left, right) in positions]
+        self.slices = [slice(left, right) for (left, right) in positions]
+        self._converters = dict((idx, types[header]) for idx, header in enumerate(self.headers)
+                                if types and header in types)
+        names = [re.sub(r'\W+', '_', header).strip('_') or 'column' for header in self.headers]
+        self.row_type = namedtuple('ShowRow', names, rename=True)
+
+    @staticmethod
+    def _convert(values, func):
+        for row, value in enumerate(values):
+            try:
+                values[row] = func(value)
+            except (ValueError, TypeError):
+                pass
+        return values
+
+    def _columns(self, lines):
+        """The list of the values of each column of the lines."""
+        columns = [[line[column].strip() for line in lines] for column in self.slices]
+        for idx, func in self._converters.items():
+            self._convert(columns[idx], func)
+        return columns
+
+    def _iter_blocks(self, content_lines):
+        """Iterate the rows of the content lines as tuples, one list of rows per block of lines.
+
+        When an empty line is encountered while parsing the tabulate content, it is highly possible that the
+        tabulate content has been drained. The empty line and rest of the lines are not parsed.
+        """
+        lines = takewhile(len, content_lines)
+        while True:
+            block = list(islice(lines, ROW_BLOCK))
+            if not block:
+                break
+            yield zip(*self._columns(block))
+
+    def split(self, line):
+        """Split a content line into the list of its column values."""
+        return [column[0] for column in self._columns([line])]
+
+    def iter_values(self, content_lines):
+        """Iterate the column values of the content lines, until the first empty line."""
+        for rows in self._iter_blocks(content_lines):
+            for values in rows:
+                yield list(values)
+
+    def iter_rows(self, content_lines, output_format=FORMAT_DICT):
+        """Iterate the rows of the content lines as dictionaries or namedtuples."""
+        headers, make_row = self.headers, self.row_type._make
+        for rows in self._iter_blocks(content_lines):
+            if output_format == FORMAT_NAMEDTUPLE:
+                rows = map(make_row, rows)
+            else:
+                rows = map(dict, map(zip, repeat(headers), rows))
+            for row in rows:
+                yield row
+
+    def columns(self, content_lines):
+        """Parse the content lines into a dictionary of column header to the list of column values."""
+        return OrderedDict(zip(self.headers, self._columns(list(takewhile(len, content_lines)))))
+
+
+def find_table(lines, sep_char='-', types=None):
+    """Find the header and separation lines of a show command output.
+
+    Args:
+        lines: Iterable of the output lines. Lines are consumed up to the separation line.
+        sep_char: The character used in separation line. Defaults to '-'.
+        types: Optional dictionary of column header to a function converting the column values.
+
+    Returns:
+        Tuple of the ShowTable and the iterator of the content lines. The ShowTable is None if no separation line
+        is found.
+    """
+    lines = iter(lines)
+    header_line = ''
+    for line in lines:
+        if is_sep_line(line, sep_char):
+            return ShowTable(header_line, line, sep_char, types), lines
+        header_line = line
+    return None, lines
+
+
+def iter_show(lines, output_format=FORMAT_DICT, types=None):
+    """Parse the show command output lines into a stream of rows.
+
+    Args:
+        lines: Iterable of the output lines, or the output as a single string.
+        output_format: FORMAT_DICT or FORMAT_NAMEDTUPLE.
+        types: Optional dictionary of column header to a function converting the column values.
+
+    Returns:
+        Generator of the rows.
+    """
+    if isinstance(lines, string_types):
+        lines = iter_lines(lines)
+    table, content_lines = find_table(lines, types=types)
+    if table is None:
+        logger.error('Failed to find separation line in the show command output')
+        return
+    for row in table.iter_rows(content_lines, output_format):
+        yield row
+
+
+def parse_show(lines, output_format=FORMAT_DICT, types=None):
+    """Parse the show command output lines.
+
+    Args:
+        lines: Iterable of the output lines, or the output as a single string.
+        output_format: FORMAT_DICT for a list of dictionaries keyed by the lowercase column headers,
+            FORMAT_NAMEDTUPLE for a list of namedtuples or FORMAT_COLUMNS for a dictionary of column header to the
+            list of column values.
+        types: Optional dictionary of column header to a function converting the column values, like int.
+
+    Returns:
+        The parsed rows, an empty list (or dictionary for FORMAT_COLUMNS) if no separation line is found.
+    """
+    if isinstance(lines, string_types):
+        lines = iter_lines(lines)
+    table, content_lines = find_table(lines, types=types)
+    if table is None:
+        logger.error('Failed to find separation line in the show command output')
+        return OrderedDict() if output_format == FORMAT_COLUMNS else []
+    if output_format == FORMAT_COLUMNS:
+        return table.columns(content_lines)
+    return list(table.iter_rows(content_lines, output_format))
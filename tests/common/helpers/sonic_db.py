@@ -1,10 +1,47 @@
 import logging
 import json
+from collections import OrderedDict
+from six.moves import shlex_quote
 from tests.common.helpers.constants import DEFAULT_NAMESPACE
 from tests.common.devices.sonic_asic import SonicAsic
 
 logger = logging.getLogger(__name__)
 
+# Lua scripts run by EVAL on the DUT. Each returns the result of many reads as one JSON string, so that a bulk
+# read is a single sonic-db-cli exec instead of one per key.
+LUA_HGETALL = """
+local result = {}
+for _, key in ipairs(KEYS) do
+    if redis.call('TYPE', key).ok == 'hash' then
+        local values = redis.call('HGETALL', key)
+        local entry = {}
+        for i = 1, #values, 2 do entry[values[i]] = values[i + 1] end
+        result[key] = entry
+    end
+end
+return cjson.encode(result)
+"""
+
+LUA_HMGET = """
+local result = {}
+for _, key in ipairs(KEYS) do
+    if redis.call('TYPE', key).ok == 'hash' then
+        result[key] = redis.call('HMGET', key, unpack(ARGV))
+    end
+end
+return cjson.encode(result)
+"""
+
+LUA_SCAN = """
+local keys = {}
+local cursor = '0'
+repeat
+    local reply = redis.call('SCAN', cursor, 'MATCH', ARGV[1], 'COUNT', ARGV[2])
+    cursor = reply[1]
+    for _, key in ipairs(reply[2]) do keys[#keys + 1] = key end
+until cursor == '0'
+return cjson.encode(keys)
+"""
 
 class SonicDbCli(object):
     """Base class for interface to SonicDb using sonic-db-cli command.
@@ -14,6 +51,10 @@ class SonicDbCli(object):
             database: database number.
         """
 
+    # Max number of keys read by one EVAL, keeps the command line and the time redis is blocked bounded
+    BULK_BATCH_SIZE = 500
+    SCAN_COUNT = 1000
+
     def __init__(self, host, database='APPL_DB'):
         """Initializes base class with defaults"""
         self.host = host
@@ -138,6 +179,94 @@ class SonicDbCli(object):
         else:
             return result['stdout'].decode('unicode-escape')
 
+    def _eval(self, script, keys, args=()):
+        """
+        Runs a Lua script with EVAL in a single sonic-db-cli command and parses its JSON result.
+
+        Note:
+            Keys may contain quotes, so the command is quoted and run with shell().
+
+        Args:
+            script: The Lua script, must return a JSON string.
+            keys: List of keys passed to the script in KEYS.
+            args: List of arguments passed to the script in ARGV.
+
+        Returns:
+            The parsed JSON result of the script.
+        """
+        sonic_db_cli = getattr(self.host, "sonic_db_cli", "sonic-db-cli")
+        words = [self.database, "EVAL", script, str(len(keys))] + list(keys) + [str(arg) for arg in args]
+        cmd = "{} {}".format(sonic_db_cli, " ".join(shlex_quote(word) for word in words))
+        logger.debug("SONIC-DB-CLI: EVAL with %d keys on %s", len(keys), self.database)
+        output = self.host.sonichost.shell(cmd, verbose=False)
+        return json.loads(output["stdout"])
+
+    def _eval_batches(self, script, keys, args=()):
+        result = {}
+        keys = list(keys)
+        for index in range(0, len(keys), self.BULK_BATCH_SIZE):
+            result.update(self._eval(script, keys[index:index + self.BULK_BATCH_SIZE], args))
+        return result
+
+    def hgetall_bulk(self, keys):
+        """
+        Gets all the fields of many hash keys, in batches of BULK_BATCH_SIZE keys per sonic-db-cli command.
+
+        Args:
+            keys: List of full key names.
+
+        Returns:
+            Dictionary of key to dictionary of field and value. Missing and non hash keys are not included.
+        """
+        return self._eval_batches(LUA_HGETALL, keys)
+
+    def hmget_bulk(self, keys, fields):
+        """
+        Gets some fields of many hash keys, in batches of BULK_BATCH_SIZE keys per sonic-db-cli command.
+
+        Args:
+            keys: List of full key names.
+            fields: List of the hash fields to get.
+
+        Returns:
+            Dictionary of key to dictionary of field and value. The value is None if the field is not present.
+            Missing and non hash keys are not included.
+        """
+        result = self._eval_batches(LUA_HMGET, keys, fields)
+        # redis nil is encoded as false
+        return dict((key, dict((field, value if value is not False else None) for field, value in zip(fields, values)))
+                    for key, values in result.items())
+
+    def scan_keys(self, pattern):
+        """
+        Gets the keys matching a pattern with SCAN, in a single sonic-db-cli command.
+
+        Args:
+            pattern: Glob style pattern of the keys, like "ASIC_STATE:SAI_OBJECT_TYPE_LAG:*".
+
+        Returns:
+            List of the keys, empty if no key matches.
+        """
+        keys = self._eval(LUA_SCAN, [], [pattern, self.SCAN_COUNT])
+        # cjson encodes an empty table as {}
+        return list(OrderedDict.fromkeys(keys or []))
+
+    def get_table_snapshot(self, pattern):
+        """
+        Gets all the hash keys matching a pattern with their fields.
+
+        Note:
+            The keys are found with a single SCAN command and then read in batches of BULK_BATCH_SIZE keys, so that
+            redis is not blocked while reading a large table.
+
+        Args:
+            pattern: Glob style pattern of the keys, like "ASIC_STATE:SAI_OBJECT_TYPE_LAG:*".
+
+        Returns:
+            Dictionary of key to dictionary of field and value.
+        """
+        return self.hgetall_bulk(self.scan_keys(pattern))
+
     def dump(self, table):
         """
         Dumps and entire table with sonic-db-dump.
@@ -289,6 +418,20 @@ class AsicDbCli(SonicDbCli):
         result = self.host.sonichost.shell(cmd)
         return result['stdout']
 
+    def get_neighbor_values(self, neighbor_keys, fields):
+        """
+        Returns the values of some fields of many neighbors in the neighbor table, with a single sonic-db-cli command
+        per BULK_BATCH_SIZE neighbors.
+
+        Args:
+            neighbor_keys: List of full keys of the neighbor table.
+            fields: List of the fields to get in the neighbor hash table.
+
+        Returns:
+            Dictionary of neighbor key to dictionary of field and value.
+        """
+        return self.hmget_bulk(neighbor_keys, fields)
+
     def get_hostif_table(self, refresh=False):
         """
         Returns a fresh hostif table if refresh is true, else returns the entry from cache.  Initializes instance
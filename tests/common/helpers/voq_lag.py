@@ -24,8 +24,9 @@ def get_lag_ids_from_chassis_db(duthosts):
     for sup in duthosts.supervisor_nodes:
         voqdb = VoqDbCli(sup)
         lag_list = voqdb.get_lag_list()
+        lag_values = voqdb.hmget_bulk(lag_list, ["lag_id"])
         for lag in lag_list:
-            lag_ids.append(voqdb.hget_key_value(lag, "lag_id"))
+            lag_ids.append(lag_values.get(lag, {}).get("lag_id"))
 
     logging.info("LAG id's preset in CHASSIS_DB are {}".format(lag_ids))
     return lag_ids
@@ -156,9 +157,10 @@ def verify_lag_in_asic_db(asics, lag_id, deleted=False):
     for asic in asics:
         asicdb = AsicDbCli(asic)
         asic_db_lag_list = asicdb.get_asic_db_lag_list()
+        lag_values = asicdb.hmget_bulk(asic_db_lag_list, ["SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID"])
         if deleted:
             for lag in asic_db_lag_list:
-                if asicdb.hget_key_value(lag, "SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
+                if lag_values.get(lag, {}).get("SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
                     pytest.fail('LAG id {} for LAG {} exist in ASIC DB,'
                                 ' Expected was should not be present'.format(lag_id, TMP_PC))
 
@@ -166,7 +168,7 @@ def verify_lag_in_asic_db(asics, lag_id, deleted=False):
 
         else:
             for lag in asic_db_lag_list:
-                if asicdb.hget_key_value(lag, "SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
+                if lag_values.get(lag, {}).get("SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
                     logging.info('LAG id {} for LAG {} exist in ASIC DB'.format(lag_id, TMP_PC))
                     return
             pytest.fail('LAG id {} for LAG {} does not exist in ASIC DB'.format(lag_id, TMP_PC))
@@ -273,15 +275,16 @@ def verify_lag_member_in_asic_db(asics, lag_id, pc_members, deleted=False):
         asicdb = AsicDbCli(asic)
         asic_lag_list = asicdb.get_asic_db_lag_list()
         asic_db_lag_member_list = asicdb.get_asic_db_lag_member_list()
+        lag_values = asicdb.hmget_bulk(asic_lag_list, ["SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID"])
+        lag_member_values = asicdb.hmget_bulk(asic_db_lag_member_list, ["SAI_LAG_MEMBER_ATTR_LAG_ID"])
         lag_oid = None
         if deleted:
             for lag in asic_lag_list:
-                if asicdb.hget_key_value(lag,
-                                         "SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
+                if lag_values.get(lag, {}).get("SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
                     lag_oid = ":".join(lag for lag in lag.split(':')[-1:-3:-1])
 
             for lag_member in asic_db_lag_member_list:
-                if asicdb.hget_key_value(lag_member, "SAI_LAG_MEMBER_ATTR_LAG_ID") == lag_oid:
+                if lag_member_values.get(lag_member, {}).get("SAI_LAG_MEMBER_ATTR_LAG_ID") == lag_oid:
                     pytest.fail("lag members {} still exist in lag member table on {},"
                                 " Expected was should be deleted"
                                  .format(pc_members, asic.sonichost.hostname))
@@ -290,12 +293,12 @@ def verify_lag_member_in_asic_db(asics, lag_id, pc_members, deleted=False):
 
         else:
             for lag in asic_lag_list:
-                if asicdb.hget_key_value(lag, "SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
+                if lag_values.get(lag, {}).get("SAI_LAG_ATTR_SYSTEM_PORT_AGGREGATE_ID") == lag_id:
                     lag_oid = ":".join(lag for lag in lag.split(':')[-2::1])
                     break
 
             for lag_member in asic_db_lag_member_list:
-                if asicdb.hget_key_value(lag_member, "SAI_LAG_MEMBER_ATTR_LAG_ID") == lag_oid:
+                if lag_member_values.get(lag_member, {}).get("SAI_LAG_MEMBER_ATTR_LAG_ID") == lag_oid:
                     logging.info('Lag members exist in {} on {}'
                                   .format(asic.asic_index, asic.sonichost.hostname))
                     return
@@ -10,6 +10,7 @@ import re
 import subprocess
 import yaml
 import glob
+import time
 import pytest
 
 from tests.common.testbed import TestbedInfo
@@ -19,6 +20,12 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_CONDITIONS_FILE = 'common/plugins/conditional_mark/tests_mark_conditions*.yaml'
 ASIC_NAME_PATH = '/../../../../ansible/group_vars/sonic/variables'
+ISSUE_URL_PATTERN = re.compile('https?://[^ )]+')
+
+# Issue URL --> active state, fetched once per session
+issue_states = {}
+# Condition string with issue URLs replaced --> compiled code
+compiled_conditions = {}
 
 
 def pytest_addoption(parser):
@@ -46,6 +53,15 @@ def pytest_addoption(parser):
         help="Location of your custom inventory file. "
              "If it is not specified, and inv_name not in testbed.csv, 'lab' will be used")
 
+    parser.addoption(
+        '--issue-cache-ttl',
+        action='store',
+        dest='issue_cache_ttl',
+        type=int,
+        default=0,
+        help="Keep the state of the issues referenced by the conditions in the pytest cache for this number of "
+             "seconds. By default the issue states are fetched once per session.")
+
 
 def load_conditions(session):
     """Load the content from mark conditions file
@@ -346,31 +362,107 @@ def load_basic_facts(session):
     return results
 
 
-def find_longest_matches(nodeid, conditions):
-    """Find the longest matches of the given test case name in the conditions list.
+def build_conditions_index(conditions):
+    """Build a prefix trie of the test case names in the conditions list.
+
+    Args:
+        conditions (list): List of conditions
+
+    Returns:
+        dict: Root node of the trie. Each node is a dict of the next character to the child node, the None key holds
+            the indexes of the conditions whose test case name ends at the node.
+    """
+    root = {}
+    for index, condition in enumerate(conditions):
+        node = root
+        # condition is a dict which has only one item, so we use condition.keys()[0] to get its key.
+        for char in list(condition.keys())[0]:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(index)
+    return root
+
+
+def find_longest_matches(nodeid, conditions, index=None):
+    """Find the matches of the given test case name in the conditions list.
 
-    This is similar to longest prefix match in routing table. The longest match takes precedence.
+    All the conditions whose test case name is a prefix of the given test case name are matched, in the order of
+    the conditions list.
 
     Args:
         nodeid (str): Full test case name
         conditions (list): List of conditions
+        index (dict): Prefix trie built by build_conditions_index for the conditions list. Built if not specified.
+
+    Returns:
+        list: Matched conditions, empty if not found
+    """
+    if index is None:
+        index = build_conditions_index(conditions)
+    matches = list(index.get(None, []))
+    node = index
+    for char in nodeid:
+        node = node.get(char)
+        if node is None:
+            break
+        matches.extend(node.get(None, []))
+    return [conditions[i] for i in sorted(matches)]
+
+
+def find_issue_urls(conditions):
+    """Find the issue URLs referenced by the mark conditions.
+
+    Args:
+        conditions (list): List of conditions
 
     Returns:
-        str: Longest match test case name or None if not found
+        set: Issue URLs
     """
-    longest_matches = []
-    max_length = -1
+    urls = set()
     for condition in conditions:
-        # condition is a dict which has only one item, so we use condition.keys()[0] to get its key.
-        if nodeid.startswith(list(condition.keys())[0]):
-            length = len(condition)
-            if length > max_length:
-                max_length = length
-                longest_matches = []
-                longest_matches.append(condition)
-            elif length == max_length:
-                longest_matches.append(condition)
-    return longest_matches
+        for mark_details in list(condition.values())[0].values():
+            if not mark_details:
+                continue
+            mark_conditions = mark_details.get('conditions', None) or []
+            if not isinstance(mark_conditions, list):
+                mark_conditions = [mark_conditions]
+            for mark_condition in mark_conditions:
+                if mark_condition:
+                    urls.update(ISSUE_URL_PATTERN.findall(mark_condition))
+    return urls
+
+
+def load_issue_states(session, urls):
+    """Fetch the state of the issues concurrently, once per session.
+
+    With --issue-cache-ttl, the states are also kept in the pytest cache and reused by the next sessions until
+    they expire.
+
+    Args:
+        session (obj): Pytest session object.
+        urls (set): Issue URLs.
+    """
+    ttl = session.config.option.issue_cache_ttl
+    now = time.time()
+    cached_states = {}
+    if ttl > 0:
+        cached_states = session.config.cache.get('ISSUE_STATES', None) or {}
+        for url, (state, timestamp) in cached_states.items():
+            if url in urls and now - timestamp < ttl:
+                issue_states[url] = state
+
+    urls = [url for url in urls if url not in issue_states]
+    if urls:
+        logger.info('Checking state of {} issues'.format(len(urls)))
+        results = check_issues(urls)
+        for url in urls:
+            # Consider the issue as active if unable to get its state, only the fetched states are cached
+            issue_states[url] = results.get(url, True)
+            if url in results:
+                cached_states[url] = [results[url], now]
+
+    if ttl > 0:
+        cached_states = dict((url, value) for url, value in cached_states.items() if now - value[1] < ttl)
+        session.config.cache.set('ISSUE_STATES', cached_states)
 
 
 def update_issue_status(condition_str):
@@ -387,21 +479,20 @@ def update_issue_status(condition_str):
     Returns:
         str: New condition string with issue URLs already replaced with 'True' or 'False'.
     """
-    issues = re.findall('https?://[^ )]+', condition_str)
+    issues = ISSUE_URL_PATTERN.findall(condition_str)
     if not issues:
         logger.debug('No issue specified in condition')
         return condition_str
 
-    results = check_issues(issues)
+    unknown_issues = [issue for issue in issues if issue not in issue_states]
+    if unknown_issues:
+        results = check_issues(unknown_issues)
+        for issue_url in unknown_issues:
+            # Consider the issue as active anyway if unable to get issue state, and don't check it again
+            issue_states[issue_url] = results.get(issue_url, True)
 
     for issue_url in issues:
-        if issue_url in results:
-            replace_str = str(results[issue_url])
-        else:
-            # Consider the issue as active anyway if unable to get issue state
-            replace_str = 'True'
-
-        condition_str = condition_str.replace(issue_url, replace_str)
+        condition_str = condition_str.replace(issue_url, str(issue_states[issue_url]))
     return condition_str
 
 
@@ -422,7 +513,11 @@ def evaluate_condition(condition, basic_facts):
 
     condition_str = update_issue_status(condition)
     try:
-        return bool(eval(condition_str, basic_facts))
+        code = compiled_conditions.get(condition_str)
+        if code is None:
+            code = compile(condition_str, '<condition>', 'eval')
+            compiled_conditions[condition_str] = code
+        return bool(eval(code, basic_facts))
     except Exception as e:
         logger.error('Failed to evaluate condition, raw_condition={}, condition_str={}'.format(
             condition,
@@ -501,8 +596,11 @@ def pytest_collection_modifyitems(session, config, items):
     logger.info('Available basic facts that can be used in conditional skip:\n{}'.format(
         json.dumps(basic_facts, indent=2)))
 
+    load_issue_states(session, find_issue_urls(conditions))
+    conditions_index = build_conditions_index(conditions)
+
     for item in items:
-        longest_matches = find_longest_matches(item.nodeid, conditions)
+        longest_matches = find_longest_matches(item.nodeid, conditions, conditions_index)
 
         if longest_matches:
             logger.debug('Found match "{}" for test case "{}"'.format(longest_matches, item.nodeid))
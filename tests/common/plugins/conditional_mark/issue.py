@@ -1,18 +1,23 @@
 """For checking issue state based on supplied issue URL.
 """
 import logging
-import multiprocessing
 import os
 import re
+import time
 import yaml
 
 import requests
 
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
+
 from abc import ABCMeta, abstractmethod
 
 logger = logging.getLogger(__name__)
 
 CREDENTIALS_FILE = 'credentials.yaml'
+MAX_CONCURRENT_CHECKS = 16
+CHECK_TIMEOUT = 60
 
 
 class IssueCheckerBase(object):
@@ -111,32 +116,32 @@ def issue_checker_factory(url):
 def check_issues(issues):
     """Check state of the specified issues.
 
-    Because issue state checking may involve sending HTTP request. This function uses parallel run to speed up
-    issue status checking.
+    Because issue state checking may involve sending HTTP request. This function checks the issues concurrently in
+    threads to speed up issue status checking.
 
     Args:
         issues (list of str): List of issue URLs.
 
     Returns:
         dict: Issue state check result. Key is issue URL, value is either True or False based on issue state.
+            Issues without a checker or not checked within CHECK_TIMEOUT seconds are not included.
     """
-    checkers = [c for c in [issue_checker_factory(issue) for issue in issues] if c is not None]
+    checkers = [c for c in [issue_checker_factory(issue) for issue in set(issues)] if c is not None]
     if not checkers:
         logger.error('No checker created for issues: {}'.format(issues))
         return {}
 
-    check_results = multiprocessing.Manager().dict()
-    check_procs = []
-
-    def _check_issue(checker, results):
-        results[checker.url] = checker.is_active()
-
-    for checker in checkers:
-        check_procs.append(multiprocessing.Process(target=_check_issue, args=(checker, check_results,)))
-
-    for proc in check_procs:
-        proc.start()
-    for proc in check_procs:
-        proc.join(timeout=60)
+    pool = ThreadPool(min(len(checkers), MAX_CONCURRENT_CHECKS))
+    results = [(checker.url, pool.apply_async(checker.is_active)) for checker in checkers]
+    pool.close()
+    deadline = time.time() + CHECK_TIMEOUT
+    states, timed_out = {}, []
+    for url, result in results:
+        try:
+            states[url] = result.get(max(deadline - time.time(), 0))
+        except TimeoutError:
+            timed_out.append(url)
+    if timed_out:
+        logger.error('Checking issues timed out: {}'.format(timed_out))
 
-    return check_results
+    return states
@@ -9,6 +9,8 @@ from tests.common.helpers.parallel import parallel_run, reset_ansible_local_tmp
 def pytest_addoption(parser):
     parser.addoption("--disable_loganalyzer", action="store_true", default=False,
                      help="disable loganalyzer analysis for 'loganalyzer' fixture")
+    parser.addoption("--loganalyzer_on_dut", action="store_true", default=False,
+                     help="run loganalyzer analysis on the DUT and download the logs only on failure")
 
 
 @reset_ansible_local_tmp
@@ -50,7 +52,8 @@ def loganalyzer(duthosts, request):
     analyzers = {}
     parallel_run(analyzer_logrotate, [], {}, duthosts, timeout=120)
     for duthost in duthosts:
-        analyzer = LogAnalyzer(ansible_host=duthost, marker_prefix=request.node.name)
+        analyzer = LogAnalyzer(ansible_host=duthost, marker_prefix=request.node.name,
+                               analyze_on_dut=request.config.getoption("--loganalyzer_on_dut"))
         analyzer.load_common_config()
         analyzers[duthost.hostname] = analyzer
     markers = parallel_run(analyzer_add_marker, [analyzers], {}, duthosts, timeout=120)
@@ -61,5 +64,9 @@ def loganalyzer(duthosts, request):
     if "rep_call" in request.node.__dict__ and request.node.rep_call.skipped or \
             "rep_setup" in request.node.__dict__ and request.node.rep_setup.skipped:
         return
+    # Keep the logs of the failed test case when analyzing on the DUT
+    if "rep_call" in request.node.__dict__ and request.node.rep_call.failed:
+        for analyzer in analyzers.values():
+            analyzer.save_dut_logs = True
     logging.info("Starting to analyse on all DUTs")
     parallel_run(analyze_logs, [analyzers, markers], {}, duthosts, timeout=120)
@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 import re
@@ -68,10 +69,15 @@ class LogAnalyzerError(Exception):
 
 
 class LogAnalyzer:
-    def __init__(self, ansible_host, marker_prefix, dut_run_dir="/tmp", start_marker=None, additional_files={}):
+    def __init__(self, ansible_host, marker_prefix, dut_run_dir="/tmp", start_marker=None, additional_files={},
+                 analyze_on_dut=False):
         self.ansible_host = ansible_host
         self.dut_run_dir = dut_run_dir
         self.extracted_syslog = os.path.join(self.dut_run_dir, "syslog")
+        self.regex_file = os.path.join(self.dut_run_dir, "loganalyzer_regex.json")
+        # run the analysis on the DUT and download the logs only on failure
+        self.analyze_on_dut = analyze_on_dut
+        self.save_dut_logs = False
         self.marker_prefix = marker_prefix.replace(' ', '_')
         # use existing syslog msg as marker to search in logs instead of writing a new one
         self.start_marker = start_marker
@@ -316,6 +322,9 @@ class LogAnalyzer:
                 self.ansible_host.extract_log(directory=file_dir, file_prefix=file_name, start_string=start_str,
                                               target_filename=extracted_file_name)
 
+        if self.analyze_on_dut:
+            return self._analyze_on_dut(marker, analyzer_summary, timestamp, fail)
+
         # Download extracted logs from the DUT to the temporal folder defined in SYSLOG_TMP_FOLDER
         self.save_extracted_log(dest=tmp_folder)
         file_list = [tmp_folder]
@@ -335,16 +344,27 @@ class LogAnalyzer:
         logging.debug('    match_regex="{}"'.format(match_messages_regex.pattern if match_messages_regex else ''))
         logging.debug('    ignore_regex="{}"'.format(ignore_messages_regex.pattern if ignore_messages_regex else ''))
         logging.debug('    expect_regex="{}"'.format(expect_messages_regex.pattern if expect_messages_regex else ''))
-        analyzer_parse_result = self.ansible_loganalyzer.analyze_file_list(file_list, match_messages_regex, ignore_messages_regex, expect_messages_regex)
+        analyzer_parse_result = self.ansible_loganalyzer.analyze_file_list(file_list, match_messages_regex, ignore_messages_regex,
+                                                                           expect_messages_regex, expect_regex_list=self.expect_regex)
         # Print file content and remove the file
         for folder in file_list:
             with open(folder) as fo:
                 logging.debug("{} file content:\n\n{}".format(folder, fo.read()))
             os.remove(folder)
 
-        expected_lines_total = []
-        unused_regex_messages = []
+        # Unused regex matches are tracked during the analysis
+        unused_regex_messages = self.ansible_loganalyzer.get_unused_expect_regex()
+        self._fill_summary(analyzer_summary, analyzer_parse_result, unused_regex_messages)
+
+        if fail:
+            self._verify_log(analyzer_summary)
+        else:
+            return analyzer_summary
 
+    def _fill_summary(self, analyzer_summary, analyzer_parse_result, unused_regex_messages):
+        """
+        @summary: Fill the analysis summary from the per file analysis result.
+        """
         for key, value in analyzer_parse_result.items():
             matching_lines, expecting_lines = value
             analyzer_summary["total"]["match"] += len(matching_lines)
@@ -352,24 +372,57 @@ class LogAnalyzer:
             analyzer_summary["match_files"][key] = {"match": len(matching_lines), "expected_match": len(expecting_lines)}
             analyzer_summary["match_messages"][key] = matching_lines
             analyzer_summary["expect_messages"][key] = expecting_lines
-            expected_lines_total.extend(expecting_lines)
 
-        # Find unused regex matches
-        for regex in self.expect_regex:
-            for line in expected_lines_total:
-                if re.search(regex, line):
-                    break
-            else:
-                unused_regex_messages.append(regex)
         analyzer_summary["total"]["expected_missing_match"] = len(unused_regex_messages)
         analyzer_summary["unused_expected_regexp"] = unused_regex_messages
         logging.debug("Analyzer summary: {}".format(pprint.pformat(analyzer_summary)))
 
+    def _analyze_on_dut(self, marker, analyzer_summary, timestamp, fail):
+        """
+        @summary: Analyze the extracted logs on the DUT, only the matching and expected lines are returned.
+                  The extracted logs are downloaded compressed when the analysis or the test failed.
+        """
+        dut_file_list = [self.extracted_syslog]
+        for path in self.additional_files:
+            dut_file_list.append(os.path.join(self.dut_run_dir, split(path)[1]))
+
+        regex = {"match": self.match_regex, "ignore": self.ignore_regex, "expect": self.expect_regex}
+        self.ansible_host.copy(content=json.dumps(regex), dest=self.regex_file)
+        cmd = "python {run_dir}/loganalyzer.py --action analyze_summary --run_id {marker} --logs {logs} --regex_file {regex}".format(
+            run_dir=self.dut_run_dir, marker=marker, logs=",".join(dut_file_list), regex=self.regex_file)
+        if self.start_marker:
+            cmd += " --start_marker '{}'".format(self.start_marker)
+
+        logging.debug("Analyze files {} on DUT".format(dut_file_list))
+        output = self.ansible_host.command(cmd)["stdout"]
+        dut_result = json.loads(output.splitlines()[-1])
+        self._fill_summary(analyzer_summary, dut_result["result"], dut_result["unused_expected_regexp"])
+
+        try:
+            self._verify_log(analyzer_summary)
+        except LogAnalyzerError:
+            self.save_dut_logs = True
+
+        if self.save_dut_logs:
+            self.save_compressed_logs(dut_file_list, timestamp)
+            self.save_dut_logs = False
+
         if fail:
             self._verify_log(analyzer_summary)
         else:
             return analyzer_summary
 
+    def save_compressed_logs(self, dut_file_list, timestamp):
+        """
+        @summary: Download the given files from the DUT compressed to the temporal folder defined in SYSLOG_TMP_FOLDER.
+        """
+        for src in dut_file_list:
+            dest = ".".join((SYSLOG_TMP_FOLDER, self.ansible_host.hostname, split(src)[1], timestamp, "gz"))
+            self.ansible_host.shell("gzip -c {0} > {0}.gz".format(src))
+            self.ansible_host.fetch(dest=dest, src=src + ".gz", flat="yes")
+            self.ansible_host.file(path=src + ".gz", state="absent")
+            logging.info("Saved extracted log {} to {}".format(src, dest))
+
     def save_extracted_log(self, dest):
         """
         @summary: Download extracted syslog log file to the ansible host.
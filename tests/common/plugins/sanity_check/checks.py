@@ -73,144 +73,147 @@ def _find_down_ports(dut, phy_interfaces, ip_interfaces):
     return down_ports
 
 
-@pytest.fixture(scope="module")
-def check_interfaces(duthosts):
-    def _check(*args, **kwargs):
-        result = parallel_run(_check_interfaces_on_dut, args, kwargs, duthosts.frontend_nodes, timeout=600)
-        return result.values()
+@reset_ansible_local_tmp
+def _check_interfaces_on_dut(*args, **kwargs):
+    dut = kwargs['node']
+    results = kwargs['results']
+    logger.info("Checking interfaces status on %s..." % dut.hostname)
+
+    networking_uptime = dut.get_networking_uptime().seconds
+    timeout = max((SYSTEM_STABILIZE_MAX_TIME - networking_uptime), 0)
+    interval = 20
+    logger.info("networking_uptime=%d seconds, timeout=%d seconds, interval=%d seconds" % \
+                (networking_uptime, timeout, interval))
 
-    @reset_ansible_local_tmp
-    def _check_interfaces_on_dut(*args, **kwargs):
-        dut = kwargs['node']
-        results = kwargs['results']
-        logger.info("Checking interfaces status on %s..." % dut.hostname)
-
-        networking_uptime = dut.get_networking_uptime().seconds
-        timeout = max((SYSTEM_STABILIZE_MAX_TIME - networking_uptime), 0)
-        interval = 20
-        logger.info("networking_uptime=%d seconds, timeout=%d seconds, interval=%d seconds" % \
-                    (networking_uptime, timeout, interval))
-
-        down_ports = []
-        check_result = {"failed": True, "check_item": "interfaces", "host": dut.hostname}
-        for asic in dut.asics:
-            ip_interfaces = []
-            cfg_facts = asic.config_facts(host=dut.hostname,
-                                          source="persistent", verbose=False)['ansible_facts']
-            phy_interfaces = [k for k, v in cfg_facts["PORT"].items() if
-                              "admin_status" in v and v["admin_status"] == "up"]
-            if "PORTCHANNEL_INTERFACE" in cfg_facts:
-                ip_interfaces = list(cfg_facts["PORTCHANNEL_INTERFACE"].keys())
-            if "VLAN_INTERFACE" in cfg_facts:
-                ip_interfaces += list(cfg_facts["VLAN_INTERFACE"].keys())
-
-            logger.info(json.dumps(phy_interfaces, indent=4))
-            logger.info(json.dumps(ip_interfaces, indent=4))
-
-            if timeout == 0:  # Check interfaces status, do not retry.
-                down_ports += _find_down_ports(asic, phy_interfaces, ip_interfaces)
+    down_ports = []
+    check_result = {"failed": True, "check_item": "interfaces", "host": dut.hostname}
+    for asic in dut.asics:
+        ip_interfaces = []
+        cfg_facts = asic.config_facts(host=dut.hostname,
+                                      source="persistent", verbose=False)['ansible_facts']
+        phy_interfaces = [k for k, v in cfg_facts["PORT"].items() if
+                          "admin_status" in v and v["admin_status"] == "up"]
+        if "PORTCHANNEL_INTERFACE" in cfg_facts:
+            ip_interfaces = list(cfg_facts["PORTCHANNEL_INTERFACE"].keys())
+        if "VLAN_INTERFACE" in cfg_facts:
+            ip_interfaces += list(cfg_facts["VLAN_INTERFACE"].keys())
+
+        logger.info(json.dumps(phy_interfaces, indent=4))
+        logger.info(json.dumps(ip_interfaces, indent=4))
+
+        if timeout == 0:  # Check interfaces status, do not retry.
+            down_ports += _find_down_ports(asic, phy_interfaces, ip_interfaces)
+            check_result["failed"] = True if len(down_ports) > 0 else False
+            check_result["down_ports"] = down_ports
+        else:  # Retry checking interface status
+            start = time.time()
+            elapsed = 0
+            while elapsed < timeout:
+                down_ports = _find_down_ports(asic, phy_interfaces, ip_interfaces)
                 check_result["failed"] = True if len(down_ports) > 0 else False
                 check_result["down_ports"] = down_ports
-            else:  # Retry checking interface status
-                start = time.time()
-                elapsed = 0
-                while elapsed < timeout:
-                    down_ports = _find_down_ports(asic, phy_interfaces, ip_interfaces)
-                    check_result["failed"] = True if len(down_ports) > 0 else False
-                    check_result["down_ports"] = down_ports
-
-                    if check_result["failed"]:
-                        wait(interval,
-                             msg="Found down ports, wait %d seconds to retry. Remaining time: %d, down_ports=%s" % \
-                                 (interval, int(timeout - elapsed), str(check_result["down_ports"])))
-                        elapsed = time.time() - start
-                    else:
-                        break
 
-        logger.info("Done checking interfaces status on %s" % dut.hostname)
-        check_result["failed"] = True if len(down_ports) > 0 else False
-        check_result["down_ports"] = down_ports
-        results[dut.hostname] = check_result
-    return _check
+                if check_result["failed"]:
+                    wait(interval,
+                         msg="Found down ports, wait %d seconds to retry. Remaining time: %d, down_ports=%s" % \
+                             (interval, int(timeout - elapsed), str(check_result["down_ports"])))
+                    elapsed = time.time() - start
+                else:
+                    break
+
+    logger.info("Done checking interfaces status on %s" % dut.hostname)
+    check_result["failed"] = True if len(down_ports) > 0 else False
+    check_result["down_ports"] = down_ports
+    results[dut.hostname] = check_result
 
 
 @pytest.fixture(scope="module")
-def check_bgp(duthosts):
+def check_interfaces(duthosts):
     def _check(*args, **kwargs):
-        result = parallel_run(_check_bgp_on_dut, args, kwargs, duthosts.frontend_nodes, timeout=600)
+        result = parallel_run(_check_interfaces_on_dut, args, kwargs, duthosts.frontend_nodes, timeout=600)
         return result.values()
 
-    @reset_ansible_local_tmp
-    def _check_bgp_on_dut(*args, **kwargs):
-        dut = kwargs['node']
-        results = kwargs['results']
-
-        def _check_bgp_status_helper():
-            asic_check_results = []
-            bgp_facts = dut.bgp_facts(asic_index='all')
-
-            # Conditions to fail BGP check
-            #   1. No BGP neighbor.
-            #   2. Any BGP neighbor down.
-            #   3. Failed to get BGP status (In theory, this should be protected by previous check, but adding this check
-            #      here will make BGP check more robust, and it is necessary since many operations highly depends on
-            #      the BGP status)
-
-            if len(bgp_facts) == 0:
-                logger.info("Failed to get BGP status on host %s ..." % dut.hostname)
-                asic_check_results.append(True)
-
-            for asic_index, a_asic_facts in enumerate(bgp_facts):
-                a_asic_result = False
-                a_asic_neighbors = a_asic_facts['ansible_facts']['bgp_neighbors']
-                if a_asic_neighbors is not None and len(a_asic_neighbors) > 0:
-                    down_neighbors = [k for k, v in a_asic_neighbors.items()
-                                      if v['state'] != 'established']
-                    if down_neighbors:
-                        if dut.facts['num_asic'] == 1:
-                            check_result['bgp'] = {'down_neighbors': down_neighbors}
-                        else:
-                            check_result['bgp' + str(asic_index)] = {'down_neighbors': down_neighbors}
-                        a_asic_result = True
+    return _check
+
+
+@reset_ansible_local_tmp
+def _check_bgp_on_dut(*args, **kwargs):
+    dut = kwargs['node']
+    results = kwargs['results']
+
+    def _check_bgp_status_helper():
+        asic_check_results = []
+        bgp_facts = dut.bgp_facts(asic_index='all')
+
+        # Conditions to fail BGP check
+        #   1. No BGP neighbor.
+        #   2. Any BGP neighbor down.
+        #   3. Failed to get BGP status (In theory, this should be protected by previous check, but adding this check
+        #      here will make BGP check more robust, and it is necessary since many operations highly depends on
+        #      the BGP status)
+
+        if len(bgp_facts) == 0:
+            logger.info("Failed to get BGP status on host %s ..." % dut.hostname)
+            asic_check_results.append(True)
+
+        for asic_index, a_asic_facts in enumerate(bgp_facts):
+            a_asic_result = False
+            a_asic_neighbors = a_asic_facts['ansible_facts']['bgp_neighbors']
+            if a_asic_neighbors is not None and len(a_asic_neighbors) > 0:
+                down_neighbors = [k for k, v in a_asic_neighbors.items()
+                                  if v['state'] != 'established']
+                if down_neighbors:
+                    if dut.facts['num_asic'] == 1:
+                        check_result['bgp'] = {'down_neighbors': down_neighbors}
                     else:
-                        a_asic_result = False
-                        if dut.facts['num_asic'] == 1:
-                            if 'bgp' in check_result:
-                                check_result['bgp'].pop('down_neighbors', None)
-                        else:
-                            if 'bgp' + str(asic_index) in check_result:
-                                check_result['bgp' + str(asic_index)].pop('down_neighbors', None)
-                else:
+                        check_result['bgp' + str(asic_index)] = {'down_neighbors': down_neighbors}
                     a_asic_result = True
+                else:
+                    a_asic_result = False
+                    if dut.facts['num_asic'] == 1:
+                        if 'bgp' in check_result:
+                            check_result['bgp'].pop('down_neighbors', None)
+                    else:
+                        if 'bgp' + str(asic_index) in check_result:
+                            check_result['bgp' + str(asic_index)].pop('down_neighbors', None)
+            else:
+                a_asic_result = True
 
-                asic_check_results.append(a_asic_result)
+            asic_check_results.append(a_asic_result)
 
-            if any(asic_check_results):
-                check_result['failed'] = True
-            else:
-                # Need this to cover case where there were down neighbors in one check and now they are all up
-                check_result['failed'] = False
-            return not check_result['failed']
-
-        logger.info("Checking bgp status on host %s ..." % dut.hostname)
-        check_result = {"failed": False, "check_item": "bgp", "host": dut.hostname}
-
-        networking_uptime = dut.get_networking_uptime().seconds
-        timeout = max(SYSTEM_STABILIZE_MAX_TIME - networking_uptime, 1)
-        interval = 20
-        wait_until(timeout, interval, 0, _check_bgp_status_helper)
-        if (check_result['failed']):
-            for a_result in check_result.keys():
-                if a_result != 'failed':
-                    # Dealing with asic result
-                    if 'down_neighbors' in check_result[a_result]:
-                        logger.info('BGP neighbors down: %s on bgp instance %s on dut %s' % (
-                            check_result[a_result]['down_neighbors'], a_result, dut.hostname))
+        if any(asic_check_results):
+            check_result['failed'] = True
         else:
-            logger.info('No BGP neighbors are down on %s' % dut.hostname)
+            # Need this to cover case where there were down neighbors in one check and now they are all up
+            check_result['failed'] = False
+        return not check_result['failed']
+
+    logger.info("Checking bgp status on host %s ..." % dut.hostname)
+    check_result = {"failed": False, "check_item": "bgp", "host": dut.hostname}
+
+    networking_uptime = dut.get_networking_uptime().seconds
+    timeout = max(SYSTEM_STABILIZE_MAX_TIME - networking_uptime, 1)
+    interval = 20
+    wait_until(timeout, interval, 0, _check_bgp_status_helper)
+    if (check_result['failed']):
+        for a_result in check_result.keys():
+            if a_result != 'failed':
+                # Dealing with asic result
+                if 'down_neighbors' in check_result[a_result]:
+                    logger.info('BGP neighbors down: %s on bgp instance %s on dut %s' % (
+                        check_result[a_result]['down_neighbors'], a_result, dut.hostname))
+    else:
+        logger.info('No BGP neighbors are down on %s' % dut.hostname)
+
+    logger.info("Done checking bgp status on %s" % dut.hostname)
+    results[dut.hostname] = check_result
 
-        logger.info("Done checking bgp status on %s" % dut.hostname)
-        results[dut.hostname] = check_result
+
+@pytest.fixture(scope="module")
+def check_bgp(duthosts):
+    def _check(*args, **kwargs):
+        result = parallel_run(_check_bgp_on_dut, args, kwargs, duthosts.frontend_nodes, timeout=600)
+        return result.values()
 
     return _check
 
@@ -233,31 +236,33 @@ def _is_db_omem_over_threshold(command_output):
     return result, total_omem
 
 
+@reset_ansible_local_tmp
+def _check_dbmemory_on_dut(*args, **kwargs):
+    dut = kwargs['node']
+    results = kwargs['results']
+
+    logger.info("Checking database memory on %s..." % dut.hostname)
+    redis_cmd = "client list"
+    check_result = {"failed": False, "check_item": "dbmemory", "host": dut.hostname}
+    # check the db memory on the redis instance running on each instance
+    for asic in dut.asics:
+        res = asic.run_redis_cli_cmd(redis_cmd)['stdout_lines']
+        result, total_omem = _is_db_omem_over_threshold(res)
+        check_result["total_omem"] = total_omem
+        if result:
+            check_result["failed"] = True
+            logging.info("{} db memory over the threshold ".format(str(asic.namespace or '')))
+            break
+    logger.info("Done checking database memory on %s" % dut.hostname)
+    results[dut.hostname] = check_result
+
+
 @pytest.fixture(scope="module")
 def check_dbmemory(duthosts):
     def _check(*args, **kwargs):
         result = parallel_run(_check_dbmemory_on_dut, args, kwargs, duthosts, timeout=600)
         return result.values()
 
-    @reset_ansible_local_tmp
-    def _check_dbmemory_on_dut(*args, **kwargs):
-        dut = kwargs['node']
-        results = kwargs['results']
-
-        logger.info("Checking database memory on %s..." % dut.hostname)
-        redis_cmd = "client list"
-        check_result = {"failed": False, "check_item": "dbmemory", "host": dut.hostname}
-        # check the db memory on the redis instance running on each instance
-        for asic in dut.asics:
-            res = asic.run_redis_cli_cmd(redis_cmd)['stdout_lines']
-            result, total_omem = _is_db_omem_over_threshold(res)
-            check_result["total_omem"] = total_omem
-            if result:
-                check_result["failed"] = True
-                logging.info("{} db memory over the threshold ".format(str(asic.namespace or '')))
-                break
-        logger.info("Done checking database memory on %s" % dut.hostname)
-        results[dut.hostname] = check_result
     return _check
 
 
@@ -599,6 +604,63 @@ def check_mux_simulator(tbinfo, duthosts, duts_minigraph_facts, get_mux_status,
     return _check
 
 
+@reset_ansible_local_tmp
+def _check_monit_on_dut(*args, **kwargs):
+    dut = kwargs['node']
+    results = kwargs['results']
+
+    logger.info("Checking status of each Monit service...")
+    networking_uptime = dut.get_networking_uptime().seconds
+    timeout = max((MONIT_STABILIZE_MAX_TIME - networking_uptime), 0)
+    interval = 20
+    logger.info("networking_uptime = {} seconds, timeout = {} seconds, interval = {} seconds" \
+                .format(networking_uptime, timeout, interval))
+
+    check_result = {"failed": False, "check_item": "monit", "host": dut.hostname}
+
+    if timeout == 0:
+        monit_services_status = dut.get_monit_services_status()
+        if not monit_services_status:
+            logger.info("Monit was not running.")
+            check_result["failed"] = True
+            check_result["failed_reason"] = "Monit was not running"
+            logger.info("Checking status of each Monit service was done!")
+            results[dut.hostname] = check_result
+            return
+
+        check_result = _check_monit_services_status(check_result, monit_services_status)
+    else:
+        start = time.time()
+        elapsed = 0
+        is_monit_running = False
+        while elapsed < timeout:
+            check_result["failed"] = False
+            monit_services_status = dut.get_monit_services_status()
+            if not monit_services_status:
+                wait(interval, msg="Monit was not started and wait {} seconds to retry. Remaining time: {}." \
+                     .format(interval, timeout - elapsed))
+                elapsed = time.time() - start
+                continue
+
+            is_monit_running = True
+            check_result = _check_monit_services_status(check_result, monit_services_status)
+            if check_result["failed"]:
+                wait(interval,
+                     msg="Services were not monitored and wait {} seconds to retry. Remaining time: {}. Services status: {}" \
+                     .format(interval, timeout - elapsed, str(check_result["services_status"])))
+                elapsed = time.time() - start
+            else:
+                break
+
+        if not is_monit_running:
+            logger.info("Monit was not running.")
+            check_result["failed"] = True
+            check_result["failed_reason"] = "Monit was not running"
+
+    logger.info("Checking status of each Monit service was done on %s" % dut.hostname)
+    results[dut.hostname] = check_result
+
+
 @pytest.fixture(scope="module")
 def check_monit(duthosts):
     """
@@ -610,62 +672,53 @@ def check_monit(duthosts):
         result = parallel_run(_check_monit_on_dut, args, kwargs, duthosts, timeout=600)
         return result.values()
 
-    @reset_ansible_local_tmp
-    def _check_monit_on_dut(*args, **kwargs):
-        dut = kwargs['node']
-        results = kwargs['results']
-
-        logger.info("Checking status of each Monit service...")
-        networking_uptime = dut.get_networking_uptime().seconds
-        timeout = max((MONIT_STABILIZE_MAX_TIME - networking_uptime), 0)
-        interval = 20
-        logger.info("networking_uptime = {} seconds, timeout = {} seconds, interval = {} seconds" \
-                    .format(networking_uptime, timeout, interval))
-
-        check_result = {"failed": False, "check_item": "monit", "host": dut.hostname}
-
-        if timeout == 0:
-            monit_services_status = dut.get_monit_services_status()
-            if not monit_services_status:
-                logger.info("Monit was not running.")
-                check_result["failed"] = True
-                check_result["failed_reason"] = "Monit was not running"
-                logger.info("Checking status of each Monit service was done!")
-                results[dut.hostname] = check_result
-                return
+    return _check
 
-            check_result = _check_monit_services_status(check_result, monit_services_status)
-        else:
-            start = time.time()
-            elapsed = 0
-            is_monit_running = False
-            while elapsed < timeout:
-                check_result["failed"] = False
-                monit_services_status = dut.get_monit_services_status()
-                if not monit_services_status:
-                    wait(interval, msg="Monit was not started and wait {} seconds to retry. Remaining time: {}." \
-                         .format(interval, timeout - elapsed))
-                    elapsed = time.time() - start
-                    continue
 
-                is_monit_running = True
-                check_result = _check_monit_services_status(check_result, monit_services_status)
-                if check_result["failed"]:
-                    wait(interval,
-                         msg="Services were not monitored and wait {} seconds to retry. Remaining time: {}. Services status: {}" \
-                         .format(interval, timeout - elapsed, str(check_result["services_status"])))
-                    elapsed = time.time() - start
-                else:
-                    break
+@reset_ansible_local_tmp
+def _check_processes_on_dut(*args, **kwargs):
+    dut = kwargs['node']
+    results = kwargs['results']
+    logger.info("Checking process status on %s..." % dut.hostname)
+
+    networking_uptime = dut.get_networking_uptime().seconds
+    timeout = max((SYSTEM_STABILIZE_MAX_TIME - networking_uptime), 0)
+    interval = 20
+    logger.info("networking_uptime=%d seconds, timeout=%d seconds, interval=%d seconds" % \
+                (networking_uptime, timeout, interval))
+
+    check_result = {"failed": False, "check_item": "processes", "host": dut.hostname}
+    if timeout == 0:  # Check processes status, do not retry.
+        processes_status = dut.all_critical_process_status()
+        check_result["processes_status"] = processes_status
+        check_result["services_status"] = {}
+        for k, v in processes_status.items():
+            if v['status'] == False or len(v['exited_critical_process']) > 0:
+                check_result['failed'] = True
+            check_result["services_status"].update({k: v['status']})
+    else:  # Retry checking processes status
+        start = time.time()
+        elapsed = 0
+        while elapsed < timeout:
+            check_result["failed"] = False
+            processes_status = dut.all_critical_process_status()
+            check_result["processes_status"] = processes_status
+            check_result["services_status"] = {}
+            for k, v in processes_status.items():
+                if v['status'] == False or len(v['exited_critical_process']) > 0:
+                    check_result['failed'] = True
+                check_result["services_status"].update({k: v['status']})
 
-            if not is_monit_running:
-                logger.info("Monit was not running.")
-                check_result["failed"] = True
-                check_result["failed_reason"] = "Monit was not running"
+            if check_result["failed"]:
+                wait(interval,
+                     msg="Not all processes are started, wait %d seconds to retry. Remaining time: %d %s" % \
+                         (interval, int(timeout - elapsed), str(check_result["processes_status"])))
+                elapsed = time.time() - start
+            else:
+                break
 
-        logger.info("Checking status of each Monit service was done on %s" % dut.hostname)
-        results[dut.hostname] = check_result
-    return _check
+    logger.info("Done checking processes status on %s" % dut.hostname)
+    results[dut.hostname] = check_result
 
 
 @pytest.fixture(scope="module")
@@ -680,50 +733,6 @@ def check_processes(duthosts):
         result = parallel_run(_check_processes_on_dut, args, kwargs, duthosts, timeout=timeout)
         return result.values()
 
-    @reset_ansible_local_tmp
-    def _check_processes_on_dut(*args, **kwargs):
-        dut = kwargs['node']
-        results = kwargs['results']
-        logger.info("Checking process status on %s..." % dut.hostname)
-
-        networking_uptime = dut.get_networking_uptime().seconds
-        timeout = max((SYSTEM_STABILIZE_MAX_TIME - networking_uptime), 0)
-        interval = 20
-        logger.info("networking_uptime=%d seconds, timeout=%d seconds, interval=%d seconds" % \
-                    (networking_uptime, timeout, interval))
-
-        check_result = {"failed": False, "check_item": "processes", "host": dut.hostname}
-        if timeout == 0:  # Check processes status, do not retry.
-            processes_status = dut.all_critical_process_status()
-            check_result["processes_status"] = processes_status
-            check_result["services_status"] = {}
-            for k, v in processes_status.items():
-                if v['status'] == False or len(v['exited_critical_process']) > 0:
-                    check_result['failed'] = True
-                check_result["services_status"].update({k: v['status']})
-        else:  # Retry checking processes status
-            start = time.time()
-            elapsed = 0
-            while elapsed < timeout:
-                check_result["failed"] = False
-                processes_status = dut.all_critical_process_status()
-                check_result["processes_status"] = processes_status
-                check_result["services_status"] = {}
-                for k, v in processes_status.items():
-                    if v['status'] == False or len(v['exited_critical_process']) > 0:
-                        check_result['failed'] = True
-                    check_result["services_status"].update({k: v['status']})
-
-                if check_result["failed"]:
-                    wait(interval,
-                         msg="Not all processes are started, wait %d seconds to retry. Remaining time: %d %s" % \
-                             (interval, int(timeout - elapsed), str(check_result["processes_status"])))
-                    elapsed = time.time() - start
-                else:
-                    break
-
-        logger.info("Done checking processes status on %s" % dut.hostname)
-        results[dut.hostname] = check_result
     return _check
 
 @pytest.fixture(scope="module")
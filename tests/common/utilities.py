@@ -15,6 +15,7 @@ import threading
 import time
 import traceback
 from io import BytesIO
+from multiprocessing.pool import ThreadPool
 
 import pytest
 from ansible.parsing.dataloader import DataLoader
@@ -82,10 +83,190 @@ def wait(seconds, msg=""):
     time.sleep(seconds)
 
 
+# Waits in the scope of wait_deadline, per thread
+_wait_deadlines = threading.local()
+
+# Telemetry of the recent waits, see get_wait_telemetry
+WAIT_TELEMETRY_SIZE = 10000
+_wait_telemetry = collections.deque(maxlen=WAIT_TELEMETRY_SIZE)
+
+# With backoff, the first poll interval is the interval divided by this value, then doubled up to the interval
+WAIT_BACKOFF_DIVISOR = 8
+
+
+def _current_deadline():
+    stack = getattr(_wait_deadlines, "stack", None)
+    return stack[-1] if stack else None
+
+
+@contextlib.contextmanager
+def _inherit_deadline(deadline):
+    stack = getattr(_wait_deadlines, "stack", None)
+    if stack is None:
+        stack = _wait_deadlines.stack = []
+    stack.append(deadline)
+    try:
+        yield deadline
+    finally:
+        stack.pop()
+
+
+@contextlib.contextmanager
+def wait_deadline(timeout):
+    """
+    @summary: Limit the total time of all the waits in the block. The timeout of wait_until and of the other waits
+        called in the block, including nested wait_deadline blocks, is reduced to the time left until the deadline.
+    @param timeout: Maximum time in seconds for the block
+    @return: The deadline, in time.time() seconds
+    """
+    deadline = time.time() + timeout
+    parent = _current_deadline()
+    if parent is not None:
+        deadline = min(deadline, parent)
+    with _inherit_deadline(deadline):
+        yield deadline
+
+
+def remaining_time(timeout):
+    """
+    @summary: Get the timeout reduced to the time left until the deadline of the enclosing wait_deadline block
+    @param timeout: Timeout in seconds
+    @return: The timeout, or the time left until the deadline if smaller, never negative
+    """
+    deadline = _current_deadline()
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.time())
+    return max(timeout, 0)
+
+
+def get_wait_telemetry(clear=False):
+    """
+    @summary: Get the telemetry of the recent waits, to tune their timeouts
+    @param clear: Clear the telemetry after getting it
+    @return: List of dictionaries with keys: condition, timeout, interval, attempts, elapsed (seconds until the wait
+        returned), result and time_to_true (elapsed if the result is True, else None)
+    """
+    records = list(_wait_telemetry)
+    if clear:
+        _wait_telemetry.clear()
+    return records
+
+
+def _condition_name(condition):
+    # functools.partial has no __name__
+    condition = getattr(condition, "func", condition)
+    return getattr(condition, "__name__", repr(condition))
+
+
+def _check_condition(condition, args, kwargs):
+    try:
+        return condition(*args, **kwargs)
+    except Exception as e:
+        exc_info = sys.exc_info()
+        details = traceback.format_exception(*exc_info)
+        logger.error(
+            "Exception caught while checking {}:{}, error:{}".format(
+                _condition_name(condition), "".join(details), e
+            )
+        )
+        return False
+
+
+def _poll_conditions(timeout, interval, delay, conditions, wait_all=True, backoff=False):
+    """
+    @summary: Poll the conditions until all (or any) of them are True or timeout.
+    @param conditions: List of (function, args, kwargs)
+    @return: List of the indexes of the conditions which are True, empty on timeout. With wait_all, a condition
+        which is True is not polled again. Each condition is polled on its own schedule, a slow condition does not
+        delay the polling of the others. Each condition is checked at least once, and checked a last time at the
+        timeout unless its check is still running then.
+    """
+    name = ",".join(_condition_name(condition) for condition, _, _ in conditions)
+    if delay > 0:
+        logger.debug("Delay for %s seconds first" % delay)
+        time.sleep(remaining_time(delay))
+    timeout = remaining_time(timeout)
+    deadline = _current_deadline()
+
+    def _check(index):
+        condition, args, kwargs = conditions[index]
+        if deadline is None:
+            return _check_condition(condition, args, kwargs)
+        # threads polling the conditions inherit the deadline of the caller
+        with _inherit_deadline(deadline):
+            return _check_condition(condition, args, kwargs)
+
+    pool = ThreadPool(len(conditions)) if len(conditions) > 1 else None
+    results = six.moves.queue.Queue()
+
+    def _submit(index):
+        if pool is None:
+            results.put((index, _check(index)))
+        else:
+            pool.apply_async(_check, (index,), callback=lambda result: results.put((index, result)))
+
+    start_time = time.time()
+    end_time = start_time + timeout
+    steps = [interval / float(WAIT_BACKOFF_DIVISOR) if backoff else interval] * len(conditions)
+    due = dict((index, start_time) for index in range(len(conditions)))    # index --> time of the next check
+    checked = set()
+    last_checks = set()     # conditions checked at the timeout, the wait ends with their results
+    attempts = 0
+    held = []
+    try:
+        while True:
+            now = time.time()
+            for index in [index for index, when in due.items() if when <= now]:
+                del due[index]
+                if now >= end_time:
+                    last_checks.add(index)
+                _submit(index)
+
+            # wait for the result of a check, the next check or the timeout
+            wakeup = min(due.values()) if due else now + max(interval, 1)
+            if len(checked) == len(conditions) and not last_checks:
+                wakeup = min(wakeup, end_time)
+            try:
+                index, result = results.get(timeout=max(wakeup - time.time(), 0))
+            except six.moves.queue.Empty:
+                index, result = None, None
+
+            elapsed_time = time.time() - start_time
+            if index is not None:
+                attempts += 1
+                checked.add(index)
+                last_checks.discard(index)
+                if result:
+                    held.append(index)
+                elif elapsed_time < timeout:
+                    logger.debug("%s is False, wait %f seconds and check again" %
+                                 (_condition_name(conditions[index][0]), steps[index]))
+                    # the last check is done at the timeout
+                    due[index] = min(time.time() + steps[index], end_time)
+                    steps[index] = min(steps[index] * 2, interval)
+            if held and (not wait_all or len(held) == len(conditions)):
+                logger.debug("%s is True after %f seconds, exit early with True" % (name, elapsed_time))
+                break
+            if elapsed_time >= timeout and len(checked) == len(conditions) and not due and not last_checks:
+                logger.debug("%s is still False after %d seconds, exit with False" % (name, timeout))
+                held = []
+                break
+    finally:
+        if pool:
+            # checks still running are not waited for, their results are dropped
+            pool.close()
+
+    elapsed_time = time.time() - start_time
+    _wait_telemetry.append({"condition": name, "timeout": timeout, "interval": interval, "attempts": attempts,
+                            "elapsed": elapsed_time, "result": bool(held),
+                            "time_to_true": elapsed_time if held else None})
+    return sorted(held)
+
+
 def wait_until(timeout, interval, delay, condition, *args, **kwargs):
     """
     @summary: Wait until the specified condition is True or timeout.
-    @param timeout: Maximum time to wait
+    @param timeout: Maximum time to wait, reduced to the time left in the enclosing wait_deadline block
     @param interval: Poll interval
     @param delay: Delay time
     @param condition: A function that returns False or True
@@ -96,39 +277,54 @@ def wait_until(timeout, interval, delay, condition, *args, **kwargs):
     """
     logger.debug("Wait until %s is True, timeout is %s seconds, checking interval is %s, delay is %s seconds" % \
         (condition.__name__, timeout, interval, delay))
+    return bool(_poll_conditions(timeout, interval, delay, [(condition, args, kwargs)]))
 
-    if delay > 0:
-        logger.debug("Delay for %s seconds first" % delay)
-        time.sleep(delay)
 
-    start_time = time.time()
-    elapsed_time = 0
-    while elapsed_time < timeout:
-        logger.debug("Time elapsed: %f seconds" % elapsed_time)
+def wait_until_backoff(timeout, interval, delay, condition, *args, **kwargs):
+    """
+    @summary: Same as wait_until, but poll quickly first. The first poll interval is interval/WAIT_BACKOFF_DIVISOR,
+        it is doubled after each poll up to 'interval'. A condition that becomes True soon is detected soon, without
+        polling a slow condition often.
+    """
+    logger.debug("Wait until %s is True with backoff, timeout is %s seconds, max checking interval is %s, "
+                 "delay is %s seconds" % (condition.__name__, timeout, interval, delay))
+    return bool(_poll_conditions(timeout, interval, delay, [(condition, args, kwargs)], backoff=True))
 
-        try:
-            check_result = condition(*args, **kwargs)
-        except Exception as e:
-            exc_info = sys.exc_info()
-            details = traceback.format_exception(*exc_info)
-            logger.error(
-                "Exception caught while checking {}:{}, error:{}".format(
-                    condition.__name__, "".join(details), e
-                )
-            )
-            check_result = False
 
-        if check_result:
-            logger.debug("%s is True, exit early with True" % condition.__name__)
-            return True
-        else:
-            logger.debug("%s is False, wait %d seconds and check again" % (condition.__name__, interval))
-            time.sleep(interval)
-            elapsed_time = time.time() - start_time
+def _as_conditions(conditions):
+    # functools.partial can be used to pass arguments to the conditions
+    return [(condition, (), {}) for condition in conditions]
 
-    if elapsed_time >= timeout:
-        logger.debug("%s is still False after %d seconds, exit with False" % (condition.__name__, timeout))
-        return False
+
+def wait_until_all(timeout, interval, delay, conditions, backoff=False):
+    """
+    @summary: Wait until all the conditions are True or timeout. The conditions are polled concurrently, each in its
+        own thread. A condition which is True is not polled again.
+    @param timeout: Maximum time to wait, reduced to the time left in the enclosing wait_deadline block
+    @param interval: Poll interval
+    @param delay: Delay time
+    @param conditions: List of functions that return False or True, use functools.partial to pass arguments
+    @param backoff: Poll quickly first, like wait_until_backoff
+    @return: True if all the conditions are True before timeout, True if there is no condition
+    """
+    if not conditions:
+        return True
+    return len(_poll_conditions(timeout, interval, delay, _as_conditions(conditions), backoff=backoff)) > 0
+
+
+def wait_until_any(timeout, interval, delay, conditions, backoff=False):
+    """
+    @summary: Wait until any of the conditions is True or timeout. The conditions are polled concurrently, each in its
+        own thread.
+    @param timeout: Maximum time to wait, reduced to the time left in the enclosing wait_deadline block
+    @param interval: Poll interval
+    @param delay: Delay time
+    @param conditions: List of functions that return False or True, use functools.partial to pass arguments
+    @param backoff: Poll quickly first, like wait_until_backoff
+    @return: List of the conditions which are True, empty on timeout
+    """
+    held = _poll_conditions(timeout, interval, delay, _as_conditions(conditions), wait_all=False, backoff=backoff)
+    return [conditions[index] for index in held]
 
 
 def wait_tcp_connection(client, server_hostname, listening_port, timeout_s = 30):
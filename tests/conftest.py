@@ -41,8 +41,10 @@ from tests.common.utilities import get_host_visible_vars
 from tests.common.utilities import get_test_server_host
 from tests.common.utilities import str2bool
 from tests.common.utilities import safe_filename
+from tests.common.utilities import get_wait_telemetry
 from tests.common.helpers.dut_utils import is_supervisor_node, is_frontend_node
 from tests.common.cache import FactsCache
+from tests.common.helpers.parallel import ParallelPool, set_parallel_pool, PARALLEL_POOL_SUPPORTED
 
 from tests.common.connections.console_host import ConsoleHost
 
@@ -160,6 +162,21 @@ def pytest_addoption(parser):
     ############################
     parser.addoption("--collect_db_data", action="store_true", default=False, help="Collect db info if test failed")
 
+    ############################
+    #   parallel run options   #
+    ############################
+    parser.addoption("--parallel_pool", action="store_true", default=False,
+                     help="Run parallel_run tasks in a persistent worker process per DUT. The worker is forked again "
+                          "when an attribute of the DUT host object is reassigned, but changes made in place (like "
+                          "updated facts dicts) are not seen, so tasks may run against stale facts. Python 3 only, "
+                          "ignored on Python 2")
+
+    ############################
+    #   wait telemetry options #
+    ############################
+    parser.addoption("--wait_telemetry_file", action="store", default=None, type=str,
+                     help="Save the attempts and duration of each wait_until call to this JSON file")
+
     ############################
     #   macsec options         #
     ############################
@@ -179,6 +196,13 @@ def pytest_configure(config):
         config.pluginmanager.register(MacsecPlugin())
 
 
+def pytest_sessionfinish(session, exitstatus):
+    telemetry_file = session.config.getoption("wait_telemetry_file")
+    if telemetry_file:
+        with open(telemetry_file, "w") as f:
+            json.dump(get_wait_telemetry(), f, indent=2)
+
+
 @pytest.fixture(scope="session", autouse=True)
 def enhance_inventory(request):
     """
@@ -303,6 +327,27 @@ def fixture_duthosts(enhance_inventory, ansible_adhoc, tbinfo, request):
     return DutHosts(ansible_adhoc, tbinfo, get_specified_duts(request))
 
 
+@pytest.fixture(scope="session", autouse=True)
+def parallel_pool(request):
+    """
+    @summary: Keep a persistent parallel_run worker for each DUT during the session. The Ansible setup and
+        connections of a DUT are reused by the parallel_run tasks of that DUT. Enabled by --parallel_pool.
+    """
+    if not request.config.getoption("--parallel_pool"):
+        yield None
+        return
+    if not PARALLEL_POOL_SUPPORTED:
+        logger.warning("--parallel_pool requires Python 3, parallel_run forks a process per DUT instead")
+        yield None
+        return
+
+    pool = ParallelPool(request.getfixturevalue("duthosts").nodes)
+    set_parallel_pool(pool)
+    yield pool
+    set_parallel_pool(None)
+    pool.close()
+
+
 @pytest.fixture(scope="session")
 def duthost(duthosts, request):
     '''
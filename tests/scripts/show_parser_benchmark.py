@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Compare the show command output parsers of tests/common/helpers/show_parser.py with the per field parser used
+before, on a 'show arp' like output.
+
+Usage:
+    python show_parser_benchmark.py [number of lines]
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common', 'helpers'))
+import show_parser  # noqa: E402
+
+
+def legacy_parse_show(output_lines):
+    """The per field parser used by SonicHost.show_and_parse before show_parser."""
+    result = []
+    sep_line_pattern = re.compile(r"^( *-+ *)+$")
+    for idx, line in enumerate(output_lines):
+        if sep_line_pattern.match(line):
+            header_line = output_lines[idx-1]
+            content_lines = output_lines[idx+1:]
+            break
+    else:
+        return result
+    prev = ' ',
+    positions = []
+    for pos, char in enumerate(line + ' '):
+        if char == '-':
+            if char != prev:
+                left = pos
+        else:
+            if char != prev:
+                positions.append((left, pos))
+        prev = char
+    headers = [header_line[left:right].strip().lower() for (left, right) in positions]
+    for content_line in content_lines:
+        if len(content_line) == 0:
+            break
+        item = {}
+        for idx, (left, right) in enumerate(positions):
+            item[headers[idx]] = content_line[left:right].strip()
+        result.append(item)
+    return result
+
+
+def benchmark(count=100000):
+    """Compare the parsers on a 'show arp' like output of count lines."""
+    lines = ['Address        MacAddress         Iface            Vlan',
+             '-------------  -----------------  ---------------  ------']
+    for i in range(count):
+        lines.append('10.{}.{}.{}  52:54:00:{:02x}:{:02x}:{:02x}  Ethernet{:<8d}  {:<6d}'.format(
+            (i >> 16) & 255, (i >> 8) & 255, i & 255, (i >> 16) & 255, (i >> 8) & 255, i & 255, i % 128 * 4, i % 4094))
+    text = '\n'.join(lines)
+
+    def measure(name, func):
+        start = time.time()
+        result = func()
+        print('{:<32} {:.3f} sec'.format(name, time.time() - start))
+        return result
+
+    print('Lines: {}'.format(count))
+    legacy = measure('legacy dict rows', lambda: legacy_parse_show(lines))
+    rows = measure('dict rows', lambda: show_parser.parse_show(lines))
+    assert rows == legacy
+    measure('namedtuple rows', lambda: show_parser.parse_show(lines, show_parser.FORMAT_NAMEDTUPLE))
+    measure('columns', lambda: show_parser.parse_show(lines, show_parser.FORMAT_COLUMNS))
+    measure('columns with int vlan',
+            lambda: show_parser.parse_show(lines, show_parser.FORMAT_COLUMNS, types={'vlan': int}))
+    measure('stream from stdout', lambda: sum(1 for _ in show_parser.iter_show(text, show_parser.FORMAT_NAMEDTUPLE)))
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)